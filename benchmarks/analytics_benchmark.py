@@ -0,0 +1,91 @@
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import tempfile
+import tracemalloc
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from benchmarks.event_samples import generate_metadata
+from src.analytics.event_stats import load_folder, merge_tables
+
+
+def naive_stats(folder):
+    """Прежний подход скриптов анализа: json.load каждого файла и циклы по словарям"""
+    clicks = 0
+    keystrokes = 0
+    hotkeys = Counter()
+    drags = []
+    for name in sorted(os.listdir(folder)):
+        with open(os.path.join(folder, name), 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+        for event in metadata["events"]:
+            event_type = event["type"]
+            if event_type in ("leftClick", "rightClick", "doubleClick"):
+                clicks += 1
+            elif event_type in ("keyPress", "keyLongPress"):
+                keystrokes += 1
+            elif event_type == "hotkey":
+                keystrokes += 1
+                hotkeys[event["hotkey"]] += 1
+            elif event_type == "input":
+                keystrokes += len(event["keys"])
+            elif event_type == "drag":
+                drags.append(math.hypot(event["end"]["x"] - event["start"]["x"],
+                                        event["end"]["y"] - event["start"]["y"]))
+    return clicks, keystrokes, dict(hotkeys), sorted(drags)
+
+
+def vector_stats(folder):
+    """Потоковое чтение в массивы NumPy и векторные показатели"""
+    table = merge_tables(load_folder(folder))
+    return (int(table.clicks_per_minute().sum()), int(table.keystrokes_per_minute().sum()),
+            table.hotkey_frequency(), sorted(table.drag_distances().tolist()))
+
+
+def measure(func, folder):
+    """Возвращает время, пик выделенной памяти и результат"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = func(folder)
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Потоковая аналитика метаданных против json.load")
+    parser.add_argument("--files", type=int, default=3, help="Количество записей в папке")
+    parser.add_argument("--events", type=int, default=100000, help="Событий в каждой записи")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as folder:
+        for index in range(args.files):
+            metadata = generate_metadata(args.events, seed=index + 1)
+            with open(os.path.join(folder, f"screencaster_{index}.json"), 'w', encoding='utf-8') as f:
+                json.dump(metadata, f, ensure_ascii=False, indent=2)
+        size = sum(os.path.getsize(os.path.join(folder, n)) for n in os.listdir(folder))
+
+        naive_time, naive_peak, naive = measure(naive_stats, folder)
+        vector_time, vector_peak, vector = measure(vector_stats, folder)
+
+    print(f"Записей: {args.files}, событий: {args.files * args.events}, объем {size / 1e6:.1f} МБ")
+    print(f"json.load и циклы:       {naive_time:7.2f} с, пик памяти {naive_peak / 1e6:8.1f} МБ")
+    print(f"Поток и NumPy:           {vector_time:7.2f} с, пик памяти {vector_peak / 1e6:8.1f} МБ")
+
+    same = (naive[:3] == vector[:3] and len(naive[3]) == len(vector[3])
+            and np.allclose(naive[3], vector[3]))
+    if not same:
+        print("Ошибка: показатели расходятся с расчетом по json.load")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+import os
+import sys
+import json
+import time
+import resource
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+from src.analytics.autozoom import AutoZoomRenderer
+
+
+def write_sample(folder, width, height, fps, seconds):
+    """Синтетическая запись: видео с сеткой и метаданные с кликами и вводом текста"""
+    video_file = os.path.join(folder, "screencaster_sample.mp4")
+    writer = cv2.VideoWriter(video_file, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    frame = np.zeros((height, width, 3), dtype=np.uint8)
+    frame[::40] = 200
+    frame[:, ::40] = 200
+    for index in range(int(fps * seconds)):
+        frame[:40, :200] = index % 256
+        writer.write(frame)
+    writer.release()
+
+    rng = np.random.default_rng(1)
+    events = []
+    for t in np.arange(1.0, seconds, 4.0):
+        events.append({"type": "leftClick", "time": round(float(t), 3),
+                       "x": int(rng.integers(0, width)), "y": int(rng.integers(0, height))})
+        events.append({"type": "input", "time": round(float(t) + 0.5, 3), "duration": 1.0})
+    with open(os.path.join(folder, "screencaster_sample.json"), 'w', encoding='utf-8') as f:
+        json.dump({"version": "1.0", "screen": {"width": width, "height": height}, "fps": fps,
+                   "events": events, "recordingDuration": seconds}, f)
+    return video_file
+
+
+def peak_rss_mb():
+    """Пик памяти процесса и дочерних процессов, МБ (ru_maxrss в КБ в Linux)"""
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return own / 1024, children / 1024
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Автоприближение: скорость и память потоковой обработки")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--fps", type=int, default=25)
+    parser.add_argument("--seconds", type=float, default=60, help="Длительность синтетического видео")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as folder:
+        video_file = write_sample(folder, args.width, args.height, args.fps, args.seconds)
+        frames = int(args.fps * args.seconds)
+        raw_mb = frames * args.width * args.height * 3 / 1e6
+        print(f"Видео {args.width}x{args.height}, {frames} кадров ({raw_mb:.0f} МБ без сжатия)")
+
+        ok = True
+        for workers in sorted({1, args.workers}):
+            renderer = AutoZoomRenderer(workers=workers, chunk_seconds=args.seconds / max(workers, 1))
+            output_file = os.path.join(folder, f"zoom_{workers}.mp4")
+            started = time.perf_counter()
+            summary = renderer.render(video_file, output_file=output_file)
+            elapsed = time.perf_counter() - started
+            own, children = peak_rss_mb()
+            print(f"Процессов: {workers}: {elapsed:.1f} с ({summary['frames'] / elapsed:.0f} кадров/с), "
+                  f"пик памяти {own:.0f} МБ, в процессе пула {children:.0f} МБ")
+            if summary["frames"] != frames:
+                print(f"Ошибка: записано {summary['frames']} кадров из {frames}")
+                ok = False
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
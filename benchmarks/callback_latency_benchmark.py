@@ -0,0 +1,95 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pynput import keyboard, mouse
+from src.recorder.metadata_collector import MetadataCollector
+
+TEXT = "the quick brown fox jumps over the lazy dog"
+
+
+def input_sequence(count):
+    """Синтетический поток событий слушателей: набор текста, клики и прокрутка"""
+    sequence = []
+    for i in range(count):
+        char = TEXT[i % len(TEXT)]
+        key = keyboard.Key.space if char == " " else keyboard.KeyCode.from_char(char)
+        sequence.append(("press", (key,)))
+        sequence.append(("release", (key,)))
+        if i % 50 == 49:
+            sequence.append(("click", (100 + i % 300, 200, mouse.Button.left, True)))
+            sequence.append(("click", (100 + i % 300, 200, mouse.Button.left, False)))
+            sequence.append(("scroll", (100, 200, 0, -1)))
+    return sequence
+
+
+def run(sequence, queued):
+    """
+    Прогоняет поток событий через сборщик и возвращает задержки колбэков (нс) и
+    типы собранных событий. queued=False воспроизводит прежнюю схему, в которой
+    классификация выполнялась прямо в потоке слушателя.
+    """
+    collector = MetadataCollector()
+    collector.auto_detect_fps = False
+    with tempfile.TemporaryDirectory() as folder:
+        collector.start_collection(os.path.join(folder, "benchmark.json"))
+        if queued:
+            callbacks = {
+                "press": collector._on_key_press,
+                "release": collector._on_key_release,
+                "click": collector._on_mouse_click,
+                "scroll": collector._on_scroll,
+            }
+        else:
+            def inline(handler):
+                return lambda *args: handler(*args, collector._get_current_timestamp())
+            callbacks = {
+                "press": inline(collector._handle_key_press),
+                "release": inline(collector._handle_key_release),
+                "click": inline(collector._handle_mouse_click),
+                "scroll": inline(collector._handle_scroll),
+            }
+
+        latencies = []
+        for kind, args in sequence:
+            started = time.perf_counter_ns()
+            callbacks[kind](*args)
+            latencies.append(time.perf_counter_ns() - started)
+        collector.stop_collection()
+        types = [event["type"] for event in collector.get_events()]
+    return latencies, types
+
+
+def describe(name, latencies):
+    ordered = sorted(latencies)
+    p99 = ordered[int(len(ordered) * 0.99) - 1]
+    print(f"{name:<26} среднее {statistics.mean(ordered) / 1000:7.2f} мкс, "
+          f"p99 {p99 / 1000:7.2f} мкс, максимум {ordered[-1] / 1000:8.2f} мкс")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Задержка колбэков слушателей pynput")
+    parser.add_argument("--keys", type=int, default=20000, help="Количество нажатий клавиш")
+    args = parser.parse_args(argv)
+
+    sequence = input_sequence(args.keys)
+    inline_latencies, inline_types = run(sequence, queued=False)
+    queued_latencies, queued_types = run(sequence, queued=True)
+
+    print(f"Событий слушателей:        {len(sequence)}")
+    describe("Разбор в колбэке:", inline_latencies)
+    describe("Очередь:", queued_latencies)
+
+    if inline_types != queued_types:
+        print("Ошибка: при разборе через очередь собраны другие события")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
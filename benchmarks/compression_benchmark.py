@@ -0,0 +1,98 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.event_samples import generate_metadata
+from src.recorder.compression import EXTENSIONS, ZSTD, check_compression
+from src.recorder.metadata_io import (EventStreamWriter, load_metadata, read_journal,
+                                      write_json_atomic)
+
+
+def available_compressions():
+    """Способы сжатия, доступные в текущем окружении"""
+    result = []
+    for compression in EXTENSIONS:
+        try:
+            check_compression(compression)
+        except RuntimeError:
+            continue
+        result.append(compression)
+    return result
+
+
+def write_final(path, metadata, level):
+    """Итоговый файл метаданных"""
+    write_json_atomic(path, metadata, level=level)
+
+
+def write_journal(path, metadata, compression, level):
+    """Журнал, который пишется во время записи (групповая фиксация без fsync)"""
+    writer = EventStreamWriter(path, {k: v for k, v in metadata.items() if k != "events"},
+                               commit_interval=None, sync=False,
+                               compression=compression, level=level)
+    for index, event in enumerate(metadata["events"]):
+        writer.append(event)
+        if index % 256 == 255:
+            writer.flush()
+    writer.close({"recordingDuration": metadata["recordingDuration"]})
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - started, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сжатие метаданных: степень сжатия и скорость записи")
+    parser.add_argument("--events", type=int, default=100000, help="Количество событий")
+    parser.add_argument("--gzip-levels", default="1,6,9", help="Уровни gzip через запятую")
+    parser.add_argument("--zstd-levels", default="1,3,9", help="Уровни zstd через запятую")
+    args = parser.parse_args(argv)
+
+    metadata = generate_metadata(args.events)
+    expected = json.loads(json.dumps(metadata))
+    levels = {"gzip": args.gzip_levels, ZSTD: args.zstd_levels}
+    variants = [(None, None)]
+    for compression in available_compressions():
+        variants += [(compression, int(level)) for level in levels[compression].split(",")]
+    if ZSTD not in available_compressions():
+        print("Пакет zstandard не установлен, zstd пропущен")
+
+    ok = True
+    with tempfile.TemporaryDirectory() as folder:
+        baseline = None
+        print(f"{'Формат':<18} {'Размер, МБ':>11} {'Сжатие':>7} {'Запись, МБ/с':>13} "
+              f"{'Журнал, МБ':>11} {'Журнал, МБ/с':>13} {'Чтение, мс':>11}")
+        for compression, level in variants:
+            suffix = EXTENSIONS[compression] if compression else ""
+            final_path = os.path.join(folder, "metadata.json" + suffix)
+            journal_path = os.path.join(folder, "metadata.jsonl" + suffix)
+
+            write_time, _ = timed(write_final, final_path, metadata, level)
+            journal_time, _ = timed(write_journal, journal_path, metadata, compression, level)
+            read_time, loaded = timed(load_metadata, final_path)
+            size = os.path.getsize(final_path)
+            journal_size = os.path.getsize(journal_path)
+            if baseline is None:
+                # Текущий формат: JSON с отступами, его объем - основа для сравнения
+                baseline = size
+            raw_size = baseline / 1e6
+
+            label = "JSON (indent=2)" if compression is None else f"{compression} {level}"
+            print(f"{label:<18} {size / 1e6:11.2f} {baseline / size:6.1f}x {raw_size / write_time:13.1f} "
+                  f"{journal_size / 1e6:11.2f} {raw_size / journal_time:13.1f} {read_time * 1000:11.1f}")
+
+            if loaded != expected or read_journal(journal_path)["events"] != expected["events"]:
+                print(f"Ошибка: {label} восстановил метаданные с потерями")
+                ok = False
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+import io
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.event_samples import generate_metadata
+from src.recorder.binary_events import BinaryEventReader, BinaryEventWriter
+
+
+def encode_binary(metadata):
+    stream = io.BytesIO()
+    header = {k: v for k, v in metadata.items() if k != "events"}
+    writer = BinaryEventWriter(stream, header)
+    for event in metadata["events"]:
+        writer.write(event)
+    writer.close()
+    return stream.getvalue()
+
+
+def decode_binary(data):
+    return list(BinaryEventReader(io.BytesIO(data)))
+
+
+def best_of(runs, func, *args):
+    """Возвращает лучшее время выполнения и результат"""
+    best = None
+    result = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сравнение размера и скорости разбора форматов метаданных")
+    parser.add_argument("--events", type=int, default=100000, help="Количество событий")
+    parser.add_argument("--runs", type=int, default=3, help="Количество повторов")
+    args = parser.parse_args(argv)
+
+    metadata = generate_metadata(args.events)
+    json_data = json.dumps(metadata, ensure_ascii=False, indent=2).encode("utf-8")
+    jsonl_data = "".join(json.dumps(e, ensure_ascii=False, separators=(",", ":")) + "\n"
+                         for e in metadata["events"]).encode("utf-8")
+
+    encode_time, binary_data = best_of(args.runs, encode_binary, metadata)
+    json_parse_time, _ = best_of(args.runs, json.loads, json_data)
+    binary_parse_time, events = best_of(args.runs, decode_binary, binary_data)
+
+    if events != metadata["events"]:
+        print("Ошибка: бинарный формат восстановил события с потерями")
+        return 1
+
+    print(f"Событий:                   {args.events}")
+    print(f"JSON (indent=2):           {len(json_data) / 1e6:8.2f} МБ, разбор {json_parse_time * 1000:8.1f} мс")
+    print(f"JSON Lines:                {len(jsonl_data) / 1e6:8.2f} МБ")
+    print(f"Бинарный (.scev):          {len(binary_data) / 1e6:8.2f} МБ, разбор {binary_parse_time * 1000:8.1f} мс, "
+          f"кодирование {encode_time * 1000:.1f} мс")
+    print(f"Сжатие относительно JSON:  {len(json_data) / len(binary_data):.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.event_samples import generate_events
+from src.recorder.event_pipeline import EventPipeline, TypeFilter, TextRedactor
+
+
+class SlowSink:
+    """Медленный этап (например, экспорт по сети): фиксированная задержка на пачку и на событие"""
+
+    def __init__(self, batch_ms, event_us):
+        self.batch_ms = batch_ms
+        self.event_us = event_us
+        self.name = "slow-sink"
+        self.received = []
+
+    def process(self, events):
+        time.sleep(self.batch_ms / 1000 + len(events) * self.event_us / 1e6)
+        self.received.extend(event["id"] for event in events)
+
+
+def run_inline(processors, event):
+    """Прежний способ: обработчики вызываются для каждого события в потоке сборщика"""
+    batch = [dict(event)]
+    for processor in processors:
+        result = processor.process(batch)
+        if result is not None:
+            batch = result
+        if not batch:
+            break
+
+
+def submit_cost(events, submit, rate):
+    """Среднее и максимальное время передачи события в потоке «сборщика», мкс"""
+    interval_ns = int(1e9 / rate)
+    total_ns = 0
+    max_ns = 0
+    started = time.perf_counter_ns()
+    for index, event in enumerate(events):
+        deadline = started + index * interval_ns
+        while time.perf_counter_ns() < deadline:
+            time.sleep(0)
+        begin = time.perf_counter_ns()
+        submit(event)
+        elapsed = time.perf_counter_ns() - begin
+        total_ns += elapsed
+        if elapsed > max_ns:
+            max_ns = elapsed
+    return total_ns / len(events) / 1000, max_ns / 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Стоимость конвейера обработчиков для потока обработки событий")
+    parser.add_argument("--events", type=int, default=20000, help="Количество событий")
+    parser.add_argument("--rate", type=float, default=10000.0, help="Событий в секунду")
+    parser.add_argument("--batch-ms", type=float, default=5.0, help="Задержка медленного этапа на пачку, мс")
+    parser.add_argument("--event-us", type=float, default=20.0, help="Задержка медленного этапа на событие, мкс")
+    parser.add_argument("--budget-us", type=float, default=20.0,
+                        help="Допустимое среднее время submit() в потоке обработки, мкс")
+    args = parser.parse_args(argv)
+
+    events = generate_events(args.events)
+
+    # Без конвейера: фильтр, скрытие текста и медленный этап для каждого события
+    inline = [TypeFilter(["scroll"], exclude=True), TextRedactor(), SlowSink(args.batch_ms, args.event_us)]
+    inline_events = events[:min(len(events), 200)]
+    inline_mean, inline_max = submit_cost(inline_events, lambda event: run_inline(inline, event), args.rate)
+
+    sink = SlowSink(args.batch_ms, args.event_us)
+    pipeline = EventPipeline(seal_delay=0.05, max_delay=0.02)
+    pipeline.add_stage(TypeFilter(["scroll"], exclude=True))
+    pipeline.add_stage(TextRedactor())
+    pipeline.add_stage(sink, threaded=True)
+    pipeline.start()
+    mean_us, max_us = submit_cost(events, pipeline.submit, args.rate)
+    stopping = time.perf_counter()
+    pipeline.stop()
+    drain_ms = (time.perf_counter() - stopping) * 1000
+    stats = pipeline.stats()
+
+    expected = [event["id"] for event in events if event["type"] != "scroll"]
+    print(f"{len(events)} событий, {args.rate:g} в секунду")
+    print(f"Обработчики в потоке сборщика ({len(inline_events)} событий): "
+          f"{inline_mean:.1f} мкс на событие, максимум {inline_max:.1f} мкс")
+    print(f"Конвейер, submit(): {mean_us:.2f} мкс на событие, максимум {max_us:.1f} мкс; "
+          f"остановка {drain_ms:.0f} мс")
+    for stage in stats["stages"]:
+        print(f"  {stage['name']}{' (поток)' if stage['threaded'] else ''}: пачек {stage['batches']}, "
+              f"событий {stage['events']} -> {stage['output']}, {stage['meanBatchMs']:.3f} мс на пачку, "
+              f"{stage['perEventUs']:.2f} мкс на событие, максимум {stage['maxBatchMs']:.3f} мс")
+    if sink.received != expected:
+        print("Ошибка: медленный этап получил не все события или в другом порядке")
+        return 1
+    if mean_us > args.budget_us:
+        print(f"Превышен бюджет {args.budget_us} мкс")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
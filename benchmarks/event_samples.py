@@ -0,0 +1,107 @@
+import random
+from src.recorder.trajectory import encode_path
+
+# Генератор синтетических событий в формате MetadataCollector для бенчмарков
+
+KEYS = [("a", "KeyA", 65), ("b", "KeyB", 66), ("c", "KeyC", 67), ("e", "KeyE", 69),
+        ("s", "KeyS", 83), ("t", "KeyT", 84), (" ", "Space", 32), ("1", "Digit1", 49)]
+MODIFIERS = [("Control", "ControlLeft", 17), ("Shift", "ShiftLeft", 16), ("Alt", "AltLeft", 18)]
+
+
+def _event_id(rng):
+    return "%04x" % rng.randrange(0x10000)
+
+
+def _keys(rng):
+    if rng.random() < 0.8:
+        return None, None, None
+    chosen = rng.sample(MODIFIERS, rng.randint(1, 2))
+    return [k[0] for k in chosen], [k[1] for k in chosen], [k[2] for k in chosen]
+
+
+def _path(rng, t, x, y, end, x2, y2):
+    """Упрощенная траектория от (x, y) до (x2, y2): путь [dt_мс, dx, dy, ...], как у сборщика"""
+    steps = rng.randint(2, 12)
+    points = [(t, x, y)]
+    for i in range(1, steps):
+        share = i / steps
+        points.append((round(t + (end - t) * share, 3),
+                       int(x + (x2 - x) * share) + rng.randint(-30, 30),
+                       int(y + (y2 - y) * share) + rng.randint(-30, 30)))
+    points.append((end, x2, y2))
+    return encode_path(points)
+
+
+def generate_events(count, seed=1):
+    """Возвращает список событий, похожий на реальную длинную сессию"""
+    rng = random.Random(seed)
+    events = []
+    t = 0.0
+    for _ in range(count):
+        t = round(t + rng.uniform(0.05, 1.5), 3)
+        kind = rng.random()
+        if kind < 0.3:
+            key, code, key_code = rng.choice(KEYS)
+            events.append({"id": _event_id(rng), "type": "keyPress", "time": t,
+                           "key": key, "code": code, "keyCode": key_code})
+        elif kind < 0.45:
+            keys, codes, key_codes = _keys(rng)
+            events.append({"id": _event_id(rng), "type": rng.choice(["leftClick", "rightClick", "doubleClick"]),
+                           "time": t, "x": rng.randrange(1920), "y": rng.randrange(1080),
+                           "keys": keys, "codes": codes, "keyCodes": key_codes})
+        elif kind < 0.55:
+            keys, codes, key_codes = _keys(rng)
+            x, y = rng.randrange(1920), rng.randrange(1080)
+            x2, y2 = rng.randrange(1920), rng.randrange(1080)
+            end = round(t + rng.uniform(0.1, 2.0), 3)
+            events.append({"id": _event_id(rng), "type": "drag", "time": t, "startTime": t, "endTime": end,
+                           "x": x, "y": y, "start": {"x": x, "y": y, "time": t},
+                           "end": {"x": x2, "y": y2, "time": end}, "duration": round(end - t, 3),
+                           "keys": keys, "codes": codes, "keyCodes": key_codes,
+                           "path": _path(rng, t, x, y, end, x2, y2)})
+        elif kind < 0.65:
+            x, y = rng.randrange(1920), rng.randrange(1080)
+            x2, y2 = rng.randrange(1920), rng.randrange(1080)
+            end = round(t + rng.uniform(0.1, 1.5), 3)
+            events.append({"id": _event_id(rng), "type": "mouseMove", "time": t,
+                           "duration": round(end - t, 3), "x": x, "y": y,
+                           "path": _path(rng, t, x, y, end, x2, y2)})
+        elif kind < 0.77:
+            amount = rng.choice([-1, 1]) * rng.randint(1, 20)
+            x, y = rng.randrange(1920), rng.randrange(1080)
+            end = round(t + rng.uniform(0.1, 2.0), 3)
+            events.append({"id": _event_id(rng), "type": "scroll", "time": t, "startTime": t, "endTime": end,
+                           "start": {"x": x, "y": y, "time": t}, "end": {"x": x, "y": y, "time": end},
+                           "scrollAmount": amount, "direction": "up" if amount > 0 else "down",
+                           "duration": round(end - t, 3), "keys": None, "codes": None, "keyCodes": None})
+        elif kind < 0.85:
+            mod = MODIFIERS[0]
+            key = rng.choice(KEYS[:5])
+            events.append({"id": _event_id(rng), "type": "hotkey", "time": t,
+                           "hotkey": f"Ctrl+{key[0].upper()}",
+                           "keys": [mod[0], key[0].upper()], "codes": [mod[1], key[1]],
+                           "keyCodes": [mod[2], key[2]]})
+        else:
+            typed = [rng.choice(KEYS) for _ in range(rng.randint(2, 40))]
+            # Маски модификаторов клавиш: изредка Shift (2) или CapsLock (16)
+            modifiers = [rng.choice((0, 0, 0, 0, 0, 0, 2, 16)) for _ in typed]
+            duration = round(len(typed) * rng.uniform(0.08, 0.2), 3)
+            events.append({"id": _event_id(rng), "type": "input", "time": t, "duration": duration,
+                           "keys": [k[0] for k in typed], "codes": [k[1] for k in typed],
+                           "keyCodes": [k[2] for k in typed],
+                           "modifiers": modifiers, "length": len(typed),
+                           "value": "".join(k[0] for k in typed), "reason": "Enter"})
+            t = round(t + duration, 3)
+    return events
+
+
+def generate_metadata(count, seed=1):
+    """Возвращает метаданные сессии с синтетическими событиями"""
+    events = generate_events(count, seed)
+    return {
+        "version": "1.0",
+        "recordingDuration": events[-1]["time"] if events else 0,
+        "screen": {"width": 1920, "height": 1080},
+        "fps": 25,
+        "events": events,
+    }
@@ -0,0 +1,85 @@
+import os
+import sys
+import time
+import socket
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.event_samples import generate_events
+from src.recorder.event_stream import DROP_POLICIES, DROP_OLDEST, EventPublisher, EventStreamClient
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Задержка живого потока событий и сброс для медленного подписчика")
+    parser.add_argument("--events", type=int, default=20000, help="Количество событий")
+    parser.add_argument("--rate", type=float, default=5000.0, help="Событий в секунду")
+    parser.add_argument("--buffer", type=int, default=256, help="Емкость очереди подписчика")
+    parser.add_argument("--policy", choices=DROP_POLICIES, default=DROP_OLDEST)
+    parser.add_argument("--budget-us", type=float, default=200.0,
+                        help="Допустимое среднее время publish() в потоке обработки, мкс")
+    args = parser.parse_args(argv)
+
+    events = generate_events(args.events)
+    publisher = EventPublisher("127.0.0.1:0", args.buffer, args.policy)
+    publisher.start()
+
+    # Быстрый подписчик читает все кадры, медленный не читает вовсе
+    fast = EventStreamClient(publisher.address, timeout=1.0)
+    slow = socket.create_connection(publisher.address)
+    slow.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    time.sleep(0.3)
+
+    latencies = []
+
+    def read_fast():
+        while len(latencies) < args.events and not fast.closed:
+            frames, received_ns = fast.receive()
+            latencies.extend(received_ns - frame["sourceNs"] for frame in frames)
+
+    reader = threading.Thread(target=read_fast, daemon=True)
+    reader.start()
+
+    interval_ns = int(1e9 / args.rate)
+    publish_ns = 0
+    started = time.perf_counter_ns()
+    for index, event in enumerate(events):
+        deadline = started + index * interval_ns
+        while time.perf_counter_ns() < deadline:
+            time.sleep(0)
+        source_ns = time.perf_counter_ns()
+        publisher.publish(event, source_ns)
+        publish_ns += time.perf_counter_ns() - source_ns
+    reader.join(5)
+
+    stats = publisher.stats()
+    publisher.stop()
+    fast.close()
+    slow.close()
+
+    publish_us = publish_ns / len(events) / 1000
+    print(f"{len(events)} событий, {args.rate:g} в секунду, очередь {args.buffer}, политика {args.policy}")
+    print(f"publish() в потоке обработки: {publish_us:.1f} мкс на событие")
+    if latencies:
+        print(f"Быстрый подписчик: получено {len(latencies)}, задержка медиана "
+              f"{percentile(latencies, 0.5) / 1e6:.3f} мс, p95 {percentile(latencies, 0.95) / 1e6:.3f} мс")
+    for client in stats["clients"]:
+        print(f"Подписчик {client['address']}: отправлено {client['sent']}, сброшено {client['dropped']}, "
+              f"{'отключен' if client['closed'] else 'подключен'}")
+    if len(latencies) < len(events):
+        print("Ошибка: быстрый подписчик получил не все события")
+        return 1
+    if publish_us > args.budget_us:
+        print(f"Превышен бюджет {args.budget_us} мкс")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
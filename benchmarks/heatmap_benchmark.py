@@ -0,0 +1,89 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from benchmarks.event_samples import generate_metadata
+from src.analytics.event_stats import events_to_table
+from src.analytics.heatmap import CELL_SIZE, HeatmapRenderer, gaussian_kernel, render_folder
+
+SCREEN = {"width": 1920, "height": 1080}
+
+
+def naive_density(events, sigma, cell=CELL_SIZE):
+    """Прежний подход: отпечаток двумерного ядра Гаусса для каждого события в цикле"""
+    width, height = -(-SCREEN["width"] // cell), -(-SCREEN["height"] // cell)
+    grid = np.zeros((height, width))
+    kernel = gaussian_kernel(sigma / cell)
+    stamp = np.outer(kernel, kernel)
+    radius = len(kernel) // 2
+    points = []
+    for event in events:
+        if event["type"] in ("leftClick", "rightClick", "doubleClick"):
+            points.append((event["x"], event["y"]))
+        elif event["type"] == "drag":
+            points.append((event["start"]["x"], event["start"]["y"]))
+            points.append((event["end"]["x"], event["end"]["y"]))
+    for x, y in points:
+        cx, cy = x // cell, y // cell
+        top, bottom = max(cy - radius, 0), min(cy + radius + 1, height)
+        left, right = max(cx - radius, 0), min(cx + radius + 1, width)
+        grid[top:bottom, left:right] += stamp[top - cy + radius:bottom - cy + radius,
+                                              left - cx + radius:right - cx + radius]
+    return grid
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Тепловые карты: векторный расчет и пул процессов")
+    parser.add_argument("--events", type=int, default=200000, help="Событий в записи для расчета плотности")
+    parser.add_argument("--sessions", type=int, default=200, help="Количество записей в папке")
+    parser.add_argument("--session-events", type=int, default=2000, help="Событий в каждой записи папки")
+    parser.add_argument("--sigma", type=float, default=24.0, help="Радиус размытия в пикселях")
+    parser.add_argument("--workers", type=int, help="Процессов в пуле (по умолчанию по числу ядер)")
+    args = parser.parse_args(argv)
+
+    metadata = generate_metadata(args.events)
+    metadata["screen"] = SCREEN
+    table = events_to_table(metadata["events"], header=metadata)
+    renderer = HeatmapRenderer(sigma=args.sigma)
+
+    started = time.perf_counter()
+    expected = naive_density(metadata["events"], args.sigma)
+    naive_time = time.perf_counter() - started
+    started = time.perf_counter()
+    density = renderer.density(table)
+    vector_time = time.perf_counter() - started
+    print(f"Плотность {args.events} событий: цикл {naive_time * 1000:.0f} мс, "
+          f"гистограмма и разделимое размытие {vector_time * 1000:.0f} мс")
+    ok = np.allclose(density, expected)
+    if not ok:
+        print("Ошибка: векторная плотность расходится с расчетом в цикле")
+
+    with tempfile.TemporaryDirectory() as folder:
+        for index in range(args.sessions):
+            session = generate_metadata(args.session_events, seed=index + 1)
+            session["screen"] = SCREEN
+            with open(os.path.join(folder, f"screencaster_{index:05d}.json"), 'w', encoding='utf-8') as f:
+                json.dump(session, f, ensure_ascii=False)
+        output = os.path.join(folder, "heatmaps")
+        for workers in (1, args.workers):
+            started = time.perf_counter()
+            results = render_folder(folder, output, workers=workers, sigma=args.sigma)
+            elapsed = time.perf_counter() - started
+            label = "один процесс" if workers == 1 else f"пул ({workers or os.cpu_count()} процессов)"
+            print(f"{args.sessions} записей, {label}: {elapsed:.2f} с "
+                  f"({args.sessions / elapsed:.0f} записей/с)")
+            errors = [r for r in results if "error" in r]
+            if errors or len(results) != args.sessions:
+                print(f"Ошибка: не построено карт: {len(errors) or args.sessions - len(results)}")
+                ok = False
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
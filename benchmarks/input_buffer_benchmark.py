@@ -0,0 +1,76 @@
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.recorder.input_buffer import InputBuffer
+
+
+def legacy_value(codes):
+    """Прежняя сборка текста в конце ввода: повтор всех нажатий со срезами строки"""
+    value = ""
+    for code in codes:
+        if code == "Backspace":
+            if value:
+                value = value[:-1]
+        elif code == "Space":
+            value += " "
+        elif code.startswith("Key"):
+            value += code[3:].lower()
+        elif code.startswith("Digit"):
+            value += code[5:]
+    return value
+
+
+def typing_codes(count):
+    """Набор текста с исправлениями: каждое десятое нажатие - Backspace"""
+    text = "the quick brown fox jumps over 13 lazy dogs "
+    codes = []
+    for i in range(count):
+        char = text[i % len(text)]
+        if i % 10 == 9:
+            codes.append("Backspace")
+        elif char == " ":
+            codes.append("Space")
+        elif char.isdigit():
+            codes.append("Digit" + char)
+        else:
+            codes.append("Key" + char.upper())
+    return codes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сборка текста ввода: повтор нажатий и буфер с кареткой")
+    parser.add_argument("--keys", type=int, default=200000, help="Количество нажатий в одном вводе")
+    args = parser.parse_args(argv)
+
+    codes = typing_codes(args.keys)
+
+    started = time.perf_counter()
+    expected = legacy_value(codes)
+    legacy_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    buffer = InputBuffer()
+    for code in codes:
+        buffer.press(code, None, 0)
+    press_time = time.perf_counter() - started
+    started = time.perf_counter()
+    value = buffer.value
+    finish_time = time.perf_counter() - started
+
+    if value != expected:
+        print("Ошибка: текст буфера не совпадает с прежней сборкой")
+        return 1
+    print(f"Нажатий: {len(codes)}, длина текста: {len(value)}")
+    # Прежняя сборка целиком выполняется при завершении ввода в потоке обработки событий
+    print(f"Завершение ввода, повтор нажатий: {legacy_time * 1000:9.1f} мс")
+    print(f"Завершение ввода, буфер:          {finish_time * 1000:9.1f} мс")
+    print(f"Буфер по мере нажатий:            {press_time / len(codes) * 1e9:9.0f} нс на нажатие")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+import io
+import os
+import sys
+import time
+import argparse
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pynput import keyboard
+from benchmarks.legacy_key_mapping import LegacyKeyMapping
+from src.recorder.key_translation import KEY_CODE_MAP, KEY_MAP, KeyTranslator
+
+
+def sample_keys():
+    """
+    Клавиши для проверки: все Key, символы, виртуальные коды и нестандартные
+    значения. Пустой KeyCode() не входит: pynput не может получить его repr
+    и хэш, а слушатель такие клавиши не передает.
+    """
+    keys = list(keyboard.Key)
+    keys += [keyboard.KeyCode.from_char(chr(i)) for i in range(1, 0x500)]
+    keys += [keyboard.KeyCode.from_vk(vk) for vk in range(0, 256)]
+    keys += ["Key05", "key26", "Key27", "alt"]
+    return keys
+
+
+def typing_stream(count):
+    """Поток нажатий, похожий на набор текста с модификаторами"""
+    text = "Hello, world! The quick brown fox jumps over 13 lazy dogs."
+    keys = []
+    for i in range(count):
+        char = text[i % len(text)]
+        keys.append(keyboard.Key.space if char == " " else keyboard.KeyCode.from_char(char))
+        if i % 20 == 0:
+            keys.append(keyboard.Key.shift)
+        if i % 97 == 0:
+            keys.append(keyboard.KeyCode.from_vk(100))
+    return keys
+
+
+def per_event_ns(func, keys, runs):
+    best = None
+    for _ in range(runs):
+        started = time.perf_counter_ns()
+        for key in keys:
+            func(key)
+        elapsed = (time.perf_counter_ns() - started) / len(keys)
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Стоимость перевода клавиш pynput в коды DOM")
+    parser.add_argument("--events", type=int, default=200000, help="Количество нажатий")
+    parser.add_argument("--runs", type=int, default=5, help="Количество повторов")
+    args = parser.parse_args(argv)
+
+    # Проверка совпадения с прежним переводом (включая повторные обращения через кэш)
+    legacy = LegacyKeyMapping()
+    translator = KeyTranslator()
+    keys = sample_keys()
+    with contextlib.redirect_stdout(io.StringIO()):
+        expected = [legacy._map_key_to_code(key) for key in keys]
+        first = [translator.code(key) for key in keys]
+        cached = [translator.code(key) for key in keys]
+    mismatches = [(key, old, new) for key, old, new in zip(keys, expected, first) if old != new]
+    if mismatches or cached != first:
+        for key, old, new in mismatches[:20]:
+            print(f"Расхождение для {key!r}: было {old!r}, стало {new!r}")
+        print("Ошибка: перевод клавиш не совпадает с прежним")
+        return 1
+    # Таблицы числовых кодов и символьных представлений
+    for name, old, new in (("keyCode", legacy.key_code_map, KEY_CODE_MAP), ("key", legacy.key_map, KEY_MAP)):
+        if dict(new) != old:
+            changed = sorted(code for code in set(old) | set(new) if old.get(code) != new.get(code))
+            print(f"Ошибка: таблица {name} не совпадает с прежней: {changed[:20]}")
+            return 1
+    print(f"Проверено клавиш:          {len(keys)}, перевод совпадает")
+
+    stream = typing_stream(args.events)
+    legacy_time = per_event_ns(legacy._map_key_to_code, stream, args.runs)
+    table_time = per_event_ns(KeyTranslator()._translate, stream, args.runs)
+    cached_time = per_event_ns(translator.code, stream, args.runs)
+
+    print(f"Цепочка проверок:          {legacy_time:7.0f} нс на событие")
+    print(f"Таблицы без кэша:          {table_time:7.0f} нс на событие")
+    print(f"Таблицы с кэшем:           {cached_time:7.0f} нс на событие")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,306 @@
+from pynput import keyboard
+
+# Прежний перевод клавиш из MetadataCollector (до src/recorder/key_translation.py),
+# скопированный без изменений: эталон для проверки таблиц KeyTranslator в
+# benchmarks/key_translation_benchmark.py. Не изменять.
+
+
+class LegacyKeyMapping:
+    """Таблицы _init_key_mappings и цепочка проверок _map_key_to_code прежнего сборщика"""
+
+    def __init__(self):
+        self._init_key_mappings()
+
+    def _init_key_mappings(self):
+        """Инициализирует маппинги кодов клавиш согласно стандартным кодам JavaScript"""
+        # Маппинг специальных клавиш (code)
+        self.special_keys = {
+            keyboard.Key.enter: "Enter",
+            keyboard.Key.tab: "Tab",
+            keyboard.Key.space: "Space",
+            keyboard.Key.backspace: "Backspace",
+            keyboard.Key.esc: "Escape",
+            keyboard.Key.caps_lock: "CapsLock",
+            keyboard.Key.delete: "Delete",
+            keyboard.Key.insert: "Insert",
+            keyboard.Key.home: "Home",
+            keyboard.Key.end: "End",
+            keyboard.Key.page_up: "PageUp",
+            keyboard.Key.page_down: "PageDown",
+            keyboard.Key.up: "ArrowUp",
+            keyboard.Key.down: "ArrowDown",
+            keyboard.Key.left: "ArrowLeft",
+            keyboard.Key.right: "ArrowRight",
+            keyboard.Key.f1: "F1",
+            keyboard.Key.f2: "F2",
+            keyboard.Key.f3: "F3",
+            keyboard.Key.f4: "F4",
+            keyboard.Key.f5: "F5",
+            keyboard.Key.f6: "F6",
+            keyboard.Key.f7: "F7",
+            keyboard.Key.f8: "F8",
+            keyboard.Key.f9: "F9",
+            keyboard.Key.f10: "F10",
+            keyboard.Key.f11: "F11",
+            keyboard.Key.f12: "F12",
+            keyboard.Key.shift: "ShiftLeft",
+            keyboard.Key.shift_r: "ShiftRight",
+            keyboard.Key.ctrl: "ControlLeft",
+            keyboard.Key.ctrl_r: "ControlRight",
+            keyboard.Key.alt: "AltLeft",
+            keyboard.Key.alt_r: "AltRight",
+            keyboard.Key.cmd: "MetaLeft",
+            keyboard.Key.cmd_r: "MetaRight",
+            keyboard.Key.num_lock: "NumLock",
+            # Mac-специфичные клавиши
+            keyboard.Key.alt_gr: "AltGraph",
+        }
+        
+        # Маппинг символов согласно стандартным кодам (code)
+        self.symbol_codes = {
+            '!': "Digit1",
+            '@': "Digit2",
+            '#': "Digit3",
+            '$': "Digit4",
+            '%': "Digit5",
+            '^': "Digit6",
+            '&': "Digit7",
+            '*': "Digit8",
+            '(': "Digit9",
+            ')': "Digit0",
+            '_': "Minus",
+            '+': "Equal",
+            '-': "Minus",
+            '=': "Equal",
+            '"': "Quote",
+            "'": "Quote",
+            ':': "Semicolon",
+            ';': "Semicolon",
+            '?': "Slash",
+            '/': "Slash",
+            '>': "Period",
+            '.': "Period",
+            '<': "Comma",
+            ',': "Comma",
+            '~': "Backquote",
+            '`': "Backquote",
+            '|': "Backslash",
+            '\\': "Backslash",
+            '{': "BracketLeft",
+            '[': "BracketLeft",
+            '}': "BracketRight",
+            ']': "BracketRight",
+            '№': "Digit3"
+        }
+        
+        # Маппинг букв и цифр согласно стандартным кодам (code)
+        self.letter_codes = {}
+        for i in range(26):
+            char = chr(97 + i)  # a-z
+            self.letter_codes[char] = f"Key{char.upper()}"
+            self.letter_codes[char.upper()] = f"Key{char.upper()}"
+            
+        for i in range(10):
+            self.letter_codes[str(i)] = f"Digit{i}"
+            
+        # Маппинг кодов клавиш в числовые коды (keyCode)
+        self.key_code_map = {
+            "ControlLeft": 17, "ControlRight": 17,
+            "ShiftLeft": 16, "ShiftRight": 16,
+            "AltLeft": 18, "AltRight": 18,
+            "MetaLeft": 224, "MetaRight": 224,  # Обновлено для Mac
+            "AltGraph": 225,  # Добавлено для Mac
+            "Enter": 13, "Tab": 9, "Space": 32,
+            "Backspace": 8, "Escape": 27, "CapsLock": 20,
+            "Delete": 46, "Insert": 45,
+            "Home": 36, "End": 35, "PageUp": 33, "PageDown": 34,
+            "ArrowUp": 38, "ArrowDown": 40, "ArrowLeft": 37, "ArrowRight": 39,
+            "F1": 112, "F2": 113, "F3": 114, "F4": 115, "F5": 116, "F6": 117,
+            "F7": 118, "F8": 119, "F9": 120, "F10": 121, "F11": 122, "F12": 123,
+            "Minus": 189, "Equal": 187, "BracketLeft": 219, "BracketRight": 221,
+            "Semicolon": 186, "Quote": 222, "Backquote": 192, "Backslash": 220,
+            "Comma": 188, "Period": 190, "Slash": 191,
+            "NumLock": 144,
+            
+            # Добавляем коды для Numpad клавиш
+            "Numpad0": 96, "Numpad1": 97, "Numpad2": 98, "Numpad3": 99, "Numpad4": 100,
+            "Numpad5": 101, "Numpad6": 102, "Numpad7": 103, "Numpad8": 104, "Numpad9": 105,
+            "NumpadMultiply": 106, "NumpadAdd": 107, "NumpadSubtract": 109,
+            "NumpadDecimal": 110, "NumpadDivide": 111, "NumpadEnter": 13
+        }
+        
+        # Добавляем коды для букв A-Z (65-90)
+        for i in range(26):
+            char = chr(65 + i)  # A-Z
+            self.key_code_map[f"Key{char}"] = 65 + i
+            
+        # Добавляем коды для цифр 0-9 (48-57)
+        for i in range(10):
+            self.key_code_map[f"Digit{i}"] = 48 + i
+        
+        # Маппинг для key (символьное представление)
+        self.key_map = {
+            "ControlLeft": "Control", "ControlRight": "Control",
+            "ShiftLeft": "Shift", "ShiftRight": "Shift",
+            "AltLeft": "Alt", "AltRight": "Alt",
+            "MetaLeft": "Meta", "MetaRight": "Meta",
+            "AltGraph": "AltGraph",  # Добавлено для Mac
+            "Enter": "Enter", "Tab": "Tab", "Space": " ",
+            "Backspace": "Backspace", "Escape": "Escape", "CapsLock": "CapsLock",
+            "Delete": "Delete", "Insert": "Insert",
+            "Home": "Home", "End": "End", "PageUp": "PageUp", "PageDown": "PageDown",
+            "ArrowUp": "ArrowUp", "ArrowDown": "ArrowDown", "ArrowLeft": "ArrowLeft", "ArrowRight": "ArrowRight",
+            "F1": "F1", "F2": "F2", "F3": "F3", "F4": "F4", "F5": "F5", "F6": "F6",
+            "F7": "F7", "F8": "F8", "F9": "F9", "F10": "F10", "F11": "F11", "F12": "F12",
+            "Minus": "-", "Equal": "=", "BracketLeft": "[", "BracketRight": "]",
+            "Semicolon": ";", "Quote": "'", "Backquote": "`", "Backslash": "\\",
+            "Comma": ",", "Period": ".", "Slash": "/",
+            "NumLock": "NumLock",
+            
+            # Добавляем символы для Numpad клавиш
+            "Numpad0": "0", "Numpad1": "1", "Numpad2": "2", "Numpad3": "3", "Numpad4": "4",
+            "Numpad5": "5", "Numpad6": "6", "Numpad7": "7", "Numpad8": "8", "Numpad9": "9",
+            "NumpadMultiply": "*", "NumpadAdd": "+", "NumpadSubtract": "-",
+            "NumpadDecimal": ".", "NumpadDivide": "/", "NumpadEnter": "Enter"
+        }
+        
+        # Добавляем символы для букв A-Z
+        for i in range(26):
+            char = chr(65 + i)  # A-Z
+            self.key_map[f"Key{char}"] = char
+            
+        # Добавляем символы для цифр 0-9
+        for i in range(10):
+            self.key_map[f"Digit{i}"] = str(i)
+            
+        # Обратный маппинг для старых кодов клавиш
+        self.old_to_new_code = {
+            "enter": "Enter",
+            "tab": "Tab",
+            "space": "Space",
+            "backspace": "Backspace",
+            "esc": "Escape",
+            "caps_lock": "CapsLock",
+            "delete": "Delete",
+            "insert": "Insert",
+            "home": "Home",
+            "end": "End",
+            "page_up": "PageUp",
+            "page_down": "PageDown",
+            "up": "ArrowUp",
+            "down": "ArrowDown",
+            "left": "ArrowLeft",
+            "right": "ArrowRight",
+            "f1": "F1", "f2": "F2", "f3": "F3", "f4": "F4", "f5": "F5", "f6": "F6",
+            "f7": "F7", "f8": "F8", "f9": "F9", "f10": "F10", "f11": "F11", "f12": "F12",
+            "shift": "ShiftLeft", "shift_r": "ShiftRight",
+            "ctrl": "ControlLeft", "ctrl_r": "ControlRight",
+            "ctrl_l": "ControlLeft",  # Добавлено для обратной совместимости
+            "alt_l": "AltLeft", "alt_r": "AltRight",
+            "alt_gr": "AltGraph",  # Добавлено для Mac
+            "cmd": "MetaLeft", "cmd_r": "MetaRight",
+            "cmd_l": "MetaLeft",  # Добавлено для обратной совместимости
+            "option": "AltLeft",  # Добавлено для Mac (альтернативное название для Alt)
+            "option_r": "AltRight",  # Добавлено для Mac
+            "num_lock": "NumLock"
+        }
+        
+        # Добавляем маппинг для Key1-Key26 (A-Z)
+        for i in range(1, 27):
+            char = chr(64 + i)  # A-Z (ASCII 65-90)
+            self.old_to_new_code[f"Key{i}"] = f"Key{char}"
+        
+        self._key_mappings_ready = True
+
+    def _map_key_to_code(self, key):
+        """Преобразует клавишу в код клавиши согласно стандартным кодам JavaScript"""
+        try:
+            # Для специальных клавиш
+            if key in self.special_keys:
+                return self.special_keys[key]
+            
+            # Для обычных клавиш
+            if hasattr(key, 'char') and key.char:
+                char = key.char
+                
+                # Проверяем, есть ли символ в маппинге символов
+                if char in self.symbol_codes:
+                    return self.symbol_codes[char]
+                    
+                # Проверяем, есть ли символ в маппинге букв и цифр
+                if char in self.letter_codes:
+                    return self.letter_codes[char]
+                
+                # Если символ не найден в маппингах, используем ASCII код
+                return f"Key{ord(char)}"
+            
+            # Проверка на Mac-специфичные клавиши по vk-коду
+            if hasattr(key, 'vk'):
+                # Command key на Mac часто имеет vk=55 или vk=54
+                if key.vk == 55 or key.vk == 54:
+                    return "MetaLeft"
+                # Option key на Mac часто имеет vk=58
+                elif key.vk == 58:
+                    return "AltLeft"
+                # Правый Option key на Mac
+                elif key.vk == 61:
+                    return "AltRight"
+                # AltGraph key
+                elif key.vk == 225:
+                    return "AltGraph"
+                
+                # Проверка на Numpad клавиши
+                if 96 <= key.vk <= 105:  # Numpad 0-9
+                    return f"Numpad{key.vk - 96}"
+                elif key.vk == 106:
+                    return "NumpadMultiply"
+                elif key.vk == 107:
+                    return "NumpadAdd"
+                elif key.vk == 109:
+                    return "NumpadSubtract"
+                elif key.vk == 110:
+                    return "NumpadDecimal"
+                elif key.vk == 111:
+                    return "NumpadDivide"
+                elif key.vk == 144:
+                    return "NumLock"
+            
+            # Если ничего не подошло, возвращаем строковое представление
+            key_str = str(key).replace('Key.', '')
+            
+            # Проверка на key26
+            if key_str.lower() == 'key26':
+                return "KeyZ"  # Z - 26-я буква английского алфавита
+            
+            # Проверяем, есть ли в обратном маппинге
+            if key_str in self.old_to_new_code:
+                return self.old_to_new_code[key_str]
+            
+            # Проверка на специальные клавиши Mac
+            if key_str == 'cmd' or key_str == 'cmd_l':
+                return "MetaLeft"
+            elif key_str == 'cmd_r':
+                return "MetaRight"
+            elif key_str == 'option' or key_str == 'alt':
+                return "AltLeft"
+            elif key_str == 'option_r' or key_str == 'alt_r':
+                return "AltRight"
+            elif key_str == 'alt_gr':
+                return "AltGraph"
+            
+            # Проверка на нестандартные коды типа "Key26"
+            if key_str.startswith('Key') and key_str[3:].isdigit():
+                num = int(key_str[3:])
+                if 1 <= num <= 26:  # Если это число от 1 до 26
+                    # Преобразуем в стандартный код клавиши (A-Z)
+                    char = chr(64 + num)  # A=65, поэтому начинаем с 64+1
+                    return f"Key{char}"
+            
+            # Если ключ не найден в маппинге, возвращаем стандартный код
+            # вместо строкового представления
+            return key_str
+        
+        except Exception as e:
+            # Добавляем логирование ошибки для отладки
+            print(f"Error mapping key {key}: {e}")
+            return str(key)
@@ -0,0 +1,80 @@
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+from src.recorder.overlay import (CAPTION_ALPHA, CAPTION_FONT, CAPTION_SCALE, CAPTION_THICKNESS,
+                                  RIPPLE_COLORS, RIPPLE_DURATION, RIPPLE_RADIUS, EventOverlay)
+
+
+def naive_apply(frame, clicks, text, seconds):
+    """Прямолинейный способ: рисование на копии всего кадра и смешивание всего кадра"""
+    layer = frame.copy()
+    for x, y, started in clicks:
+        phase = (seconds - started) / RIPPLE_DURATION
+        if 0 <= phase < 1:
+            cv2.circle(layer, (x, y), int(RIPPLE_RADIUS * (0.3 + 0.7 * phase)),
+                       RIPPLE_COLORS["leftClick"], 3, cv2.LINE_AA)
+    height, width = frame.shape[:2]
+    cv2.putText(layer, text, (width // 3, height - 60), CAPTION_FONT, CAPTION_SCALE,
+                (255, 255, 255), CAPTION_THICKNESS, cv2.LINE_AA)
+    return cv2.addWeighted(layer, CAPTION_ALPHA, frame, 1 - CAPTION_ALPHA, 0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Затраты наложения кликов и клавиш на кадр")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--frames", type=int, default=300, help="Количество кадров")
+    parser.add_argument("--budget-ms", type=float, default=2.0,
+                        help="Допустимое среднее время наложения на кадр, мс")
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(1)
+    frame = rng.integers(0, 255, (args.height, args.width, 3), dtype=np.uint8)
+    overlay = EventOverlay()
+    text = "the quick brown fox jumps"
+    clicks = []
+
+    overlay_time = 0.0
+    naive_time = 0.0
+    for index in range(args.frames):
+        seconds = index / args.fps
+        # Клик каждые 0.2 с и нажатие клавиши каждые 0.1 с
+        if index % max(args.fps // 5, 1) == 0:
+            x, y = int(rng.integers(0, args.width)), int(rng.integers(0, args.height))
+            clicks.append((x, y, seconds))
+            overlay.on_event({"type": "leftClick", "time": seconds, "x": x, "y": y})
+        if index % max(args.fps // 10, 1) == 0:
+            overlay.on_event({"type": "keyPress", "time": seconds, "key": text[index % len(text)],
+                              "code": "KeyA"})
+        if index % args.fps == 0:
+            overlay.on_event({"type": "hotkey", "time": seconds, "hotkey": "Ctrl+S"})
+
+        target = frame.copy()
+        started = time.perf_counter()
+        overlay.apply(target, seconds)
+        overlay_time += time.perf_counter() - started
+
+        started = time.perf_counter()
+        naive_apply(frame, clicks[-5:], text, seconds)
+        naive_time += time.perf_counter() - started
+
+    overlay_ms = overlay_time / args.frames * 1000
+    naive_ms = naive_time / args.frames * 1000
+    print(f"Кадр {args.width}x{args.height}, {args.frames} кадров")
+    print(f"Наложение по областям со спрайтами: {overlay_ms:.3f} мс на кадр")
+    print(f"Рисование и смешивание всего кадра: {naive_ms:.3f} мс на кадр")
+    if overlay_ms > args.budget_ms:
+        print(f"Превышен бюджет {args.budget_ms} мс на кадр")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
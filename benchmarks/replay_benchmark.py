@@ -0,0 +1,76 @@
+import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.recorder.replay import ReplayEngine
+
+
+class NullMouse:
+    """Контроллер мыши без действий: измеряется только точность сроков"""
+
+    position = (0, 0)
+
+    def press(self, button):
+        pass
+
+    def release(self, button):
+        pass
+
+    def scroll(self, dx, dy):
+        pass
+
+
+class NullKeyboard:
+    def press(self, key):
+        pass
+
+    def release(self, key):
+        pass
+
+
+def sample_events(count, rate):
+    """Клики и нажатия клавиш с частотой rate событий в секунду"""
+    events = []
+    for i in range(count):
+        t = round(i / rate, 3)
+        if i % 2:
+            events.append({"id": "%04x" % i, "type": "keyPress", "time": t,
+                           "key": "A", "code": "KeyA", "keyCode": 65})
+        else:
+            events.append({"id": "%04x" % i, "type": "leftClick", "time": t,
+                           "x": i % 800, "y": i % 600, "keys": None, "codes": None, "keyCodes": None})
+    return events
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Точность сроков воспроизведения событий")
+    parser.add_argument("--events", type=int, default=200, help="Количество событий")
+    parser.add_argument("--rate", type=float, default=50.0, help="Событий в секунду")
+    parser.add_argument("--speed", type=float, default=1.0, help="Скорость воспроизведения")
+    parser.add_argument("--budget-ms", type=float, default=1.0,
+                        help="Допустимый 95-й процентиль опоздания действия, мс")
+    args = parser.parse_args(argv)
+
+    events = sample_events(args.events, args.rate)
+    results = {}
+    for name, spin in (("Сон и опрос часов", None), ("Только сон", 0)):
+        options = {} if spin is None else {"spin": spin}
+        engine = ReplayEngine(speed=args.speed, mouse_controller=NullMouse(),
+                              keyboard_controller=NullKeyboard(), **options)
+        results[name] = engine.play(events)["timing"]
+
+    print(f"{args.events} событий, {args.rate:g} в секунду, скорость {args.speed:g}")
+    for name, timing in results.items():
+        print(f"{name:18} медиана {timing['p50Ms']:.3f} мс, p95 {timing['p95Ms']:.3f} мс, "
+              f"максимум {timing['maxMs']:.3f} мс")
+    p95 = results["Сон и опрос часов"]["p95Ms"]
+    if p95 > args.budget_ms:
+        print(f"Превышен бюджет {args.budget_ms} мс")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
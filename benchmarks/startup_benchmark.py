@@ -0,0 +1,88 @@
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+# Модули, которые не должны загружаться до показа окна
+HEAVY_MODULES = ["cv2", "numpy", "pyautogui", "pynput"]
+
+# Код дочернего процесса: показывает окно и сообщает о ключевых моментах
+CHILD_CODE = r"""
+import sys
+import json
+from PyQt5.QtWidgets import QApplication
+from src.ui.main_window import MainWindow
+
+app = QApplication(sys.argv)
+window = MainWindow()
+window.show()
+app.processEvents()
+heavy = [m for m in HEAVY_MODULES if m in sys.modules]
+print(json.dumps({"stage": "shown", "heavy": heavy}), flush=True)
+
+window.preload_recorder()
+window._preload_thread.join()
+print(json.dumps({"stage": "ready"}), flush=True)
+"""
+
+
+def measure_once(root):
+    """Запускает приложение в отдельном процессе и замеряет время этапов"""
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    code = f"HEAVY_MODULES = {HEAVY_MODULES!r}\n" + CHILD_CODE
+
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-c", code], cwd=root, env=env,
+                               stdout=subprocess.PIPE, text=True)
+    result = {}
+    for line in process.stdout:
+        try:
+            message = json.loads(line)
+        except ValueError:
+            continue
+        elapsed = time.perf_counter() - started
+        if message["stage"] == "shown":
+            result["window"] = elapsed
+            result["heavy"] = message["heavy"]
+        elif message["stage"] == "ready":
+            result["ready"] = elapsed
+    process.wait()
+    if process.returncode != 0 or "window" not in result:
+        raise RuntimeError(f"Процесс приложения завершился с кодом {process.returncode}")
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замер времени запуска Screencaster")
+    parser.add_argument("--runs", type=int, default=5, help="Количество запусков")
+    parser.add_argument("--budget", type=float, default=1.0,
+                        help="Бюджет времени до показа окна в секундах (медиана)")
+    args = parser.parse_args(argv)
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    runs = [measure_once(root) for _ in range(args.runs)]
+
+    window_time = statistics.median(r["window"] for r in runs)
+    ready_time = statistics.median(r["ready"] for r in runs)
+    heavy = sorted({m for r in runs for m in r["heavy"]})
+
+    print(f"Окно показано через:       {window_time * 1000:.0f} мс (медиана из {args.runs})")
+    print(f"Модули записи загружены:   {ready_time * 1000:.0f} мс")
+    print(f"Бюджет:                    {args.budget * 1000:.0f} мс")
+
+    ok = True
+    if heavy:
+        print(f"Тяжелые модули загружены до показа окна: {', '.join(heavy)}")
+        ok = False
+    if window_time > args.budget:
+        print("Бюджет времени запуска превышен")
+        ok = False
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+import os
+import sys
+import time
+import signal
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.recorder.metadata_io import EventStreamWriter, read_journal, recover_journal
+
+# Код дочернего процесса: пишет события в журнал и сообщает, сколько из них
+# уже зафиксировано на диске, пока его не завершат сигналом SIGKILL
+CHILD_CODE = r"""
+import sys
+import time
+sys.path.insert(0, ROOT)
+from src.recorder.metadata_io import EventStreamWriter
+
+writer = EventStreamWriter(PATH, {"version": "1.0", "fps": 30}, commit_interval=INTERVAL)
+index = 0
+while True:
+    writer.append({"id": "%04x" % (index % 65536), "type": "keyPress", "time": index / 1000,
+                   "key": "A", "code": "KeyA", "keyCode": 65})
+    index += 1
+    if index % 100 == 0:
+        print(writer.committed_records, flush=True)
+        time.sleep(0.001)
+"""
+
+
+def make_event(index):
+    return {"id": "%04x" % (index % 65536), "type": "keyPress", "time": index / 1000,
+            "key": "A", "code": "KeyA", "keyCode": 65}
+
+
+def measure(path, commit_interval, count, sync):
+    """Замеряет скорость добавления событий и число фиксаций на диск"""
+    writer = EventStreamWriter(path, {"version": "1.0"}, commit_interval=commit_interval, sync=sync)
+    started = time.perf_counter()
+    for index in range(count):
+        writer.append(make_event(index))
+        if commit_interval is None:
+            # Без группировки каждое событие фиксируется отдельно
+            writer.flush()
+    writer.close({"recordingDuration": count / 1000})
+    elapsed = time.perf_counter() - started
+    restored = read_journal(path)["events"]
+    return elapsed, writer.commits, len(restored) == count
+
+
+def crash_test(directory, commit_interval, run_time):
+    """Убивает пишущий процесс и проверяет, что восстановленные события - префикс записанных"""
+    path = os.path.join(directory, "crash.jsonl")
+    code = (f"ROOT = {ROOT!r}\nPATH = {path!r}\nINTERVAL = {commit_interval!r}\n" + CHILD_CODE)
+    process = subprocess.Popen([sys.executable, "-c", code], stdout=subprocess.PIPE, text=True)
+    committed = 0
+    deadline = time.monotonic() + run_time
+    for line in process.stdout:
+        committed = int(line)
+        if time.monotonic() >= deadline:
+            break
+    process.send_signal(getattr(signal, "SIGKILL", signal.SIGTERM))
+    process.wait()
+
+    metadata = recover_journal(path, os.path.join(directory, "crash.json"))
+    events = metadata["events"]
+    prefix = all(event == make_event(index) for index, event in enumerate(events))
+    return len(events), committed, prefix and len(events) >= committed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Журнал событий: групповая фиксация и восстановление")
+    parser.add_argument("--events", type=int, default=5000, help="Количество событий")
+    parser.add_argument("--intervals", default="0.01,0.05,0.2,1.0",
+                        help="Интервалы групповой фиксации в секундах через запятую")
+    parser.add_argument("--no-fsync", action="store_true", help="Не вызывать fsync")
+    parser.add_argument("--crash-time", type=float, default=1.0,
+                        help="Время работы процесса перед аварийным завершением, секунды")
+    args = parser.parse_args(argv)
+
+    ok = True
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.jsonl")
+        intervals = [None] + [float(v) for v in args.intervals.split(",")]
+        print(f"{'Интервал':>10} {'Событий/с':>12} {'fsync':>7}")
+        for interval in intervals:
+            elapsed, commits, complete = measure(path, interval, args.events, not args.no_fsync)
+            label = "каждое" if interval is None else f"{interval:g} с"
+            print(f"{label:>10} {args.events / elapsed:12.0f} {commits:7d}")
+            if not complete:
+                print(f"Журнал с интервалом {label} восстановлен не полностью")
+                ok = False
+
+        recovered, committed, valid = crash_test(directory, 0.05, args.crash_time)
+        print(f"Аварийное завершение: восстановлено {recovered} событий, "
+              f"подтверждено до сбоя {committed}")
+        if not valid:
+            print("Восстановленные события не совпадают с зафиксированными")
+            ok = False
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
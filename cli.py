@@ -0,0 +1,25 @@
+import sys
+
+# Консольные команды без графического интерфейса.
+# Модули команд импортируются по требованию, PyQt5 здесь не загружается.
+COMMANDS = {
+    "record": "src.cli.record",
+    "daemon": "src.cli.daemon",
+    "convert": "src.cli.convert",
+    "recover": "src.cli.recover",
+    "stats": "src.cli.stats",
+    "heatmap": "src.cli.heatmap",
+    "zoom": "src.cli.zoom",
+    "replay": "src.cli.replay",
+    "stream": "src.cli.stream",
+}
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in COMMANDS:
+        print(f"Использование: python cli.py <{'|'.join(COMMANDS)}> [параметры]")
+        sys.exit(2)
+    module = __import__(COMMANDS[sys.argv[1]], fromlist=["main"])
+    sys.exit(module.main(sys.argv[2:]))
+
+if __name__ == "__main__":
+    main()
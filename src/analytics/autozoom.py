@@ -0,0 +1,364 @@
+import os
+import shutil
+import tempfile
+import subprocess
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+import numpy as np
+from src.analytics.heatmap import gaussian_kernel
+from src.analytics.metadata_stream import METADATA_EXTENSIONS, MetadataStream
+from src.recorder.compression import EXTENSIONS as COMPRESSION_EXTENSIONS
+from src.recorder.trajectory import decode_path
+
+# Автоматическое приближение к действиям пользователя (для обучающих видео).
+#
+# По событиям записи строится траектория камеры: центр и масштаб для каждого
+# кадра. Клики, перетаскивания и ввод текста задают участки приближения,
+# курсор - центр камеры между ними; цели сглаживаются гауссовым фильтром по
+# времени. Видео обрабатывается потоково (чтение -> кадрирование -> запись)
+# кусками по времени в пуле процессов, в памяти находится по кадру на процесс.
+
+CLICK_TYPES = ("leftClick", "rightClick", "doubleClick")
+
+# Масштаб приближения к клику и к вводу текста, предельный масштаб
+CLICK_ZOOM = 2.0
+INPUT_ZOOM = 2.2
+MAX_ZOOM = 3.0
+
+# Сколько секунд камера удерживает цель после события
+HOLD = 1.5
+
+# Если между участками приближения меньше MERGE_GAP секунд, камера не отдаляется
+MERGE_GAP = 1.0
+
+# Запас вокруг области перетаскивания (во сколько раз кадр больше области)
+DRAG_MARGIN = 1.5
+
+# Сигма сглаживания траектории камеры, секунды
+SMOOTHING = 0.4
+
+# Длительность куска видео для одного процесса, секунды
+CHUNK_SECONDS = 20
+
+
+def find_metadata(video_file):
+    """Файл метаданных записи рядом с видео (в том числе сжатый и журнал) или None"""
+    stem = os.path.splitext(video_file)[0]
+    extensions = METADATA_EXTENSIONS + (".jsonl",)
+    for extension in extensions:
+        for suffix in ("",) + tuple(COMPRESSION_EXTENSIONS.values()):
+            path = stem + extension + suffix
+            if os.path.exists(path):
+                return path
+    return None
+
+
+class ZoomTargets:
+    """Цели камеры, собранные из событий записи (координаты экрана)"""
+
+    def __init__(self):
+        # Положения курсора: время, x, y
+        self.cursor_t = array('d')
+        self.cursor_x = array('d')
+        self.cursor_y = array('d')
+        # Участки приближения: начало, конец, центр (NaN - следовать за курсором),
+        # вид ("click", "drag", "input") и масштаб, при котором видна вся область
+        self.focus = []
+
+    def _cursor(self, t, x, y):
+        self.cursor_t.append(t)
+        self.cursor_x.append(x)
+        self.cursor_y.append(y)
+
+    def add(self, event, screen_size):
+        """Учитывает событие записи"""
+        event_type = event.get("type")
+        t = event.get("time")
+        if not isinstance(t, (int, float)):
+            return
+        if event_type in CLICK_TYPES:
+            x, y = event.get("x"), event.get("y")
+            if isinstance(x, (int, float)) and isinstance(y, (int, float)):
+                self._cursor(t, x, y)
+                self.focus.append((t, t, x, y, "click", MAX_ZOOM))
+        elif event_type == "mouseMove":
+            for point in decode_path(event):
+                self._cursor(*point)
+        elif event_type == "drag":
+            start, end = event.get("start") or {}, event.get("end") or {}
+            if "x" not in start or "x" not in end:
+                return
+            for point in decode_path(event) if event.get("path") else ():
+                self._cursor(*point)
+            self._cursor(t, start["x"], start["y"])
+            end_time = end.get("time", t + (event.get("duration") or 0))
+            self._cursor(end_time, end["x"], end["y"])
+            width = abs(end["x"] - start["x"]) * DRAG_MARGIN + 1
+            height = abs(end["y"] - start["y"]) * DRAG_MARGIN + 1
+            fit = max(min(screen_size[0] / width, screen_size[1] / height), 1.0)
+            self.focus.append((t, end_time, (start["x"] + end["x"]) / 2, (start["y"] + end["y"]) / 2,
+                               "drag", fit))
+        elif event_type == "input":
+            # Координаты каретки неизвестны: центр - последний клик перед вводом или курсор
+            anchor = None
+            for focus in reversed(self.focus):
+                if focus[0] <= t and not np.isnan(focus[2]):
+                    anchor = focus
+                    break
+            x, y = (anchor[2], anchor[3]) if anchor else (np.nan, np.nan)
+            self.focus.append((t, t + (event.get("duration") or 0), x, y, "input", MAX_ZOOM))
+        elif event_type == "scroll":
+            start = event.get("start") or {}
+            if "x" in start:
+                self._cursor(t, start["x"], start["y"])
+
+
+def collect_targets(events, screen_size):
+    targets = ZoomTargets()
+    for event in events:
+        targets.add(event, screen_size)
+    return targets
+
+
+def _smooth(values, sigma):
+    """Сглаживание сигнала гауссовым ядром с продолжением краев"""
+    if sigma <= 0 or len(values) < 2:
+        return values
+    kernel = gaussian_kernel(sigma)
+    radius = len(kernel) // 2
+    return np.convolve(np.pad(values, radius, mode="edge"), kernel, mode="valid")
+
+
+class AutoZoomRenderer:
+    """
+    Рендер видео с автоматическим приближением:
+
+        renderer = AutoZoomRenderer(workers=4)
+        renderer.render("screencaster_2024-01-01_10-00-00.mp4", output_file="zoom.mp4")
+
+    region - область экрана, записанная в видео (x, y, ширина, высота);
+    по умолчанию - область из метаданных записи (поле region), а без нее
+    весь экран.
+    """
+
+    def __init__(self, click_zoom=CLICK_ZOOM, input_zoom=INPUT_ZOOM, max_zoom=MAX_ZOOM, hold=HOLD,
+                 smoothing=SMOOTHING, region=None, output_size=None, workers=None,
+                 chunk_seconds=CHUNK_SECONDS):
+        self.click_zoom = click_zoom
+        self.input_zoom = input_zoom
+        self.max_zoom = max_zoom
+        self.hold = hold
+        self.smoothing = smoothing
+        self.region = tuple(int(v) for v in region) if region else None
+        self.output_size = tuple(int(v) for v in output_size) if output_size else None
+        self.workers = workers
+        self.chunk_seconds = chunk_seconds
+
+    def load_targets(self, metadata_file):
+        """Потоково читает метаданные; возвращает (цели, размер экрана, область записи или None)"""
+        with MetadataStream(metadata_file) as stream:
+            screen = stream.header.get("screen") or {}
+            screen_size = (screen.get("width") or 1920, screen.get("height") or 1080)
+            region = stream.header.get("region")
+            targets = collect_targets(stream, screen_size)
+        return targets, screen_size, tuple(int(v) for v in region) if region else None
+
+    def camera_path(self, targets, screen_size, frame_count, fps, frame_size, region=None):
+        """
+        Траектория камеры в координатах кадра видео: массивы центра (cx, cy)
+        и масштаба для каждого кадра. region - область записи из метаданных,
+        если область не задана явно.
+        """
+        left, top, width, height = self.region or region or (0, 0) + tuple(screen_size)
+        scale_x, scale_y = frame_size[0] / width, frame_size[1] / height
+        times = np.arange(frame_count) / fps
+
+        # Курсор между событиями - линейная интерполяция
+        if len(targets.cursor_t):
+            order = np.argsort(np.frombuffer(targets.cursor_t), kind="stable")
+            cursor_t = np.frombuffer(targets.cursor_t)[order]
+            cursor_x = np.interp(times, cursor_t, np.frombuffer(targets.cursor_x)[order])
+            cursor_y = np.interp(times, cursor_t, np.frombuffer(targets.cursor_y)[order])
+        else:
+            cursor_x = np.full(frame_count, left + width / 2)
+            cursor_y = np.full(frame_count, top + height / 2)
+
+        zoom = np.ones(frame_count)
+        center_x, center_y = cursor_x.copy(), cursor_y.copy()
+        focus = sorted(targets.focus, key=lambda item: item[0])
+        for i, (start, end, x, y, kind, fit) in enumerate(focus):
+            end += self.hold
+            if i + 1 < len(focus) and focus[i + 1][0] - end < MERGE_GAP:
+                # Короткий промежуток до следующей цели: камера не отдаляется
+                end = max(end, focus[i + 1][0])
+            first, last = np.searchsorted(times, (start, end))
+            if first >= last:
+                continue
+            level = self.input_zoom if kind == "input" else self.click_zoom
+            zoom[first:last] = min(level, fit, self.max_zoom)
+            if not np.isnan(x):
+                center_x[first:last] = x
+                center_y[first:last] = y
+
+        # Сглаживание (сигма в кадрах), затем перевод в координаты кадра
+        sigma = self.smoothing * fps
+        zoom = np.clip(_smooth(zoom, sigma), 1.0, self.max_zoom)
+        center_x = (_smooth(center_x, sigma) - left) * scale_x
+        center_y = (_smooth(center_y, sigma) - top) * scale_y
+
+        # Область кадрирования не выходит за границы кадра
+        half_w = frame_size[0] / (2 * zoom)
+        half_h = frame_size[1] / (2 * zoom)
+        center_x = np.clip(center_x, half_w, frame_size[0] - half_w)
+        center_y = np.clip(center_y, half_h, frame_size[1] - half_h)
+        return center_x, center_y, zoom
+
+    def render(self, video_file, metadata_file=None, output_file=None):
+        """Рендерит видео с приближением; возвращает словарь с итогами"""
+        if metadata_file is None:
+            metadata_file = find_metadata(video_file)
+            if metadata_file is None:
+                raise FileNotFoundError(f"Не найдены метаданные для видео: {video_file}")
+        if output_file is None:
+            stem, extension = os.path.splitext(video_file)
+            output_file = stem + "_zoom" + extension
+
+        capture = cv2.VideoCapture(video_file)
+        if not capture.isOpened():
+            raise OSError(f"Не удалось открыть видео: {video_file}")
+        fps = capture.get(cv2.CAP_PROP_FPS) or 25
+        frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        frame_size = (int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)), int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        capture.release()
+        if frame_count <= 0:
+            raise ValueError(f"Видео не содержит кадров: {video_file}")
+
+        targets, screen_size, region = self.load_targets(metadata_file)
+        center_x, center_y, zoom = self.camera_path(targets, screen_size, frame_count, fps, frame_size, region)
+        output_size = self.output_size or frame_size
+
+        chunk = max(int(self.chunk_seconds * fps), 1)
+        workers = self.workers or os.cpu_count() or 1
+        # Кусков не меньше, чем процессов, если видео достаточно длинное
+        chunk = min(chunk, max(-(-frame_count // workers), int(fps)))
+        bounds = list(range(0, frame_count, chunk)) + [frame_count]
+        fourcc = _fourcc(output_file)
+
+        folder = tempfile.mkdtemp(prefix=".screencaster_zoom_", dir=os.path.dirname(os.path.abspath(output_file)))
+        try:
+            extension = os.path.splitext(output_file)[1]
+            jobs = []
+            for i in range(len(bounds) - 1):
+                first, last = bounds[i], bounds[i + 1]
+                jobs.append((video_file, os.path.join(folder, f"chunk_{i:05d}{extension}"), first,
+                             center_x[first:last], center_y[first:last], zoom[first:last],
+                             output_size, fps, fourcc))
+            if workers == 1 or len(jobs) == 1:
+                written = [_render_chunk(job) for job in jobs]
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    written = list(executor.map(_render_chunk, jobs))
+            _concat_chunks([job[1] for job in jobs], output_file, fps, output_size, fourcc)
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+
+        return {
+            "video": video_file,
+            "metadata": metadata_file,
+            "output": output_file,
+            "frames": sum(written),
+            "chunks": len(jobs),
+            "maxZoom": round(float(zoom.max()), 2),
+            "zoomedShare": round(float(np.mean(zoom > 1.05)), 3),
+        }
+
+
+def _fourcc(path):
+    # Кодек по расширению, как в ScreenRecorder
+    if path.lower().endswith(".mp4"):
+        return cv2.VideoWriter_fourcc(*'mp4v')
+    return cv2.VideoWriter_fourcc(*'XVID')
+
+
+def _open_at(video_file, first):
+    """Открывает видео на кадре first; если поиск неточен, кадры пропускаются чтением"""
+    capture = cv2.VideoCapture(video_file)
+    if first and capture.set(cv2.CAP_PROP_POS_FRAMES, first) and \
+            int(capture.get(cv2.CAP_PROP_POS_FRAMES)) == first:
+        return capture
+    if first:
+        capture.release()
+        capture = cv2.VideoCapture(video_file)
+        for _ in range(first):
+            if not capture.grab():
+                break
+    return capture
+
+
+def _render_chunk(job):
+    """Задача процесса пула: кадрирует и масштабирует кусок видео в отдельный файл"""
+    video_file, chunk_file, first, center_x, center_y, zoom, output_size, fps, fourcc = job
+    capture = _open_at(video_file, first)
+    writer = cv2.VideoWriter(chunk_file, fourcc, fps, output_size)
+    written = 0
+    matrix = np.zeros((2, 3))
+    try:
+        frame = None
+        for i in range(len(zoom)):
+            ok, next_frame = capture.read()
+            if ok:
+                frame = next_frame
+            elif frame is None:
+                break
+            height, width = frame.shape[:2]
+            if zoom[i] <= 1.0001 and (width, height) == output_size:
+                writer.write(frame)
+            else:
+                # Кадрирование и масштабирование одним аффинным преобразованием
+                # с субпиксельным сдвигом, чтобы движение камеры было плавным
+                scale = output_size[0] * zoom[i] / width
+                matrix[0, 0] = scale
+                matrix[1, 1] = output_size[1] * zoom[i] / height
+                matrix[0, 2] = output_size[0] / 2 - center_x[i] * scale
+                matrix[1, 2] = output_size[1] / 2 - center_y[i] * matrix[1, 1]
+                writer.write(cv2.warpAffine(frame, matrix, output_size, flags=cv2.INTER_LINEAR))
+            written += 1
+    finally:
+        capture.release()
+        writer.release()
+    return written
+
+
+def _concat_chunks(chunk_files, output_file, fps, output_size, fourcc):
+    """
+    Склеивает куски: без перекодирования через ffmpeg, если он установлен,
+    иначе потоковым перекодированием кадр за кадром
+    """
+    if len(chunk_files) == 1:
+        shutil.move(chunk_files[0], output_file)
+        return
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg:
+        listing = os.path.join(os.path.dirname(chunk_files[0]), "chunks.txt")
+        with open(listing, 'w', encoding='utf-8') as f:
+            for path in chunk_files:
+                f.write(f"file '{os.path.abspath(path)}'\n")
+        result = subprocess.run([ffmpeg, "-y", "-loglevel", "error", "-f", "concat", "-safe", "0",
+                                 "-i", listing, "-c", "copy", output_file],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        if result.returncode == 0:
+            return
+        print(f"ffmpeg не склеил куски, используется перекодирование: {result.stderr.decode(errors='replace').strip()}")
+    writer = cv2.VideoWriter(output_file, fourcc, fps, output_size)
+    try:
+        for path in chunk_files:
+            capture = cv2.VideoCapture(path)
+            while True:
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                writer.write(frame)
+            capture.release()
+    finally:
+        writer.release()
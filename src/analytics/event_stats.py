@@ -0,0 +1,326 @@
+import os
+from array import array
+import numpy as np
+from src.analytics.metadata_stream import MetadataStream, find_recordings
+
+# Векторная аналитика событий записи на NumPy.
+#
+# События читаются потоково (MetadataStream) и раскладываются сразу по
+# колонкам, без списка словарей, а затем превращаются в структурированный
+# массив. Все показатели считаются операциями над массивом целиком.
+
+EVENT_DTYPE = np.dtype([
+    ("time", "f8"),       # Время начала события, секунды
+    ("type", "i2"),       # Индекс в EventTable.types
+    ("x", "i4"),          # Позиция (для перетаскивания и прокрутки - начало)
+    ("y", "i4"),
+    ("x2", "i4"),         # Конец перетаскивания и прокрутки
+    ("y2", "i4"),
+    ("duration", "f8"),   # Длительность, секунды (0 для мгновенных событий)
+    ("count", "i4"),      # Нажатия клавиш для событий клавиатуры, величина прокрутки для scroll
+    ("hotkey", "i4"),     # Индекс в EventTable.hotkeys или -1
+    ("frame", "i8"),      # Номер кадра видео или -1
+])
+
+CLICK_TYPES = ("leftClick", "rightClick", "doubleClick")
+KEYSTROKE_TYPES = ("keyPress", "keyLongPress", "hotkey", "input")
+
+# Порог простоя по умолчанию, секунды
+IDLE_THRESHOLD = 5.0
+
+# Границы интервалов гистограмм: дистанция перетаскивания (пиксели) и простои (секунды)
+DRAG_BINS = (0, 10, 25, 50, 100, 200, 400, 800, 1600, 3200, np.inf)
+IDLE_BINS = (5, 10, 30, 60, 120, 300, 600, 1800, np.inf)
+
+
+def _intern(value, values, ids):
+    """Возвращает номер значения в таблице, добавляя его при первой встрече"""
+    index = ids.get(value)
+    if index is None:
+        index = ids[value] = len(values)
+        values.append(value)
+    return index
+
+
+def _number(value, default=0):
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else default
+
+
+class EventTable:
+    """События одной записи (или нескольких) в виде структурированного массива NumPy"""
+
+    def __init__(self, events, types, hotkeys, duration=0.0, path=None, header=None):
+        self.events = events
+        self.types = list(types)
+        self.hotkeys = list(hotkeys)
+        self.duration = duration
+        self.path = path
+        self.header = header or {}
+
+    def __len__(self):
+        return len(self.events)
+
+    def _type_mask(self, names):
+        ids = [self.types.index(name) for name in names if name in self.types]
+        return np.isin(self.events["type"], ids)
+
+    def _per_minute(self, mask, weights=None):
+        """Количество (или сумма весов) событий по минутам записи"""
+        minutes = max(int(np.ceil(self.duration / 60)), 1)
+        times = self.events["time"][mask]
+        bins = np.clip((times // 60).astype(np.int64), 0, None)
+        if len(bins):
+            minutes = max(minutes, int(bins.max()) + 1)
+        return np.bincount(bins, weights=weights, minlength=minutes)
+
+    def clicks_per_minute(self):
+        """Клики (левые, правые, двойные) по минутам записи"""
+        return self._per_minute(self._type_mask(CLICK_TYPES)).astype(np.int64)
+
+    def keystrokes_per_minute(self):
+        """
+        Нажатия клавиш по минутам записи: отдельные нажатия, горячие клавиши
+        и клавиши ввода текста (относятся к минуте начала ввода)
+        """
+        mask = self._type_mask(KEYSTROKE_TYPES)
+        return self._per_minute(mask, self.events["count"][mask]).astype(np.int64)
+
+    def idle_gaps(self, threshold=IDLE_THRESHOLD):
+        """
+        Интервалы без активности длиннее threshold секунд, включая начало
+        и конец записи. Возвращает массив пар (начало, длительность).
+        """
+        # События idle (автопауза записи) описывают простой, а не активность
+        events = self.events[~self._type_mask(("idle",))]
+        if not len(events):
+            if self.duration > threshold:
+                return np.array([[0.0, self.duration]])
+            return np.empty((0, 2))
+        order = np.argsort(events["time"], kind="stable")
+        starts = events["time"][order]
+        # Событие занимает интервал [time, time + duration]; перекрытия объединяются
+        ends = np.maximum.accumulate(starts + events["duration"][order])
+        gap_starts = np.concatenate(([0.0], ends))
+        gap_ends = np.concatenate((starts, [max(self.duration, ends[-1])]))
+        lengths = gap_ends - gap_starts
+        mask = lengths > threshold
+        return np.column_stack((gap_starts[mask], lengths[mask]))
+
+    def hotkey_frequency(self):
+        """Частота горячих клавиш: словарь {комбинация: количество} по убыванию"""
+        ids = self.events["hotkey"]
+        ids = ids[ids >= 0]
+        counts = np.bincount(ids, minlength=len(self.hotkeys))
+        order = np.argsort(-counts, kind="stable")
+        return {self.hotkeys[i]: int(counts[i]) for i in order if counts[i]}
+
+    def drag_distances(self):
+        """Дистанции перетаскиваний в пикселях"""
+        drags = self.events[self._type_mask(("drag",))]
+        return np.hypot(drags["x2"] - drags["x"], drags["y2"] - drags["y"])
+
+    def summary(self, idle_threshold=IDLE_THRESHOLD):
+        """Итоговая статистика записи"""
+        gaps = self.idle_gaps(idle_threshold)
+        return {
+            "path": self.path,
+            "events": len(self.events),
+            "duration": round(self.duration, 3),
+            "clicksPerMinute": rate_summary(self.clicks_per_minute()),
+            "keystrokesPerMinute": rate_summary(self.keystrokes_per_minute()),
+            "idleGaps": gap_summary(gaps),
+            "hotkeys": self.hotkey_frequency(),
+            "dragDistance": distribution(self.drag_distances(), DRAG_BINS),
+        }
+
+
+class _TableBuilder:
+    """Раскладывает события по колонкам при потоковом чтении"""
+
+    def __init__(self):
+        self.types = []
+        self._type_ids = {}
+        self.hotkeys = []
+        self._hotkey_ids = {}
+        self.columns = {
+            "time": array('d'), "type": array('h'), "x": array('i'), "y": array('i'),
+            "x2": array('i'), "y2": array('i'), "duration": array('d'), "count": array('i'),
+            "hotkey": array('i'), "frame": array('q'),
+        }
+
+    def add(self, event):
+        time_value = event.get("time")
+        if not isinstance(time_value, (int, float)) or isinstance(time_value, bool):
+            return
+        event_type = event.get("type")
+        x, y = _number(event.get("x")), _number(event.get("y"))
+        x2, y2 = x, y
+        start, end = event.get("start"), event.get("end")
+        if isinstance(start, dict) and isinstance(end, dict):
+            x, y = _number(start.get("x")), _number(start.get("y"))
+            x2, y2 = _number(end.get("x")), _number(end.get("y"))
+
+        if event_type == "input":
+            keys = event.get("keys")
+            count = len(keys) if isinstance(keys, list) else _number(event.get("length"))
+        elif event_type == "scroll":
+            count = _number(event.get("scrollAmount"))
+        else:
+            count = 1
+
+        hotkey = event.get("hotkey")
+        columns = self.columns
+        columns["time"].append(time_value)
+        columns["type"].append(_intern(event_type, self.types, self._type_ids))
+        columns["x"].append(int(x))
+        columns["y"].append(int(y))
+        columns["x2"].append(int(x2))
+        columns["y2"].append(int(y2))
+        columns["duration"].append(_number(event.get("duration")))
+        columns["count"].append(int(count))
+        columns["hotkey"].append(_intern(hotkey, self.hotkeys, self._hotkey_ids)
+                                 if isinstance(hotkey, str) else -1)
+        frame = event.get("frame")
+        columns["frame"].append(frame if type(frame) is int else -1)
+
+    def finish(self):
+        count = len(self.columns["time"])
+        events = np.empty(count, dtype=EVENT_DTYPE)
+        if count:
+            for name, column in self.columns.items():
+                events[name] = np.frombuffer(column, dtype=column.typecode)
+        return events
+
+
+def events_to_table(events, duration=None, path=None, header=None):
+    """Преобразует последовательность событий (например, поток) в EventTable"""
+    builder = _TableBuilder()
+    for event in events:
+        builder.add(event)
+    array_events = builder.finish()
+    last_end = 0.0
+    if len(array_events):
+        last_end = float(np.max(array_events["time"] + array_events["duration"]))
+    if duration is None:
+        duration = last_end
+    return EventTable(array_events, builder.types, builder.hotkeys, max(duration, last_end),
+                      path=path, header=header)
+
+
+def load_table(path):
+    """Потоково читает файл метаданных в любом формате и возвращает EventTable"""
+    with MetadataStream(path) as stream:
+        if not stream.has_events:
+            raise ValueError(f"Файл не содержит событий записи: {path}")
+        table = events_to_table(stream, path=path)
+        header = stream.header
+    duration = _number(header.get("recordingDuration"), None)
+    if duration is not None:
+        table.duration = max(table.duration, duration)
+    table.header = header
+    return table
+
+
+def load_folder(folder):
+    """Читает все записи папки; файлы, не являющиеся метаданными, пропускаются"""
+    tables = []
+    for path in find_recordings(folder):
+        try:
+            tables.append(load_table(path))
+        except (ValueError, OSError, UnicodeDecodeError) as e:
+            print(f"Пропущен файл {os.path.basename(path)}: {e}")
+    return tables
+
+
+def merge_tables(tables):
+    """Объединяет записи в одну таблицу с общими таблицами типов и горячих клавиш"""
+    types, type_ids = [], {}
+    hotkeys, hotkey_ids = [], {}
+    parts = []
+    for table in tables:
+        part = table.events.copy()
+        type_map = np.array([_intern(t, types, type_ids) for t in table.types] or [0], dtype=np.int16)
+        hotkey_map = np.array([_intern(h, hotkeys, hotkey_ids) for h in table.hotkeys] + [-1],
+                              dtype=np.int32)
+        if len(part):
+            part["type"] = type_map[part["type"]]
+            part["hotkey"] = hotkey_map[part["hotkey"]]
+        parts.append(part)
+    events = np.concatenate(parts) if parts else np.empty(0, dtype=EVENT_DTYPE)
+    duration = sum(table.duration for table in tables)
+    return EventTable(events, types, hotkeys, duration)
+
+
+def rate_summary(per_minute):
+    """Сводка по поминутным значениям"""
+    if not len(per_minute):
+        return {"total": 0, "mean": 0.0, "median": 0.0, "max": 0}
+    return {
+        "total": int(per_minute.sum()),
+        "mean": round(float(per_minute.mean()), 2),
+        "median": round(float(np.median(per_minute)), 2),
+        "max": int(per_minute.max()),
+    }
+
+
+def gap_summary(gaps, bins=IDLE_BINS):
+    """Сводка по интервалам простоя"""
+    lengths = gaps[:, 1] if len(gaps) else np.empty(0)
+    return {
+        "count": int(len(lengths)),
+        "total": round(float(lengths.sum()), 3),
+        "longest": round(float(lengths.max()), 3) if len(lengths) else 0.0,
+        "histogram": histogram(lengths, bins),
+    }
+
+
+def distribution(values, bins):
+    """Распределение значений: основные статистики и гистограмма"""
+    if not len(values):
+        return {"count": 0, "histogram": histogram(values, bins)}
+    p50, p90 = np.percentile(values, [50, 90])
+    return {
+        "count": int(len(values)),
+        "mean": round(float(values.mean()), 2),
+        "median": round(float(p50), 2),
+        "p90": round(float(p90), 2),
+        "max": round(float(values.max()), 2),
+        "histogram": histogram(values, bins),
+    }
+
+
+def histogram(values, bins):
+    """Гистограмма по заданным границам (последняя граница может быть бесконечной)"""
+    counts, _ = np.histogram(values, bins=np.asarray(bins, dtype=float))
+    labels = [f"{bins[i]:g}-{bins[i + 1]:g}" if np.isfinite(bins[i + 1]) else f"{bins[i]:g}+"
+              for i in range(len(bins) - 1)]
+    return dict(zip(labels, (int(c) for c in counts)))
+
+
+def analyze_folder(folder, idle_threshold=IDLE_THRESHOLD):
+    """
+    Статистика по всем записям папки: сводка по каждой записи и общая сводка.
+    Поминутные показатели общей сводки считаются по минутам всех записей,
+    простои - внутри записей (промежутки между записями не учитываются).
+    """
+    tables = load_folder(folder)
+    merged = merge_tables(tables)
+    per_minute_clicks = [t.clicks_per_minute() for t in tables]
+    per_minute_keys = [t.keystrokes_per_minute() for t in tables]
+    gaps = [t.idle_gaps(idle_threshold) for t in tables]
+    return {
+        "folder": folder,
+        "recordings": len(tables),
+        "events": len(merged),
+        "duration": round(merged.duration, 3),
+        "clicksPerMinute": rate_summary(_concat(per_minute_clicks)),
+        "keystrokesPerMinute": rate_summary(_concat(per_minute_keys)),
+        "idleGaps": gap_summary(np.concatenate(gaps) if gaps else np.empty((0, 2))),
+        "hotkeys": merged.hotkey_frequency(),
+        "dragDistance": distribution(merged.drag_distances(), DRAG_BINS),
+        "files": [t.summary(idle_threshold) for t in tables],
+    }
+
+
+def _concat(arrays):
+    return np.concatenate(arrays) if arrays else np.empty(0, dtype=np.int64)
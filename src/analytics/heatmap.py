@@ -0,0 +1,315 @@
+import os
+import cv2
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from src.analytics.event_stats import CLICK_TYPES, load_table
+from src.analytics.metadata_stream import find_recordings
+from src.recorder.compression import strip_compression_extension
+
+# Тепловые карты кликов и прокрутки.
+#
+# Точки событий раскладываются по сетке одной гистограммой (np.bincount),
+# сетка размывается разделимым гауссовым фильтром (строки, затем столбцы),
+# а результат раскрашивается и накладывается на кадр видео записи.
+
+# Наборы событий: клики и перетаскивания (начало и конец) или прокрутка
+KINDS = {
+    "clicks": CLICK_TYPES + ("drag",),
+    "scroll": ("scroll",),
+}
+KIND_ALL = "all"
+
+# Размер ячейки сетки в пикселях экрана: гистограмма строится с уменьшением,
+# размытие все равно стирает детали мельче ячейки
+CELL_SIZE = 4
+
+# Радиус размытия (сигма) в пикселях экрана
+SIGMA = 24.0
+
+# Максимальная непрозрачность тепловой карты при наложении на кадр
+ALPHA = 0.6
+
+VIDEO_EXTENSIONS = (".mov", ".mp4", ".avi", ".mkv")
+HEATMAP_SUFFIX = "_heatmap"
+
+
+def gaussian_kernel(sigma):
+    """Нормированное одномерное ядро Гаусса радиусом 3 сигмы"""
+    radius = max(int(np.ceil(3 * sigma)), 1)
+    x = np.arange(-radius, radius + 1, dtype=np.float64)
+    kernel = np.exp(-(x * x) / (2 * sigma * sigma))
+    return kernel / kernel.sum()
+
+
+def _convolve_axis(grid, kernel, axis):
+    """Свертка по одной оси: сумма сдвинутых копий сетки, цикл только по весам ядра"""
+    radius = len(kernel) // 2
+    pad = [(0, 0), (0, 0)]
+    pad[axis] = (radius, radius)
+    padded = np.pad(grid, pad)
+    size = grid.shape[axis]
+    result = np.zeros_like(grid)
+    for offset, weight in enumerate(kernel):
+        if axis == 0:
+            result += weight * padded[offset:offset + size]
+        else:
+            result += weight * padded[:, offset:offset + size]
+    return result
+
+
+def gaussian_blur(grid, sigma):
+    """Разделимое гауссово размытие: O(r) операций на пиксель вместо O(r^2)"""
+    if sigma <= 0:
+        return grid
+    kernel = gaussian_kernel(sigma)
+    return _convolve_axis(_convolve_axis(grid, kernel, 0), kernel, 1)
+
+
+def find_video(metadata_file):
+    """Видео записи: файл с тем же именем, что и метаданные, или None"""
+    stem = os.path.splitext(strip_compression_extension(metadata_file))[0]
+    for video_extension in VIDEO_EXTENSIONS:
+        path = stem + video_extension
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def read_frame(video_file, seconds, fps=None):
+    """Кадр видео на заданном времени записи или None, если его не удалось прочитать"""
+    capture = cv2.VideoCapture(video_file)
+    try:
+        if not capture.isOpened():
+            return None
+        fps = fps or capture.get(cv2.CAP_PROP_FPS) or 0
+        total = int(capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        index = int(seconds * fps) if fps else 0
+        if total:
+            index = min(index, total - 1)
+        capture.set(cv2.CAP_PROP_POS_FRAMES, max(index, 0))
+        ok, frame = capture.read()
+        return frame if ok else None
+    finally:
+        capture.release()
+
+
+class HeatmapRenderer:
+    """
+    Строит тепловые карты событий записи:
+
+        renderer = HeatmapRenderer(kind="clicks")
+        renderer.render("screencaster_2024-01-01_10-00-00.json", "heatmap.png", start=60, end=120)
+
+    region - область записи (x, y, ширина, высота), если видео записывалось
+    не со всего экрана: координаты событий заданы относительно экрана.
+    По умолчанию берется область из метаданных записи (поле region).
+    """
+
+    def __init__(self, kind="clicks", sigma=SIGMA, alpha=ALPHA, cell_size=CELL_SIZE,
+                 region=None, colormap=cv2.COLORMAP_JET):
+        if kind != KIND_ALL and kind not in KINDS:
+            raise ValueError(f"Неизвестный тип тепловой карты: {kind}")
+        self.kind = kind
+        self.sigma = sigma
+        self.alpha = alpha
+        self.cell_size = max(int(cell_size), 1)
+        self.region = tuple(int(v) for v in region) if region else None
+        self.colormap = colormap
+
+    def _types(self):
+        if self.kind == KIND_ALL:
+            return sum(KINDS.values(), ())
+        return KINDS[self.kind]
+
+    def points(self, table, start=None, end=None):
+        """
+        Координаты и веса точек событий в окне времени [start, end).
+        Перетаскивание дает две точки (нажатие и отпускание),
+        прокрутка весит столько, сколько шагов прокрутки.
+        """
+        events = table.events
+        ids = [table.types.index(name) for name in self._types() if name in table.types]
+        mask = np.isin(events["type"], ids)
+        if start is not None:
+            mask &= events["time"] >= start
+        if end is not None:
+            mask &= events["time"] < end
+        selected = events[mask]
+
+        weights = np.ones(len(selected))
+        if "scroll" in table.types:
+            scroll = selected["type"] == table.types.index("scroll")
+            weights[scroll] = np.maximum(np.abs(selected["count"][scroll]), 1)
+        xs, ys = selected["x"], selected["y"]
+        if "drag" in table.types:
+            drag = selected["type"] == table.types.index("drag")
+            xs = np.concatenate((xs, selected["x2"][drag]))
+            ys = np.concatenate((ys, selected["y2"][drag]))
+            weights = np.concatenate((weights, np.ones(int(drag.sum()))))
+        return xs, ys, weights
+
+    def screen_size(self, table):
+        """Размер экрана записи из метаданных или по крайним координатам событий"""
+        screen = table.header.get("screen") or {}
+        width, height = screen.get("width"), screen.get("height")
+        if isinstance(width, int) and isinstance(height, int) and width > 0 and height > 0:
+            return width, height
+        events = table.events
+        if not len(events):
+            return 1, 1
+        return (int(max(events["x"].max(), events["x2"].max())) + 1,
+                int(max(events["y"].max(), events["y2"].max())) + 1)
+
+    def recorded_region(self, table):
+        """Область записи: заданная явно или сохраненная в метаданных; None - весь экран"""
+        if self.region:
+            return self.region
+        region = table.header.get("region")
+        return tuple(int(v) for v in region) if region else None
+
+    def density(self, table, start=None, end=None):
+        """Размытая плотность событий на сетке записанной области (float64, не нормирована)"""
+        region = self.recorded_region(table)
+        if region:
+            left, top, width, height = region
+        else:
+            left, top = 0, 0
+            width, height = self.screen_size(table)
+        cell = self.cell_size
+        grid_w, grid_h = -(-width // cell), -(-height // cell)
+
+        xs, ys, weights = self.points(table, start, end)
+        xs = xs.astype(np.int64) - left
+        ys = ys.astype(np.int64) - top
+        inside = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+        cells = (ys[inside] // cell) * grid_w + xs[inside] // cell
+        grid = np.bincount(cells, weights=weights[inside], minlength=grid_w * grid_h)
+        grid = grid.reshape(grid_h, grid_w).astype(np.float64)
+        return gaussian_blur(grid, self.sigma / cell)
+
+    def colorize(self, density, size, scale=None):
+        """
+        Раскрашивает плотность и возвращает (цветная карта BGR, непрозрачность)
+        размером size. scale - значение плотности, соответствующее максимуму
+        цвета (по умолчанию максимум карты); общий scale делает карты окон
+        времени сравнимыми между собой.
+        """
+        scale = scale or float(density.max())
+        normalized = np.clip(density / scale, 0, 1) if scale > 0 else np.zeros_like(density)
+        normalized = cv2.resize(normalized.astype(np.float32), size, interpolation=cv2.INTER_LINEAR)
+        colors = cv2.applyColorMap((normalized * 255).astype(np.uint8), self.colormap)
+        return colors, normalized * self.alpha
+
+    def blend(self, frame, density, scale=None):
+        """Накладывает карту на кадр; непрозрачность пропорциональна плотности"""
+        height, width = frame.shape[:2]
+        colors, opacity = self.colorize(density, (width, height), scale)
+        # Смешивание в целых числах (непрозрачность в 1/256) быстрее, чем во float
+        weight = (opacity * 256).astype(np.uint16)[..., None]
+        return ((frame * (256 - weight) + colors * weight) >> 8).astype(np.uint8)
+
+    def background(self, table, video_file, start=None, end=None):
+        """
+        Кадр для подложки: кадр видео из середины окна времени.
+        Без видео - черный фон размером записанной области.
+        """
+        if video_file:
+            begin = start or 0.0
+            finish = end if end is not None else table.duration
+            frame = read_frame(video_file, (begin + max(finish, begin)) / 2, table.header.get("fps"))
+            if frame is not None:
+                return frame, True
+        region = self.recorded_region(table)
+        if region:
+            width, height = region[2], region[3]
+        else:
+            width, height = self.screen_size(table)
+        return np.zeros((height, width, 3), dtype=np.uint8), False
+
+    def render(self, metadata_file, output_file, start=None, end=None, video_file=None,
+               table=None, density=None, scale=None):
+        """Сохраняет тепловую карту записи (или окна времени) в файл изображения"""
+        if table is None:
+            table = load_table(metadata_file)
+        if video_file is None:
+            video_file = find_video(metadata_file)
+        if density is None:
+            density = self.density(table, start, end)
+        frame, has_video = self.background(table, video_file, start, end)
+        image = self.blend(frame, density, scale)
+        if not cv2.imwrite(output_file, image):
+            raise OSError(f"Не удалось сохранить изображение: {output_file}")
+        return {
+            "metadata": metadata_file,
+            "output": output_file,
+            "video": video_file if has_video else None,
+            "start": start,
+            "end": end,
+            "points": len(self.points(table, start, end)[0]),
+        }
+
+    def render_windows(self, metadata_file, output_folder, window, video_file=None, shared_scale=True):
+        """
+        Тепловые карты последовательных окон времени длиной window секунд.
+        При shared_scale цвета всех окон нормируются по общему максимуму.
+        """
+        table = load_table(metadata_file)
+        if video_file is None:
+            video_file = find_video(metadata_file)
+        count = max(int(np.ceil(table.duration / window)), 1)
+        windows = [(i * window, (i + 1) * window) for i in range(count)]
+        densities = [self.density(table, start, end) for start, end in windows]
+        scale = None
+        if shared_scale:
+            scale = max(float(density.max()) for density in densities) or None
+        results = []
+        for (start, end), density in zip(windows, densities):
+            output_file = heatmap_path(metadata_file, output_folder, start, end)
+            results.append(self.render(metadata_file, output_file, start, end, video_file,
+                                       table=table, density=density, scale=scale))
+        return results
+
+
+def heatmap_path(metadata_file, output_folder, start=None, end=None):
+    """Имя файла тепловой карты: имя записи, суффикс и окно времени"""
+    stem = os.path.splitext(os.path.basename(strip_compression_extension(metadata_file)))[0]
+    if start is not None or end is not None:
+        stem += f"_{int(start or 0):05d}-" + (f"{int(end):05d}" if end is not None else "end")
+    return os.path.join(output_folder or os.path.dirname(metadata_file), stem + HEATMAP_SUFFIX + ".png")
+
+
+def _render_job(job):
+    """Задача процесса пула: одна запись; ошибка возвращается, а не выбрасывается"""
+    metadata_file, output_folder, options, start, end, window = job
+    try:
+        renderer = HeatmapRenderer(**options)
+        if window:
+            return renderer.render_windows(metadata_file, output_folder, window)
+        output_file = heatmap_path(metadata_file, output_folder, start, end)
+        return [renderer.render(metadata_file, output_file, start, end)]
+    except Exception as e:
+        return [{"metadata": metadata_file, "error": str(e)}]
+
+
+def render_folder(folder, output_folder=None, workers=None, start=None, end=None, window=None,
+                  **options):
+    """
+    Тепловые карты всех записей папки в пуле процессов (по записи на задачу).
+    Возвращает список результатов; записи с ошибкой содержат поле error.
+    """
+    if output_folder and not os.path.exists(output_folder):
+        os.makedirs(output_folder)
+    jobs = [(path, output_folder, options, start, end, window) for path in find_recordings(folder)]
+    if not jobs:
+        return []
+    results = []
+    if workers == 1 or len(jobs) == 1:
+        for job in jobs:
+            results.extend(_render_job(job))
+        return results
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Записи мелкие и многочисленные: пакеты задач снижают накладные расходы пула
+        chunksize = max(len(jobs) // ((workers or os.cpu_count() or 1) * 4), 1)
+        for result in executor.map(_render_job, jobs, chunksize=chunksize):
+            results.extend(result)
+    return results
@@ -0,0 +1,246 @@
+import io
+import os
+import json
+from collections import deque
+from src.recorder.binary_events import SUPPORTED_MAGICS, BinaryEventReader
+from src.recorder.compression import open_read, strip_compression_extension
+from src.recorder.metadata_io import (HEADER_KEY, FOOTER_KEY, POP_KEY, CLEAR_KEY, TEMP_SUFFIX,
+                                      is_journal_path, metadata_path_for)
+
+# Размер блока чтения текста
+READ_CHUNK = 1 << 20
+
+# Сколько последних событий журнала придерживается на случай служебной
+# записи об удалении ($pop), прежде чем отдать их читателю. Очистка ($clear)
+# может удалить сколько угодно событий, поэтому чтение начинается после
+# последней записи очистки (ее ищет предварительный проход по файлу)
+JOURNAL_LOOKBEHIND = 64
+# Начало строки записи очистки в журнале
+CLEAR_PREFIX = ('{"' + CLEAR_KEY + '"').encode("utf-8")
+
+# Расширения файлов метаданных (без расширения сжатия)
+METADATA_EXTENSIONS = (".json", ".scev")
+
+_WHITESPACE = " \t\r\n"
+
+
+class _JsonMetadataParser:
+    """
+    Потоковый разбор итогового JSON-файла метаданных. Поля верхнего уровня
+    разбираются целиком, а массив events - по одному событию, так что
+    в памяти никогда не находится весь файл или весь список событий.
+    """
+
+    def __init__(self, text):
+        self._text = text
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        self.header = {}
+        self.has_events = False
+        self._in_events = False
+
+        self._expect("{")
+        self._read_fields()
+
+    def _fill(self):
+        """Дочитывает текст; возвращает False в конце файла"""
+        if self._eof:
+            return False
+        chunk = self._text.read(READ_CHUNK)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _peek(self):
+        """Возвращает следующий значимый символ, пропуская пробелы"""
+        while True:
+            buffer = self._buffer
+            pos = self._pos
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            self._pos = pos
+            if pos < len(buffer):
+                return buffer[pos]
+            if not self._fill():
+                raise ValueError("Файл метаданных обрезан")
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise ValueError(f"Ожидался символ {char!r} в файле метаданных")
+        self._pos += 1
+
+    def _value(self):
+        """Разбирает очередное значение JSON"""
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except ValueError:
+                if self._fill():
+                    continue
+                raise
+            # Число в конце блока могло быть прочитано не полностью
+            if end >= len(self._buffer) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def _read_fields(self):
+        """Разбирает поля верхнего уровня до массива событий или до конца объекта"""
+        while True:
+            if self._peek() == "}":
+                self._pos += 1
+                return
+            key = self._value()
+            self._expect(":")
+            if key == "events":
+                self._expect("[")
+                self.has_events = True
+                self._in_events = True
+                return
+            self.header[key] = self._value()
+            if self._peek() == ",":
+                self._pos += 1
+
+    def events(self):
+        """Генератор событий; поля после массива событий попадают в header"""
+        while self._in_events:
+            if self._peek() == "]":
+                self._pos += 1
+                self._in_events = False
+                if self._peek() == ",":
+                    self._pos += 1
+                self._read_fields()
+                return
+            yield self._value()
+            if self._peek() == ",":
+                self._pos += 1
+
+
+class MetadataStream:
+    """
+    Потоковое чтение метаданных в любом поддерживаемом формате (итоговый JSON,
+    журнал JSON Lines, .scev, в том числе сжатые) без загрузки файла целиком:
+
+        with MetadataStream(path) as stream:
+            for event in stream:
+                ...
+
+    header содержит поля метаданных кроме событий. Поля, записанные после
+    событий (итог журнала, раздел timing итогового файла), появляются в header
+    после чтения всех событий.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.header = {}
+        self.has_events = True
+        self._stream = open_read(path)
+        try:
+            head = self._stream.peek(64)
+            if head.startswith(SUPPORTED_MAGICS):
+                self.format = "binary"
+                self._reader = BinaryEventReader(self._stream)
+                self.header = dict(self._reader.header)
+                return
+            self._text = io.TextIOWrapper(self._stream, encoding='utf-8')
+            if head.lstrip().startswith(('{"' + HEADER_KEY + '"').encode("utf-8")):
+                self.format = "journal"
+                self._journal_header()
+            else:
+                self.format = "json"
+                self._parser = _JsonMetadataParser(self._text)
+                self.header = self._parser.header
+                self.has_events = self._parser.has_events
+        except Exception:
+            self._stream.close()
+            raise
+
+    def _journal_header(self):
+        line = self._text.readline()
+        self.header = dict(json.loads(line)[HEADER_KEY])
+
+    def __iter__(self):
+        if self.format == "binary":
+            yield from self._reader
+            self.header.update(self._reader.trailer)
+        elif self.format == "journal":
+            yield from self._journal_events()
+        else:
+            yield from self._parser.events()
+
+    def _last_clear_line(self):
+        """Номер строки последней записи очистки журнала (с нуля, включая заголовок) или None"""
+        last_clear = None
+        with open_read(self.path) as f:
+            for number, line in enumerate(f):
+                if line.lstrip().startswith(CLEAR_PREFIX):
+                    last_clear = number
+        return last_clear
+
+    def _journal_events(self):
+        """События журнала с учетом служебных записей удаления и очистки"""
+        pending = deque()
+        last = None
+        # Строки до последней очистки (заголовок уже прочитан) пропускаются
+        skip = self._last_clear_line() or 0
+        for number, line in enumerate(self._text, 1):
+            if number <= skip:
+                continue
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Последняя строка могла быть записана не полностью
+                break
+            if FOOTER_KEY in record:
+                self.header.update(record[FOOTER_KEY])
+            elif POP_KEY in record:
+                if pending:
+                    pending.pop()
+            elif CLEAR_KEY in record:
+                pending.clear()
+            elif HEADER_KEY not in record:
+                pending.append(record)
+                if len(pending) > JOURNAL_LOOKBEHIND:
+                    last = pending.popleft()
+                    yield last
+        while pending:
+            last = pending.popleft()
+            yield last
+        # Без итоговой записи длительность - время последнего события (как в read_journal)
+        self.header.setdefault("recordingDuration", last.get("time", 0) if last else 0)
+
+    def close(self):
+        self._stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def find_recordings(folder):
+    """
+    Возвращает файлы метаданных в папке записей: итоговые JSON и .scev (в том
+    числе сжатые), а также журналы прерванных записей без итогового файла
+    """
+    paths = []
+    for name in sorted(os.listdir(folder)):
+        path = os.path.join(folder, name)
+        if name.endswith(TEMP_SUFFIX) or not os.path.isfile(path):
+            continue
+        if is_journal_path(name):
+            if not os.path.exists(metadata_path_for(path)):
+                paths.append(path)
+        elif os.path.splitext(strip_compression_extension(name))[1] in METADATA_EXTENSIONS:
+            paths.append(path)
+    return paths
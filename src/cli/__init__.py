@@ -0,0 +1 @@
+# Пустой файл для обозначения пакета
\ No newline at end of file
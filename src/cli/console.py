@@ -0,0 +1,29 @@
+import os
+import sys
+import contextlib
+
+# Команды печатают в stdout одну строку JSON с итогом для разбора скриптами.
+# Диагностика модулей записи и анализа (print) на время работы команды
+# уходит в stderr. Перенаправляется и дескриптор 1, поэтому в stderr попадает
+# и вывод процессов пула и внешних программ.
+
+
+@contextlib.contextmanager
+def diagnostics_to_stderr():
+    """Направляет stdout в stderr до выхода из блока"""
+    sys.stdout.flush()
+    try:
+        saved = os.dup(1)
+    except OSError:
+        # Нет дескриптора 1 (например, окно без консоли)
+        saved = None
+    if saved is not None:
+        os.dup2(2, 1)
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            yield
+    finally:
+        sys.stderr.flush()
+        if saved is not None:
+            os.dup2(saved, 1)
+            os.close(saved)
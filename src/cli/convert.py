@@ -0,0 +1,38 @@
+import sys
+import json
+import argparse
+from src.recorder.metadata_io import load_metadata, write_json_atomic
+from src.recorder.binary_events import BINARY_EXTENSION, write_binary_metadata
+from src.cli.console import diagnostics_to_stderr
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="screencaster convert",
+        description="Преобразование метаданных между форматами JSON, JSON Lines и бинарным (.scev)"
+    )
+    parser.add_argument("source", help="Исходный файл метаданных (формат определяется автоматически)")
+    parser.add_argument("target", help=f"Итоговый файл: {BINARY_EXTENSION} - бинарный формат, иначе JSON")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    with diagnostics_to_stderr():
+        try:
+            metadata = load_metadata(args.source)
+            if args.target.endswith(BINARY_EXTENSION):
+                write_binary_metadata(metadata, args.target)
+            else:
+                write_json_atomic(args.target, metadata)
+            summary = {"status": "ok", "target": args.target, "events": len(metadata.get("events", []))}
+            code = 0
+        except Exception as e:
+            summary = {"status": "error", "error": str(e)}
+            code = 1
+    print(json.dumps(summary, ensure_ascii=False))
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+import os
+import sys
+import copy
+import json
+import time
+import signal
+import argparse
+from src.utils.config import Config
+from src.cli.console import diagnostics_to_stderr
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="screencaster daemon",
+        description="Одновременная запись нескольких дисплеев в одном процессе"
+    )
+    parser.add_argument("spec",
+                        help="JSON-файл с описанием сессий и бюджетов")
+    return parser
+
+
+def load_spec(path):
+    """
+    Загружает описание демона. Пример:
+    {
+      "encoder_workers": 4,
+      "cpu_budget": 3.0,
+      "disk_budget_mb": 20000,
+      "sessions": [
+        {"name": "xvfb-99", "display": ":99", "output": "out/99.mp4", "fps": 10,
+         "cpu_budget": 0.5, "disk_budget_mb": 2000, "duration": 600}
+      ]
+    }
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        spec = json.load(f)
+    if not spec.get("sessions"):
+        raise ValueError("В описании нет ни одной сессии")
+    return spec
+
+
+def megabytes(value):
+    return None if value is None else int(value * 1024 * 1024)
+
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt()
+
+
+def run(spec):
+    """Запускает сессии из описания и возвращает их итоги"""
+    # Импортируем демон только здесь, чтобы --help работал без cv2 и pynput
+    from src.recorder.session_daemon import RecordingDaemon
+
+    base_config = Config()
+    daemon = RecordingDaemon(
+        encoder_workers=spec.get("encoder_workers", 2),
+        cpu_budget=spec.get("cpu_budget"),
+        disk_budget=megabytes(spec.get("disk_budget_mb")),
+        max_backlog=spec.get("max_backlog", 4)
+    )
+
+    # SIGTERM завершает запись так же, как Ctrl+C
+    signal.signal(signal.SIGTERM, _interrupt)
+
+    daemon.start()
+    try:
+        for item in spec["sessions"]:
+            # Настройки каждой сессии переопределяются только в памяти
+            config = copy.copy(base_config)
+            config.settings = dict(base_config.settings)
+            for key in ("fps", "region", "codec", "show_cursor", "show_clicks", "show_keystrokes",
+                        "event_stream", "event_processors"):
+                if key in item:
+                    config.settings[key] = item[key]
+            output = item.get("output")
+            if output:
+                extension = os.path.splitext(output)[1].lstrip(".")
+                if extension:
+                    config.settings["video_format"] = extension
+
+            daemon.add_session(
+                item["name"], config,
+                display=item.get("display"),
+                output_file=output,
+                cpu_budget=item.get("cpu_budget"),
+                disk_budget=megabytes(item.get("disk_budget_mb")),
+                duration=item.get("duration")
+            )
+
+        # Без длительности сессии работают до сигнала остановки
+        while daemon.sessions:
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        summaries = daemon.stop()
+    return {"status": "ok", "sessions": summaries}
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    with diagnostics_to_stderr():
+        try:
+            summary = run(load_spec(args.spec))
+            code = 0
+        except Exception as e:
+            summary = {"status": "error", "error": str(e)}
+            code = 1
+    # Итог выводится одной строкой JSON для разбора скриптами
+    print(json.dumps(summary, ensure_ascii=False))
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+import os
+import sys
+import json
+import argparse
+from src.cli.record import parse_region
+from src.cli.console import diagnostics_to_stderr
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="screencaster heatmap",
+        description="Тепловые карты кликов и прокрутки поверх кадра видео записи"
+    )
+    parser.add_argument("path", help="Файл метаданных или папка с записями")
+    parser.add_argument("-o", "--output", help="Папка для изображений (по умолчанию рядом с записью)")
+    parser.add_argument("--kind", choices=["clicks", "scroll", "all"], default="clicks",
+                        help="События для карты: клики и перетаскивания, прокрутка или все")
+    parser.add_argument("--start", type=float, help="Начало окна времени, секунды")
+    parser.add_argument("--end", type=float, help="Конец окна времени, секунды")
+    parser.add_argument("--window", type=float,
+                        help="Отдельная карта для каждого окна указанной длины, секунды")
+    parser.add_argument("--sigma", type=float, default=24.0, help="Радиус размытия в пикселях")
+    parser.add_argument("--alpha", type=float, default=0.6, help="Максимальная непрозрачность карты")
+    parser.add_argument("--region", type=parse_region, default=None,
+                        help="Область экрана, которая записывалась в видео: x,y,ширина,высота "
+                             "(по умолчанию - из метаданных записи)")
+    parser.add_argument("--workers", type=int, help="Количество процессов для папки записей")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    with diagnostics_to_stderr():
+        try:
+            from src.analytics.heatmap import HeatmapRenderer, heatmap_path, render_folder
+
+            options = {"kind": args.kind, "sigma": args.sigma, "alpha": args.alpha, "region": args.region}
+            if os.path.isdir(args.path):
+                results = render_folder(args.path, args.output, args.workers, args.start, args.end,
+                                        args.window, **options)
+            else:
+                if args.output and not os.path.exists(args.output):
+                    os.makedirs(args.output)
+                renderer = HeatmapRenderer(**options)
+                if args.window:
+                    results = renderer.render_windows(args.path, args.output, args.window)
+                else:
+                    output_file = heatmap_path(args.path, args.output, args.start, args.end)
+                    results = [renderer.render(args.path, output_file, args.start, args.end)]
+            errors = [r for r in results if "error" in r]
+            summary = {"status": "error" if errors else "ok", "images": len(results) - len(errors),
+                       "results": results}
+            code = 1 if errors else 0
+        except Exception as e:
+            summary = {"status": "error", "error": str(e)}
+            code = 1
+    print(json.dumps(summary, ensure_ascii=False))
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+import os
+import sys
+import json
+import time
+import argparse
+from src.utils.config import Config
+from src.cli.console import diagnostics_to_stderr
+
+
+def parse_region(value):
+    """Разбирает область записи в формате x,y,ширина,высота"""
+    try:
+        parts = [int(v) for v in value.split(",")]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Некорректная область: {value}")
+    if len(parts) != 4 or parts[2] <= 0 or parts[3] <= 0:
+        raise argparse.ArgumentTypeError(f"Ожидается x,y,ширина,высота: {value}")
+    return parts
+
+
+def parse_processor(value):
+    """Обработчик событий: модуль:фабрика или JSON {"processor": ..., "options": ..., "threaded": ...}"""
+    if not value.lstrip().startswith("{"):
+        return value
+    try:
+        spec = json.loads(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Некорректное описание обработчика: {value}")
+    if not isinstance(spec, dict) or "processor" not in spec:
+        raise argparse.ArgumentTypeError(f"Ожидается поле processor: {value}")
+    return spec
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="screencaster record",
+        description="Запись экрана без графического интерфейса (Qt не используется)"
+    )
+    parser.add_argument("--duration", type=float, default=None,
+                        help="Длительность записи в секундах (по умолчанию - до Ctrl+C)")
+    parser.add_argument("--fps", type=int, default=None,
+                        help="Частота кадров записи")
+    parser.add_argument("--region", type=parse_region, default=None,
+                        help="Область записи: x,y,ширина,высота")
+    parser.add_argument("--output", default=None,
+                        help="Путь к видеофайлу (метаданные сохраняются рядом с расширением .json)")
+    parser.add_argument("--codec", default=None,
+                        help="FourCC кодека, например mp4v или XVID")
+    parser.add_argument("--no-cursor", action="store_true",
+                        help="Не рисовать курсор на кадрах")
+    parser.add_argument("--show-clicks", action="store_true",
+                        help="Рисовать на кадрах круги кликов")
+    parser.add_argument("--show-keystrokes", action="store_true",
+                        help="Рисовать на кадрах строку нажатых клавиш и горячих клавиш")
+    parser.add_argument("--idle-timeout", type=float, default=None,
+                        help="Автопауза после указанного числа секунд без ввода и изменений экрана")
+    parser.add_argument("--idle-mode", choices=["pause", "trickle"], default=None,
+                        help="В простое: pause - остановить запись, trickle - захватывать редкие кадры")
+    parser.add_argument("--stream", metavar="ADDRESS", default=None,
+                        help="Живой поток событий: хост:порт или unix:/путь (клиент - cli.py stream)")
+    parser.add_argument("--stream-policy", choices=["drop-oldest", "drop-newest", "disconnect"],
+                        default=None, help="Что делать, если подписчик не успевает читать поток")
+    parser.add_argument("--processor", type=parse_processor, action="append", default=None,
+                        help="Этап обработки событий (можно несколько): модуль:фабрика или JSON, "
+                             "например {\"processor\": \"src.recorder.event_pipeline:JsonLinesExporter\", "
+                             "\"options\": {\"path\": \"events.jsonl\"}, \"threaded\": true}")
+    parser.add_argument("--redact-text", action="store_true",
+                        help="Скрыть набранный текст в метаданных, журнале, живом потоке и наложении")
+    parser.add_argument("--standby", action="store_true",
+                        help="Подготовить запись заранее (режим ожидания) перед стартом")
+    return parser
+
+
+def run(args):
+    """Выполняет запись и возвращает словарь с итогами"""
+    # Импортируем рекордер только здесь, чтобы --help работал без cv2 и pynput
+    from src.recorder.screen_recorder import ScreenRecorder
+
+    config = Config()
+    # Переопределяем настройки только в памяти, не трогая сохраненный конфиг
+    settings = dict(config.settings)
+    if args.fps:
+        settings["fps"] = args.fps
+    if args.region:
+        settings["region"] = args.region
+    if args.codec:
+        settings["codec"] = args.codec
+    if args.no_cursor:
+        settings["show_cursor"] = False
+    if args.show_clicks:
+        settings["show_clicks"] = True
+    if args.show_keystrokes:
+        settings["show_keystrokes"] = True
+    if args.idle_timeout is not None:
+        settings["idle_timeout"] = args.idle_timeout
+    if args.idle_mode:
+        settings["idle_mode"] = args.idle_mode
+    if args.stream:
+        settings["event_stream"] = args.stream
+    if args.stream_policy:
+        settings["event_stream_policy"] = args.stream_policy
+    if args.redact_text:
+        settings["redact_text"] = True
+    if args.processor:
+        settings["event_processors"] = list(settings.get("event_processors") or []) + args.processor
+    if args.output:
+        extension = os.path.splitext(args.output)[1].lstrip(".")
+        if extension:
+            settings["video_format"] = extension
+    config.settings = settings
+
+    recorder = ScreenRecorder(config)
+    collector = recorder.metadata_collector
+
+    if args.standby:
+        recorder.prepare()
+
+    started = time.time()
+    recorder.start_recording(args.output)
+    try:
+        if args.duration is not None:
+            time.sleep(args.duration)
+        else:
+            while True:
+                time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        video_file, metadata_file = recorder.stop_recording()
+        recorder.close()
+
+    elapsed = time.time() - started
+    summary = {
+        "status": "ok",
+        "video": os.path.abspath(video_file),
+        "metadata": os.path.abspath(metadata_file),
+        "duration": round(elapsed, 3),
+        "frames": recorder.frames_written,
+        "fps": settings["fps"],
+        "events": len(collector.get_events()),
+        "callbackLatencyUs": collector.get_callback_latency(),
+        "timing": recorder.timing,
+        "timeToFirstFrame": None if recorder.time_to_first_frame is None
+                            else round(recorder.time_to_first_frame, 4),
+        "region": settings.get("region"),
+        "idle": recorder.idle_detector.summary() if recorder.idle_detector else None,
+        "stream": recorder.event_publisher.stats() if recorder.event_publisher else None,
+        "pipeline": recorder.event_pipeline.stats() if recorder.event_pipeline else None,
+    }
+    if not recorder.frames_written:
+        # Захват не дал ни одного кадра (недоступен $DISPLAY, ошибка снимка экрана)
+        summary["status"] = "error"
+        summary["error"] = "Не записано ни одного кадра"
+    return summary
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    with diagnostics_to_stderr():
+        try:
+            summary = run(args)
+            code = 0 if summary["status"] == "ok" else 1
+        except Exception as e:
+            summary = {"status": "error", "error": str(e)}
+            code = 1
+    # Итог выводится одной строкой JSON для разбора скриптами
+    print(json.dumps(summary, ensure_ascii=False))
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+import os
+import sys
+import json
+import argparse
+from src.recorder.metadata_io import (journal_path_for, metadata_path_for, is_journal_path,
+                                      recover_journal)
+from src.recorder.compression import GZIP, ZSTD
+from src.cli.console import diagnostics_to_stderr
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="screencaster recover",
+        description="Восстановление метаданных из журнала событий после сбоя записи"
+    )
+    parser.add_argument("path",
+                        help="Журнал событий (.jsonl, .jsonl.gz, .jsonl.zst), файл метаданных или папка с записями")
+    parser.add_argument("--output", default=None,
+                        help="Итоговый файл метаданных (только для одного журнала)")
+    parser.add_argument("--keep-journal", action="store_true",
+                        help="Не удалять журнал после восстановления")
+    parser.add_argument("--force", action="store_true",
+                        help="Перезаписать существующий файл метаданных")
+    return parser
+
+
+def find_journals(path):
+    """Возвращает журналы событий для пути: файла журнала, файла метаданных или папки"""
+    if os.path.isdir(path):
+        return sorted(
+            os.path.join(path, name) for name in os.listdir(path)
+            if is_journal_path(name)
+        )
+    if is_journal_path(path):
+        return [path]
+    # Журнал файла метаданных мог быть записан со сжатием
+    candidates = [journal_path_for(path, c) for c in (None, GZIP, ZSTD)]
+    existing = [c for c in candidates if os.path.exists(c)]
+    return existing or candidates[:1]
+
+
+def recover(journal, output=None, keep_journal=False, force=False):
+    """Восстанавливает один журнал и возвращает итог"""
+    target = output or metadata_path_for(journal)
+    if not os.path.exists(journal):
+        if os.path.exists(target):
+            return {"journal": journal, "metadata": target, "status": "complete"}
+        return {"journal": journal, "status": "missing"}
+    if os.path.exists(target) and not force:
+        # Итоговый JSON сохраняется атомарно до удаления журнала,
+        # поэтому существующий файл уже содержит все события
+        return {"journal": journal, "metadata": target, "status": "complete"}
+    metadata = recover_journal(journal, target, remove_journal=not keep_journal)
+    return {
+        "journal": journal,
+        "metadata": target,
+        "status": "recovered",
+        "events": len(metadata["events"]),
+        "recordingDuration": metadata.get("recordingDuration"),
+    }
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    with diagnostics_to_stderr():
+        try:
+            journals = find_journals(args.path)
+            if args.output and len(journals) != 1:
+                raise ValueError("--output можно указать только для одного журнала")
+            results = [recover(journal, args.output, args.keep_journal, args.force)
+                       for journal in journals]
+            failed = [r for r in results if r["status"] == "missing"]
+            summary = {"status": "error" if failed else "ok", "journals": results}
+            code = 1 if failed else 0
+        except Exception as e:
+            summary = {"status": "error", "error": str(e)}
+            code = 1
+    print(json.dumps(summary, ensure_ascii=False))
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+import os
+import sys
+import json
+import time
+import argparse
+from src.cli.console import diagnostics_to_stderr
+
+
+def parse_offset(value):
+    """Разбирает сдвиг координат в формате dx,dy"""
+    try:
+        parts = [int(v) for v in value.split(",")]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Некорректный сдвиг: {value}")
+    if len(parts) != 2:
+        raise argparse.ArgumentTypeError(f"Ожидается dx,dy: {value}")
+    return parts
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="screencaster replay",
+        description="Воспроизведение кликов, перетаскивания, прокрутки и клавиш из метаданных записи"
+    )
+    parser.add_argument("path", help="Файл метаданных")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Скорость воспроизведения (2 - вдвое быстрее)")
+    parser.add_argument("--offset", type=parse_offset, default=(0, 0),
+                        help="Сдвиг координат: dx,dy")
+    parser.add_argument("--delay", type=float, default=3.0,
+                        help="Пауза перед началом, секунды (чтобы переключиться на нужное окно)")
+    parser.add_argument("--record", metavar="VIDEO",
+                        help="Записать воспроизведение в видеофайл и сравнить события с исходными")
+    parser.add_argument("--report", help="JSON-файл для полного отчета с ошибкой времени каждого события")
+    return parser
+
+
+def run(args):
+    """Выполняет воспроизведение и возвращает словарь с итогами"""
+    # Импортируем pynput и рекордер только здесь, чтобы --help работал без них
+    from src.recorder.metadata_io import load_metadata
+    from src.recorder.replay import ReplayEngine, compare_events
+
+    events = load_metadata(args.path).get("events", [])
+    engine = ReplayEngine(speed=args.speed, offset=args.offset)
+    recorder = None
+    if args.record:
+        from src.recorder.screen_recorder import ScreenRecorder
+        from src.utils.config import Config
+        recorder = ScreenRecorder(Config())
+        recorder.prepare()
+
+    time.sleep(args.delay)
+    if recorder is not None:
+        recorder.start_recording(args.record)
+    try:
+        report = engine.play(events, recorder.clock if recorder is not None else None)
+    except KeyboardInterrupt:
+        engine.stop()
+        report = {"completed": False}
+    finally:
+        if recorder is not None:
+            video_file, metadata_file = recorder.stop_recording()
+            recorder.close()
+
+    summary = {"status": "ok" if report.get("completed") else "interrupted"}
+    summary.update((k, v) for k, v in report.items() if k != "perEvent")
+    if recorder is not None:
+        recorded = load_metadata(metadata_file).get("events", [])
+        comparison = compare_events(events, recorded, report.get("sessionStart") or 0.0, args.speed)
+        report["comparison"] = comparison
+        summary["video"] = os.path.abspath(video_file)
+        summary["metadata"] = os.path.abspath(metadata_file)
+        summary["comparison"] = {k: v for k, v in comparison.items() if k != "inputMismatches"}
+        summary["comparison"]["inputMismatches"] = len(comparison["inputMismatches"])
+        if summary["status"] == "ok" and not comparison["match"]:
+            summary["status"] = "mismatch"
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        summary["report"] = os.path.abspath(args.report)
+    return summary
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    with diagnostics_to_stderr():
+        try:
+            summary = run(args)
+            code = 0 if summary["status"] == "ok" else 1
+        except Exception as e:
+            summary = {"status": "error", "error": str(e)}
+            code = 1
+    print(json.dumps(summary, ensure_ascii=False))
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+import os
+import sys
+import json
+import argparse
+from src.cli.console import diagnostics_to_stderr
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="screencaster stats",
+        description="Статистика действий пользователя по файлам метаданных (потоковое чтение, NumPy)"
+    )
+    parser.add_argument("path", help="Папка с записями или отдельный файл метаданных")
+    parser.add_argument("--idle", type=float, default=5.0,
+                        help="Минимальная длительность простоя в секундах")
+    parser.add_argument("--no-files", action="store_true",
+                        help="Не выводить сводку по каждой записи")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    with diagnostics_to_stderr():
+        try:
+            # NumPy загружается только для этой команды
+            from src.analytics.event_stats import analyze_folder, load_table
+
+            if os.path.isdir(args.path):
+                summary = analyze_folder(args.path, args.idle)
+                if args.no_files:
+                    summary.pop("files")
+            else:
+                summary = load_table(args.path).summary(args.idle)
+            summary["status"] = "ok"
+            code = 0
+        except Exception as e:
+            summary = {"status": "error", "error": str(e)}
+            code = 1
+    print(json.dumps(summary, ensure_ascii=False))
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
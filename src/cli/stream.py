@@ -0,0 +1,94 @@
+import sys
+import json
+import time
+import argparse
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="screencaster stream",
+        description="Клиент живого потока событий записи (cli.py record --stream): "
+                    "выводит события и измеряет задержку от ввода до получения"
+    )
+    parser.add_argument("address", nargs="?", default="127.0.0.1:47800",
+                        help="Адрес потока: хост:порт или unix:/путь")
+    parser.add_argument("--count", type=int, help="Завершиться после указанного числа событий")
+    parser.add_argument("--duration", type=float, help="Завершиться через указанное число секунд")
+    parser.add_argument("--events", action="store_true",
+                        help="Выводить каждое событие и отзыв события (retract) строкой JSON")
+    parser.add_argument("--slow", type=float, default=0.0,
+                        help="Задержка обработки каждого события, мс (проверка политики переполнения)")
+    return parser
+
+
+def latency_summary(values_ns):
+    """Медиана, 95-й процентиль и максимум задержки, мс"""
+    if not values_ns:
+        return None
+    ordered = sorted(values_ns)
+    return {
+        "p50Ms": round(ordered[len(ordered) // 2] / 1e6, 3),
+        "p95Ms": round(ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)] / 1e6, 3),
+        "maxMs": round(ordered[-1] / 1e6, 3),
+    }
+
+
+def run(args):
+    from src.recorder.event_stream import EventStreamClient
+
+    started = time.monotonic()
+    received = 0
+    retracted = 0
+    missed = 0
+    last_seq = None
+    latencies = []
+    with EventStreamClient(args.address, timeout=0.2) as client:
+        while not client.closed:
+            if args.duration is not None and time.monotonic() - started >= args.duration:
+                break
+            frames, received_ns = client.receive()
+            for frame in frames:
+                if frame.get("retract"):
+                    # Отзыв ранее полученного события: номер seq не новый
+                    retracted += 1
+                    if args.events:
+                        print(json.dumps({"retract": True, "id": frame.get("id")}), flush=True)
+                    continue
+                seq = frame.get("seq")
+                if last_seq is not None and seq > last_seq + 1:
+                    # Пропуск номеров - кадры, сброшенные сервером для этого клиента
+                    missed += seq - last_seq - 1
+                last_seq = seq
+                received += 1
+                if frame.get("sourceNs") is not None:
+                    latencies.append(received_ns - frame["sourceNs"])
+                if args.events:
+                    print(json.dumps(frame["event"], ensure_ascii=False), flush=True)
+                if args.slow:
+                    time.sleep(args.slow / 1000)
+            if args.count is not None and received >= args.count:
+                break
+    return {
+        "status": "ok",
+        "events": received,
+        "retracted": retracted,
+        "missed": missed,
+        "closed": client.closed,
+        "latency": latency_summary(latencies),
+    }
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        summary = run(args)
+        code = 0
+    except Exception as e:
+        summary = {"status": "error", "error": str(e)}
+        code = 1
+    print(json.dumps(summary, ensure_ascii=False))
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+import sys
+import json
+import argparse
+from src.cli.record import parse_region
+from src.cli.console import diagnostics_to_stderr
+
+
+def parse_size(value):
+    """Разбирает размер вида 1280x720"""
+    try:
+        width, height = (int(v) for v in value.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError("Размер задается как ШИРИНАxВЫСОТА, например 1280x720")
+    return width, height
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="screencaster zoom",
+        description="Видео с автоматическим приближением к кликам, перетаскиванию и вводу текста"
+    )
+    parser.add_argument("video", help="Видеофайл записи")
+    parser.add_argument("--metadata", help="Файл метаданных (по умолчанию рядом с видео)")
+    parser.add_argument("-o", "--output", help="Итоговый видеофайл (по умолчанию *_zoom рядом с видео)")
+    parser.add_argument("--zoom", type=float, default=2.0, help="Масштаб приближения к клику")
+    parser.add_argument("--input-zoom", type=float, default=2.2, help="Масштаб приближения к вводу текста")
+    parser.add_argument("--max-zoom", type=float, default=3.0, help="Предельный масштаб")
+    parser.add_argument("--hold", type=float, default=1.5,
+                        help="Сколько секунд камера удерживает цель после события")
+    parser.add_argument("--smoothing", type=float, default=0.4, help="Сглаживание движения камеры, секунды")
+    parser.add_argument("--region", type=parse_region, default=None,
+                        help="Область экрана, которая записывалась в видео: x,y,ширина,высота "
+                             "(по умолчанию - из метаданных записи)")
+    parser.add_argument("--size", type=parse_size, help="Размер итогового видео, например 1280x720")
+    parser.add_argument("--workers", type=int, help="Количество процессов")
+    parser.add_argument("--chunk", type=float, default=20, help="Длительность куска видео на процесс, секунды")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    with diagnostics_to_stderr():
+        try:
+            from src.analytics.autozoom import AutoZoomRenderer
+
+            renderer = AutoZoomRenderer(click_zoom=args.zoom, input_zoom=args.input_zoom,
+                                        max_zoom=args.max_zoom, hold=args.hold, smoothing=args.smoothing,
+                                        region=args.region, output_size=args.size, workers=args.workers,
+                                        chunk_seconds=args.chunk)
+            summary = renderer.render(args.video, args.metadata, args.output)
+            summary["status"] = "ok"
+            code = 0
+        except Exception as e:
+            summary = {"status": "error", "error": str(e)}
+            code = 1
+    print(json.dumps(summary, ensure_ascii=False))
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,537 @@
+import io
+import json
+import struct
+from src.recorder.compression import CompressedWriter, compression_for_path, open_read
+
+# Компактный бинарный формат событий (.scev).
+#
+# Файл начинается с сигнатуры и заголовка метаданных в JSON, далее идут записи:
+#   STRING  - определение строки из таблицы интернирования (типы, клавиши, коды, текст)
+#   ATOM    - определение клавиши: тройка (key, code, keyCode) из интернированных строк
+#   KEYSET  - определение набора клавиш (keys/codes/keyCodes) как списка клавиш-атомов
+#   EVENT   - событие фиксированной длины; время хранится как разность
+#             в миллисекундах с предыдущим событием. Если у события есть
+#             номер кадра видео (frame), он дописывается сразу после записи,
+#             а за ним - последовательность целых чисел переменной длины
+#             (разности пути path у drag и mouseMove)
+#   RAW     - событие, которое не укладывается в фиксированную запись, в JSON
+#   TRAILER - итоговые поля метаданных (recordingDuration) в JSON
+# Строки, клавиши и наборы клавиш определяются один раз перед первым
+# использованием, поэтому файл можно писать и читать потоково.
+
+MAGIC = b"SCEV\x03\n"
+# Версии 1 и 2 отличаются только отсутствием номера кадра и последовательностей
+# целых чисел и читаются без изменений
+SUPPORTED_MAGICS = (b"SCEV\x01\n", b"SCEV\x02\n", MAGIC)
+BINARY_EXTENSION = ".scev"
+
+TAG_STRING = 1
+TAG_ATOM = 2
+TAG_KEYSET = 3
+TAG_EVENT = 4
+TAG_RAW = 5
+TAG_TRAILER = 6
+
+# Запись события после байта тега:
+# type, flags, id, dt, x, y, x2, y2, duration, end, aux, str1, str2, keyset
+EVENT_RECORD = struct.Struct("<IHHiiiiiiiiIII")
+LENGTH = struct.Struct("<I")
+ATOM_RECORD = struct.Struct("<IIi")
+ATOM_ID = struct.Struct("<H")
+FRAME = struct.Struct("<I")
+INT = struct.Struct("<i")
+
+FLAG_HAS_KEYS = 1
+FLAG_HAS_FRAME = 2
+FLAG_HAS_INTS = 4
+
+FRAME_MAX = 2 ** 32 - 1
+INT32_MIN = -2 ** 31
+INT32_MAX = 2 ** 31 - 1
+
+# Размер блока чтения потокового декодера
+READ_CHUNK = 1 << 20
+
+
+def _to_ms(value):
+    return int(round(value * 1000))
+
+
+def _from_ms(value):
+    # Деление целого на 1000 уже дает ближайшее к 3 знакам число с плавающей точкой
+    return value / 1000
+
+
+def _keys_of(event):
+    """Возвращает набор клавиш события как кортеж троек или None"""
+    keys, codes, key_codes = event.get("keys"), event.get("codes"), event.get("keyCodes")
+    if keys is None and codes is None and key_codes is None:
+        return None
+    return tuple(zip(keys, codes, key_codes))
+
+
+def _set_keys(event, keys):
+    if keys is None:
+        event["keys"] = event["codes"] = event["keyCodes"] = None
+    else:
+        event["keys"], event["codes"], event["keyCodes"] = keys
+
+
+# Упаковка полей для известных типов событий.
+# Возвращает (x, y, x2, y2, duration, end, aux, str1, str2, keys, ints), где
+# ints - список целых чисел переменной длины или None.
+
+def _pack_key(event):
+    duration = _to_ms(event["duration"]) if "duration" in event else 0
+    return 0, 0, 0, 0, duration, 0, event["keyCode"], event["key"], event["code"], None, None
+
+
+def _pack_hotkey(event):
+    return 0, 0, 0, 0, 0, 0, 0, event["hotkey"], None, _keys_of(event), None
+
+
+def _pack_click(event):
+    return event["x"], event["y"], 0, 0, 0, 0, 0, None, None, _keys_of(event), None
+
+
+def _pack_drag(event):
+    start, end = event["start"], event["end"]
+    return (start["x"], start["y"], end["x"], end["y"], _to_ms(event["duration"]),
+            _to_ms(event["endTime"]) - _to_ms(event["time"]), 0, None, None, _keys_of(event),
+            event.get("path"))
+
+
+def _pack_move(event):
+    return (event["x"], event["y"], 0, 0, _to_ms(event["duration"]), 0, 0, None, None, None,
+            event["path"])
+
+
+def _pack_scroll(event):
+    start, end = event["start"], event["end"]
+    return (start["x"], start["y"], end["x"], end["y"], _to_ms(event["duration"]),
+            _to_ms(event["endTime"]) - _to_ms(event["time"]), event["scrollAmount"],
+            event["direction"], None, _keys_of(event), None)
+
+
+def _pack_input(event):
+    return (0, 0, 0, 0, _to_ms(event["duration"]), 0, event["length"],
+            event["value"], event["reason"], _keys_of(event), event.get("modifiers"))
+
+
+# Распаковка восстанавливает событие с тем же порядком полей, что и MetadataCollector.
+# keys - кортеж из трех списков (keys, codes, keyCodes) или None.
+
+def _unpack_key_press(event, time_ms, x, y, x2, y2, duration, end, aux, str1, str2, keys, ints):
+    event["key"] = str1
+    event["code"] = str2
+    event["keyCode"] = aux
+
+
+def _unpack_long_press(event, time_ms, x, y, x2, y2, duration, end, aux, str1, str2, keys, ints):
+    event["duration"] = _from_ms(duration)
+    event["key"] = str1
+    event["code"] = str2
+    event["keyCode"] = aux
+
+
+def _unpack_hotkey(event, time_ms, x, y, x2, y2, duration, end, aux, str1, str2, keys, ints):
+    event["hotkey"] = str1
+    _set_keys(event, keys)
+
+
+def _unpack_click(event, time_ms, x, y, x2, y2, duration, end, aux, str1, str2, keys, ints):
+    event["x"] = x
+    event["y"] = y
+    _set_keys(event, keys)
+
+
+def _unpack_drag(event, time_ms, x, y, x2, y2, duration, end, aux, str1, str2, keys, ints):
+    start_time = event["time"]
+    end_time = _from_ms(time_ms + end)
+    event["startTime"] = start_time
+    event["endTime"] = end_time
+    event["x"] = x
+    event["y"] = y
+    event["start"] = {"x": x, "y": y, "time": start_time}
+    event["end"] = {"x": x2, "y": y2, "time": end_time}
+    event["duration"] = _from_ms(duration)
+    _set_keys(event, keys)
+    if ints is not None:
+        event["path"] = ints
+
+
+def _unpack_move(event, time_ms, x, y, x2, y2, duration, end, aux, str1, str2, keys, ints):
+    event["duration"] = _from_ms(duration)
+    event["x"] = x
+    event["y"] = y
+    event["path"] = ints
+
+
+def _unpack_scroll(event, time_ms, x, y, x2, y2, duration, end, aux, str1, str2, keys, ints):
+    start_time = event["time"]
+    end_time = _from_ms(time_ms + end)
+    event["startTime"] = start_time
+    event["endTime"] = end_time
+    event["start"] = {"x": x, "y": y, "time": start_time}
+    event["end"] = {"x": x2, "y": y2, "time": end_time}
+    event["scrollAmount"] = aux
+    event["direction"] = str1
+    event["duration"] = _from_ms(duration)
+    _set_keys(event, keys)
+
+
+def _unpack_input(event, time_ms, x, y, x2, y2, duration, end, aux, str1, str2, keys, ints):
+    event["duration"] = _from_ms(duration)
+    _set_keys(event, keys)
+    # Маски модификаторов для каждой клавиши (в записях до их появления нет)
+    if ints is not None:
+        event["modifiers"] = ints
+    event["length"] = aux
+    event["value"] = str1
+    event["reason"] = str2
+
+
+CODECS = {
+    "keyPress": (_pack_key, _unpack_key_press),
+    "keyLongPress": (_pack_key, _unpack_long_press),
+    "hotkey": (_pack_hotkey, _unpack_hotkey),
+    "leftClick": (_pack_click, _unpack_click),
+    "rightClick": (_pack_click, _unpack_click),
+    "doubleClick": (_pack_click, _unpack_click),
+    "drag": (_pack_drag, _unpack_drag),
+    "mouseMove": (_pack_move, _unpack_move),
+    "scroll": (_pack_scroll, _unpack_scroll),
+    "input": (_pack_input, _unpack_input),
+}
+
+
+def _parse_id(value):
+    """Идентификатор из 4 шестнадцатеричных символов хранится как число"""
+    if type(value) is str and len(value) == 4:
+        try:
+            number = int(value, 16)
+        except ValueError:
+            return None
+        if "%04x" % number == value:
+            return number
+    return None
+
+
+def _keys_lists(keys):
+    """Преобразует кортеж троек в кортеж трех списков (keys, codes, keyCodes)"""
+    if keys is None:
+        return None
+    return [k[0] for k in keys], [k[1] for k in keys], [k[2] for k in keys]
+
+
+def pack_event(event):
+    """
+    Раскладывает событие по полям фиксированной записи.
+    Возвращает (time_ms, id, x, y, x2, y2, duration, end, aux, str1, str2, keys, ints, frame)
+    или None, если событие нельзя восстановить из этих полей без потерь.
+    ints - список целых чисел (int32) или None, frame - номер кадра видео
+    или None, если у события его нет.
+    """
+    codec = CODECS.get(event.get("type"))
+    event_id = _parse_id(event.get("id"))
+    if codec is None or event_id is None or type(event.get("time")) not in (int, float):
+        return None
+
+    frame = event.get("frame")
+    if frame is not None:
+        if type(frame) is not int or not 0 <= frame <= FRAME_MAX:
+            return None
+        # Номер кадра хранится отдельно от полей кодека
+        event = dict(event)
+        del event["frame"]
+
+    try:
+        x, y, x2, y2, duration, end, aux, str1, str2, keys, ints = codec[0](event)
+        if not all(type(v) is int for v in (x, y, x2, y2, aux)):
+            return None
+        if not all(v is None or type(v) is str for v in (str1, str2)):
+            return None
+        if keys is not None and not all(
+                (k is None or type(k) is str) and (c is None or type(c) is str) and type(n) is int
+                for k, c, n in keys):
+            return None
+        if ints is not None and (type(ints) is not list or not all(
+                type(v) is int and INT32_MIN <= v <= INT32_MAX for v in ints)):
+            return None
+
+        # Проверяем, что событие восстанавливается без потерь
+        time_ms = _to_ms(event["time"])
+        decoded = {"id": event["id"], "type": event["type"], "time": _from_ms(time_ms)}
+        codec[1](decoded, time_ms, x, y, x2, y2, duration, end, aux, str1, str2, _keys_lists(keys),
+                 None if ints is None else list(ints))
+        if decoded != event:
+            return None
+    except (KeyError, TypeError, ValueError, OverflowError):
+        return None
+    return time_ms, event_id, x, y, x2, y2, duration, end, aux, str1, str2, keys, ints, frame
+
+
+def unpack_event(event_type, event_id, time_ms, x, y, x2, y2, duration, end, aux, str1, str2, keys,
+                 ints=None, frame=None):
+    """Восстанавливает событие из полей фиксированной записи (обратно к pack_event)"""
+    event = {"id": "%04x" % event_id, "type": event_type, "time": _from_ms(time_ms)}
+    CODECS[event_type][1](event, time_ms, x, y, x2, y2, duration, end, aux, str1, str2,
+                          _keys_lists(keys), ints)
+    if frame is not None:
+        event["frame"] = frame
+    return event
+
+
+class BinaryEventWriter:
+    """Потоковый кодировщик событий в бинарный формат"""
+
+    def __init__(self, stream, header):
+        self.stream = stream
+        self._strings = {None: 0}
+        self._atoms = {}
+        self._keysets = {}
+        self._last_time_ms = 0
+        header_data = json.dumps(header, ensure_ascii=False).encode("utf-8")
+        stream.write(MAGIC + LENGTH.pack(len(header_data)) + header_data)
+
+    def _string_id(self, value):
+        string_id = self._strings.get(value)
+        if string_id is None:
+            string_id = len(self._strings)
+            self._strings[value] = string_id
+            data = value.encode("utf-8")
+            self.stream.write(bytes((TAG_STRING,)) + LENGTH.pack(len(data)) + data)
+        return string_id
+
+    def _atom_id(self, atom):
+        atom_id = self._atoms.get(atom)
+        if atom_id is None:
+            atom_id = len(self._atoms)
+            record = ATOM_RECORD.pack(self._string_id(atom[0]), self._string_id(atom[1]), atom[2])
+            self._atoms[atom] = atom_id
+            self.stream.write(bytes((TAG_ATOM,)) + record)
+        return atom_id
+
+    def _keyset_id(self, keys):
+        keyset_id = self._keysets.get(keys)
+        if keyset_id is None:
+            items = b"".join(ATOM_ID.pack(self._atom_id(atom)) for atom in keys)
+            keyset_id = len(self._keysets) + 1
+            self._keysets[keys] = keyset_id
+            self.stream.write(bytes((TAG_KEYSET,)) + LENGTH.pack(len(keys)) + items)
+        return keyset_id
+
+    def write(self, event):
+        """Кодирует одно событие"""
+        record = self._encode(event)
+        if record is None:
+            # Событие нестандартной формы сохраняется в JSON без потерь
+            data = json.dumps(event, ensure_ascii=False).encode("utf-8")
+            self.stream.write(bytes((TAG_RAW,)) + LENGTH.pack(len(data)) + data)
+            time_value = event.get("time")
+            if type(time_value) in (int, float):
+                self._last_time_ms = _to_ms(time_value)
+        else:
+            self.stream.write(record)
+
+    def _encode(self, event):
+        """Возвращает фиксированную запись события или None, если она невозможна без потерь"""
+        packed = pack_event(event)
+        if packed is None:
+            return None
+        time_ms, event_id, x, y, x2, y2, duration, end, aux, str1, str2, keys, ints, frame = packed
+        flags = FLAG_HAS_KEYS if keys is not None else 0
+        if frame is not None:
+            flags |= FLAG_HAS_FRAME
+        if ints is not None:
+            flags |= FLAG_HAS_INTS
+        try:
+            body = EVENT_RECORD.pack(
+                self._string_id(event["type"]), flags, event_id,
+                time_ms - self._last_time_ms, x, y, x2, y2, duration, end, aux,
+                self._string_id(str1), self._string_id(str2),
+                self._keyset_id(keys) if keys is not None else 0
+            )
+        except (OverflowError, struct.error):
+            return None
+        if frame is not None:
+            body += FRAME.pack(frame)
+        if ints is not None:
+            body += LENGTH.pack(len(ints)) + struct.pack(f"<{len(ints)}i", *ints)
+        self._last_time_ms = time_ms
+        return bytes((TAG_EVENT,)) + body
+
+    def close(self, trailer=None):
+        """Дописывает итоговые поля метаданных"""
+        data = json.dumps(trailer or {}, ensure_ascii=False).encode("utf-8")
+        self.stream.write(bytes((TAG_TRAILER,)) + LENGTH.pack(len(data)) + data)
+        self.stream.flush()
+
+
+class BinaryEventReader:
+    """Потоковый декодер бинарного формата событий"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        if stream.read(len(MAGIC)) not in SUPPORTED_MAGICS:
+            raise ValueError("Файл не является бинарным журналом событий Screencaster")
+        length = LENGTH.unpack(stream.read(LENGTH.size))[0]
+        self.header = json.loads(stream.read(length).decode("utf-8"))
+        self.trailer = {}
+
+    def __iter__(self):
+        strings = [None]
+        atoms = []
+        keysets = [None]
+        unpackers = {}
+        last_time_ms = 0
+
+        read = self.stream.read
+        unpack_event = EVENT_RECORD.unpack_from
+        event_size = EVENT_RECORD.size
+        unpack_length = LENGTH.unpack_from
+        unpack_atom = ATOM_RECORD.unpack_from
+        atom_size = ATOM_RECORD.size
+        unpack_frame = FRAME.unpack_from
+        frame_size = FRAME.size
+
+        data = b""
+        pos = 0
+        eof = False
+
+        while True:
+            # Дочитываем данные, если в буфере может не оказаться целой записи
+            if len(data) - pos < 1 + event_size + frame_size + LENGTH.size and not eof:
+                chunk = read(READ_CHUNK)
+                if chunk:
+                    data = data[pos:] + chunk
+                    pos = 0
+                else:
+                    eof = True
+            if pos >= len(data):
+                return
+
+            tag = data[pos]
+            if tag == TAG_EVENT:
+                if len(data) - pos < 1 + event_size:
+                    raise ValueError("Журнал событий обрезан")
+                (type_id, flags, event_id, dt, x, y, x2, y2, duration, end, aux,
+                 str1, str2, keyset) = unpack_event(data, pos + 1)
+                pos += 1 + event_size
+                if flags & FLAG_HAS_FRAME:
+                    if len(data) - pos < frame_size:
+                        raise ValueError("Журнал событий обрезан")
+                    frame = unpack_frame(data, pos)[0]
+                    pos += frame_size
+                else:
+                    frame = None
+                if flags & FLAG_HAS_INTS:
+                    if len(data) - pos < LENGTH.size:
+                        raise ValueError("Журнал событий обрезан")
+                    count = unpack_length(data, pos)[0]
+                    pos += LENGTH.size
+                    size = count * INT.size
+                    # Длинный путь может не помещаться в буфер
+                    while len(data) - pos < size and not eof:
+                        chunk = read(max(READ_CHUNK, size))
+                        if chunk:
+                            data = data[pos:] + chunk
+                            pos = 0
+                        else:
+                            eof = True
+                    if len(data) - pos < size:
+                        raise ValueError("Журнал событий обрезан")
+                    ints = list(struct.unpack_from(f"<{count}i", data, pos))
+                    pos += size
+                else:
+                    ints = None
+                last_time_ms += dt
+                event_type = strings[type_id]
+                event = {"id": "%04x" % event_id, "type": event_type, "time": last_time_ms / 1000}
+                if flags & FLAG_HAS_KEYS:
+                    keys = keysets[keyset]
+                    keys = (list(keys[0]), list(keys[1]), list(keys[2]))
+                else:
+                    keys = None
+                unpacker = unpackers.get(type_id)
+                if unpacker is None:
+                    unpacker = unpackers[type_id] = CODECS[event_type][1]
+                unpacker(event, last_time_ms, x, y, x2, y2, duration, end, aux,
+                         strings[str1], strings[str2], keys, ints)
+                if frame is not None:
+                    event["frame"] = frame
+                yield event
+                continue
+
+            if tag == TAG_ATOM:
+                size = atom_size
+            elif tag in (TAG_STRING, TAG_KEYSET, TAG_RAW, TAG_TRAILER):
+                if len(data) - pos < 1 + LENGTH.size:
+                    raise ValueError("Журнал событий обрезан")
+                count = unpack_length(data, pos + 1)[0]
+                size = LENGTH.size + (count * ATOM_ID.size if tag == TAG_KEYSET else count)
+            else:
+                raise ValueError(f"Неизвестная запись в журнале событий: {tag}")
+
+            # Длинные записи могут не помещаться в буфер
+            while len(data) - pos < 1 + size and not eof:
+                chunk = read(max(READ_CHUNK, size))
+                if chunk:
+                    data = data[pos:] + chunk
+                    pos = 0
+                else:
+                    eof = True
+            if len(data) - pos < 1 + size:
+                raise ValueError("Журнал событий обрезан")
+
+            start = pos + 1
+            pos = start + size
+            if tag == TAG_ATOM:
+                k, c, code = unpack_atom(data, start)
+                atoms.append((strings[k], strings[c], code))
+            elif tag == TAG_STRING:
+                strings.append(data[start + LENGTH.size:pos].decode("utf-8"))
+            elif tag == TAG_KEYSET:
+                items = [atoms[i] for (i,) in ATOM_ID.iter_unpack(data[start + LENGTH.size:pos])]
+                keysets.append(_keys_lists(items))
+            elif tag == TAG_RAW:
+                event = json.loads(data[start + LENGTH.size:pos].decode("utf-8"))
+                time_value = event.get("time")
+                if type(time_value) in (int, float):
+                    last_time_ms = _to_ms(time_value)
+                yield event
+            else:
+                self.trailer = json.loads(data[start + LENGTH.size:pos].decode("utf-8"))
+
+
+def is_binary_file(path):
+    """Проверяет, записан ли файл (в том числе сжатый) в бинарном формате событий"""
+    with open_read(path) as f:
+        return f.read(len(MAGIC)) in SUPPORTED_MAGICS
+
+
+def read_binary_stream(stream):
+    """Загружает метаданные из открытого двоичного потока в обычном формате JSON-схемы"""
+    reader = BinaryEventReader(stream)
+    events = list(reader)
+    metadata = dict(reader.header)
+    metadata.update(reader.trailer)
+    metadata["events"] = events
+    return metadata
+
+
+def read_binary_metadata(path):
+    """Загружает метаданные из бинарного файла (в том числе сжатого)"""
+    with open_read(path) as f:
+        return read_binary_stream(f)
+
+
+def write_binary_metadata(metadata, path, level=None):
+    """Сохраняет метаданные в бинарном формате (.scev.gz и .scev.zst сжимаются потоково)"""
+    # Все поля, кроме событий, известны заранее и пишутся в заголовок
+    header = {k: v for k, v in metadata.items() if k != "events"}
+    with io.BufferedWriter(CompressedWriter(path, compression_for_path(path), level)) as f:
+        writer = BinaryEventWriter(f, header)
+        for event in metadata.get("events", []):
+            writer.write(event)
+        writer.close()
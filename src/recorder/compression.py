@@ -0,0 +1,214 @@
+import io
+import os
+import zlib
+
+# Потоковое сжатие файлов метаданных (итоговый JSON, журнал JSON Lines, .scev).
+#
+# Сжатые файлы получают дополнительное расширение (.json.gz, .jsonl.zst), но
+# формат при чтении определяется по сигнатуре, а не по имени. Сжатие потоковое:
+# данные не собираются в памяти целиком, а журнал после каждой групповой
+# фиксации сбрасывается так, что уже записанная часть распаковывается
+# даже после сбоя. zstd требует необязательного пакета zstandard.
+
+GZIP = "gzip"
+ZSTD = "zstd"
+
+EXTENSIONS = {GZIP: ".gz", ZSTD: ".zst"}
+SIGNATURES = {GZIP: b"\x1f\x8b", ZSTD: b"\x28\xb5\x2f\xfd"}
+DEFAULT_LEVELS = {GZIP: 6, ZSTD: 3}
+LEVEL_RANGES = {GZIP: (1, 9), ZSTD: (1, 22)}
+
+# Формат gzip для zlib (заголовок и контрольная сумма gzip)
+GZIP_WBITS = 31
+
+# Размер блока чтения сжатых данных
+READ_CHUNK = 1 << 20
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("Для сжатия zstd установите пакет zstandard (pip install zstandard)")
+    return zstandard
+
+
+def check_compression(compression, level=None):
+    """
+    Проверяет способ и уровень сжатия и возвращает уровень (по умолчанию - для способа).
+    Бросает ValueError при неизвестном способе или уровне и RuntimeError,
+    если для способа не установлен необходимый пакет.
+    """
+    if compression is None:
+        return None
+    if compression not in EXTENSIONS:
+        raise ValueError(f"Неизвестный способ сжатия: {compression} (поддерживаются {', '.join(EXTENSIONS)})")
+    if compression == ZSTD:
+        _zstd()
+    if level is None:
+        return DEFAULT_LEVELS[compression]
+    low, high = LEVEL_RANGES[compression]
+    if not low <= level <= high:
+        raise ValueError(f"Уровень сжатия {compression} должен быть от {low} до {high}")
+    return level
+
+
+def compression_for_path(path):
+    """Возвращает способ сжатия по расширению файла или None"""
+    for compression, extension in EXTENSIONS.items():
+        if path.endswith(extension):
+            return compression
+    return None
+
+
+def strip_compression_extension(path):
+    """Убирает расширение сжатия из имени файла"""
+    compression = compression_for_path(path)
+    if compression is None:
+        return path
+    return path[:-len(EXTENSIONS[compression])]
+
+
+def compressed_path(path, compression):
+    """Возвращает имя файла с расширением выбранного способа сжатия"""
+    path = strip_compression_extension(path)
+    if compression is None:
+        return path
+    return path + EXTENSIONS[compression]
+
+
+def detect_compression(path):
+    """Определяет способ сжатия файла по сигнатуре или возвращает None"""
+    with open(path, 'rb') as f:
+        head = f.read(4)
+    for compression, signature in SIGNATURES.items():
+        if head.startswith(signature):
+            return compression
+    return None
+
+
+class CompressedWriter(io.RawIOBase):
+    """
+    Потоковая запись в файл со сжатием (или без него при compression=None).
+    flush() делает записанные данные распаковываемыми (Z_SYNC_FLUSH для gzip,
+    завершение блока для zstd), sync() дополнительно вызывает fsync.
+    finish() завершает поток сжатия до close(), например перед sync().
+    """
+
+    def __init__(self, path, compression=None, level=None):
+        super().__init__()
+        level = check_compression(compression, level)
+        self.compression = compression
+        self._compressor = None
+        if compression == GZIP:
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, GZIP_WBITS)
+            self._flush_mode = zlib.Z_SYNC_FLUSH
+        elif compression == ZSTD:
+            zstandard = _zstd()
+            self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+            self._flush_mode = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        self._finished = False
+        self.raw = open(path, 'wb')
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        if self._finished:
+            raise ValueError("Запись после завершения потока сжатия")
+        if self._compressor is None:
+            self.raw.write(data)
+        else:
+            compressed = self._compressor.compress(bytes(data))
+            if compressed:
+                self.raw.write(compressed)
+        return len(data)
+
+    def flush(self):
+        if self.raw.closed:
+            return
+        if self._compressor is not None:
+            self.raw.write(self._compressor.flush(self._flush_mode))
+        self.raw.flush()
+
+    def sync(self):
+        """Сбрасывает записанные данные на диск"""
+        self.flush()
+        os.fsync(self.raw.fileno())
+
+    def finish(self):
+        """Завершает поток сжатия (контрольная сумма gzip, конец кадра zstd)"""
+        if self._compressor is not None:
+            self.raw.write(self._compressor.flush())
+            self._compressor = None
+        self._finished = True
+
+    def close(self):
+        if self.raw.closed:
+            super().close()
+            return
+        self.finish()
+        self.raw.close()
+        super().close()
+
+
+class DecompressingReader(io.RawIOBase):
+    """
+    Потоковое чтение сжатого файла. Обрезанный поток (например, журнал после
+    сбоя) читается до последних распакованных данных без ошибки.
+    """
+
+    def __init__(self, raw, compression):
+        super().__init__()
+        self.raw = raw
+        if compression == GZIP:
+            self._decompressor = zlib.decompressobj(GZIP_WBITS)
+            self._errors = (zlib.error,)
+        else:
+            zstandard = _zstd()
+            self._decompressor = zstandard.ZstdDecompressor().decompressobj()
+            self._errors = (zstandard.ZstdError,)
+        self._buffer = b""
+        self._pos = 0
+        self._eof = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while self._pos >= len(self._buffer):
+            if self._eof:
+                return 0
+            chunk = self.raw.read(READ_CHUNK)
+            if not chunk:
+                self._eof = True
+                return 0
+            try:
+                self._buffer = self._decompressor.decompress(chunk)
+            except self._errors:
+                # Поврежденный хвост: возвращаем то, что удалось распаковать
+                self._eof = True
+                return 0
+            self._pos = 0
+        size = min(len(b), len(self._buffer) - self._pos)
+        b[:size] = self._buffer[self._pos:self._pos + size]
+        self._pos += size
+        return size
+
+    def close(self):
+        self.raw.close()
+        super().close()
+
+
+def open_read(path):
+    """Открывает файл метаданных для чтения в двоичном режиме, распаковывая при необходимости"""
+    compression = detect_compression(path)
+    raw = open(path, 'rb')
+    if compression is None:
+        return raw
+    return io.BufferedReader(DecompressingReader(raw, compression), READ_CHUNK)
+
+
+def open_text(path):
+    """Открывает файл метаданных для чтения как текст UTF-8, распаковывая при необходимости"""
+    return io.TextIOWrapper(open_read(path), encoding='utf-8')
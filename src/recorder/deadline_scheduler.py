@@ -0,0 +1,108 @@
+import time
+import heapq
+import itertools
+import threading
+
+# Поля записи в куче сроков
+DEADLINE = 0
+KEY = 2
+CALLBACK = 3
+ARGS = 4
+ACTIVE = 5
+
+
+class DeadlineScheduler:
+    """
+    Один поток, выполняющий отложенные вызовы по сроку (куча сроков).
+    Заменяет отдельный threading.Timer на каждое ожидание: задачи регистрируются
+    по ключу, повторное планирование с тем же ключом переносит срок, cancel(key)
+    отменяет задачу. Обратные вызовы выполняются в потоке планировщика и должны
+    быть короткими.
+    """
+
+    def __init__(self, name="screencaster-scheduler"):
+        self.name = name
+        self._heap = []
+        self._entries = {}
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._running = False
+
+    def start(self):
+        """Запускает поток планировщика"""
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Отменяет все задачи и останавливает поток планировщика"""
+        with self._condition:
+            if not self._running:
+                return
+            self._running = False
+            self._heap.clear()
+            self._entries.clear()
+            self._condition.notify()
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def schedule(self, key, delay, callback, *args):
+        """Планирует вызов callback(*args) через delay секунд (переносит задачу с тем же ключом)"""
+        entry = [time.monotonic() + delay, next(self._counter), key, callback, args, True]
+        with self._condition:
+            previous = self._entries.get(key)
+            if previous is not None:
+                previous[ACTIVE] = False
+            self._entries[key] = entry
+            heapq.heappush(self._heap, entry)
+            # Будим поток, только если новый срок стал ближайшим
+            if self._heap[0] is entry:
+                self._condition.notify()
+
+    def cancel(self, key):
+        """Отменяет задачу; возвращает True, если она была запланирована"""
+        with self._condition:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                entry[ACTIVE] = False
+        return entry is not None
+
+    def is_scheduled(self, key):
+        """Возвращает True, если задача с ключом ожидает выполнения"""
+        with self._condition:
+            return key in self._entries
+
+    def __len__(self):
+        with self._condition:
+            return len(self._entries)
+
+    def _run(self):
+        """Цикл планировщика: ждет ближайший срок и выполняет задачу"""
+        while True:
+            with self._condition:
+                while True:
+                    if not self._running:
+                        return
+                    # Отмененные задачи удаляются из кучи лениво
+                    while self._heap and not self._heap[0][ACTIVE]:
+                        heapq.heappop(self._heap)
+                    if not self._heap:
+                        self._condition.wait()
+                        continue
+                    delay = self._heap[0][DEADLINE] - time.monotonic()
+                    if delay <= 0:
+                        break
+                    self._condition.wait(delay)
+                entry = heapq.heappop(self._heap)
+                entry[ACTIVE] = False
+                del self._entries[entry[KEY]]
+
+            try:
+                entry[CALLBACK](*entry[ARGS])
+            except Exception as e:
+                print(f"Ошибка выполнения отложенной задачи {entry[KEY]}: {e}")
@@ -0,0 +1,114 @@
+import os
+import threading
+import numpy as np
+
+# Блокировка для временной подмены переменной окружения DISPLAY
+# (pynput открывает соединение с X-сервером по значению DISPLAY)
+_display_env_lock = threading.Lock()
+
+
+class XDisplayCapture:
+    """
+    Захват кадров с конкретного X-дисплея (например, экземпляра Xvfb).
+    В отличие от pyautogui, позволяет в одном процессе снимать несколько дисплеев.
+    Использует python-xlib, который уже установлен как зависимость pynput в Linux.
+    """
+
+    def __init__(self, display_name):
+        from Xlib import X, display as xdisplay
+
+        self.display_name = display_name
+        self._zpixmap = X.ZPixmap
+        self._display = xdisplay.Display(display_name)
+        self._root = self._display.screen().root
+        # Соединение с X-сервером не потокобезопасно
+        self._lock = threading.Lock()
+
+    def size(self):
+        """Возвращает размер дисплея (ширина, высота)"""
+        geometry = self._root.get_geometry()
+        return geometry.width, geometry.height
+
+    def grab(self, region=None):
+        """Захватывает кадр (или область x, y, ширина, высота) в формате BGR"""
+        if region:
+            x, y, width, height = region
+        else:
+            x, y = 0, 0
+            width, height = self.size()
+        with self._lock:
+            image = self._root.get_image(x, y, width, height, self._zpixmap, 0xFFFFFFFF)
+        # Данные приходят в формате BGRX, отбрасываем четвертый канал
+        frame = np.frombuffer(image.data, dtype=np.uint8).reshape(height, width, 4)
+        return np.ascontiguousarray(frame[:, :, :3])
+
+    def cursor_position(self):
+        """Возвращает текущую позицию курсора на дисплее"""
+        with self._lock:
+            pointer = self._root.query_pointer()
+        return pointer.root_x, pointer.root_y
+
+    def close(self):
+        """Закрывает соединение с X-сервером"""
+        with self._lock:
+            self._display.close()
+
+    def run_on_display(self, collector, action, *args):
+        """
+        Выполняет действие сборщика метаданных (запуск сбора, подготовку) на этом дисплее.
+        Слушатели pynput подключаются к дисплею из DISPLAY в момент старта,
+        поэтому переменная подменяется до готовности слушателей.
+        """
+        with _display_env_lock:
+            previous = os.environ.get("DISPLAY")
+            os.environ["DISPLAY"] = self.display_name
+            try:
+                action(*args)
+                for listener in (collector.mouse_listener, collector.keyboard_listener):
+                    if listener is not None:
+                        listener.wait()
+            finally:
+                if previous is None:
+                    os.environ.pop("DISPLAY", None)
+                else:
+                    os.environ["DISPLAY"] = previous
+
+
+class ActiveWindow:
+    """
+    Имя приложения активного окна X-дисплея (класс WM_CLASS окна из
+    _NET_ACTIVE_WINDOW) для наборов горячих клавиш приложений. Вызывается
+    в потоке обработки событий, поэтому открывает свое соединение с X-сервером.
+    """
+
+    def __init__(self, display_name=None):
+        from Xlib import X, display as xdisplay
+
+        self._any_type = X.AnyPropertyType
+        self._display = xdisplay.Display(display_name)
+        self._root = self._display.screen().root
+        self._active_atom = self._display.intern_atom("_NET_ACTIVE_WINDOW")
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        """Возвращает класс активного окна ("code", "firefox") или None"""
+        with self._lock:
+            if self._display is None:
+                return None
+            try:
+                prop = self._root.get_full_property(self._active_atom, self._any_type)
+                if prop is None or not len(prop.value) or not prop.value[0]:
+                    return None
+                window = self._display.create_resource_object("window", prop.value[0])
+                wm_class = window.get_wm_class()
+            except Exception:
+                # Окно закрылось между запросами (XError) или потеряно соединение
+                # с X-сервером: нажатие обрабатывается с общими горячими клавишами
+                return None
+        return wm_class[1] if wm_class else None
+
+    def close(self):
+        with self._lock:
+            if self._display is not None:
+                self._display.close()
+                self._display = None
@@ -0,0 +1,338 @@
+import json
+import time
+import queue
+import threading
+import importlib
+from collections import deque
+
+# Конвейер обработчиков событий (фильтрация, скрытие текста, дополнение, экспорт).
+#
+# Этапы получают копии событий: их выход идет только следующим этапам
+# (экспорт, внешние системы), а файл метаданных, журнал и живой поток не
+# меняются. Скрытие текста во всем, что записывается, включает настройка
+# redact_text (MetadataCollector.set_redactor).
+#
+# MetadataCollector передает конвейеру каждое новое событие (submit) и
+# сообщает об удалении последнего события (retract: клик, ставший двойным,
+# нажатия, объединенные во ввод текста). События ждут SEAL_DELAY секунд -
+# дольше окон объединения в сборщике - и передаются этапам пачками уже
+# окончательными, в том же порядке, что и в файле метаданных.
+#
+# Этапы выполняются по порядку: выход этапа - вход следующего. Обычные этапы
+# работают в потоке конвейера, этап с threaded=True - в своем потоке со своей
+# ограниченной очередью пачек, поэтому медленный экспорт не задерживает
+# предыдущие этапы. Поток обработки сборщика только добавляет событие в очередь.
+#
+# Обработчик - функция process(events) или объект с методом process(events)
+# и необязательным close(). process получает список событий (копий) и
+# возвращает новый список или None, если список не изменился.
+
+# Сколько секунд событие может быть удалено сборщиком
+SEAL_DELAY = 1.5
+# Наибольшая пачка и период проверки готовых событий, секунды
+BATCH_SIZE = 256
+MAX_DELAY = 0.2
+# Емкость очереди пачек этапа со своим потоком
+STAGE_QUEUE = 64
+
+# TextRedactor: коды клавиш набора текста и модификаторы команд
+TEXT_CODES = ("Key", "Digit", "Numpad", "Backquote", "Minus", "Equal", "Bracket",
+              "Backslash", "Semicolon", "Quote", "Comma", "Period", "Slash", "Space", "IntlBackslash")
+COMMAND_MODIFIERS = frozenset(("ControlLeft", "ControlRight", "AltLeft", "AltRight", "MetaLeft", "MetaRight"))
+UNIDENTIFIED = "Unidentified"
+
+
+def _copy_event(event):
+    """Копия события: вложенные словари и списки событий содержат только простые значения"""
+    return {key: value.copy() if isinstance(value, (dict, list)) else value
+            for key, value in event.items()}
+
+
+def load_processor(spec):
+    """
+    Создает обработчик по описанию из настроек:
+    "модуль:фабрика" или {"processor": "модуль:фабрика", "options": {...},
+    "threaded": true, "name": "..."}. Возвращает (обработчик, параметры этапа).
+    """
+    if isinstance(spec, str):
+        spec = {"processor": spec}
+    path = spec["processor"]
+    module_name, _, attribute = path.partition(":")
+    if not attribute:
+        raise ValueError(f"Ожидается модуль:фабрика обработчика: {path}")
+    factory = getattr(importlib.import_module(module_name), attribute)
+    options = spec.get("options") or {}
+    # Класс или фабрика создают обработчик; функция process используется как есть
+    processor = factory(**options) if isinstance(factory, type) or options else factory
+    return processor, {"name": spec.get("name"), "threaded": bool(spec.get("threaded", False))}
+
+
+class PipelineStage:
+    """Этап конвейера: обработчик и его время работы"""
+
+    def __init__(self, processor, name=None, threaded=False, queue_size=STAGE_QUEUE):
+        self.processor = processor
+        self.process = processor if callable(processor) and not hasattr(processor, "process") \
+            else processor.process
+        self.name = name or getattr(processor, "name", None) or \
+            getattr(processor, "__name__", None) or type(processor).__name__
+        self.threaded = threaded
+        self.queue_size = queue_size
+        self.queue = None
+        self.thread = None
+        self.batches = 0
+        self.events_in = 0
+        self.events_out = 0
+        self.errors = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def run(self, events):
+        """Выполняет обработчик над пачкой; при ошибке пачка передается дальше без изменений"""
+        started = time.perf_counter_ns()
+        try:
+            result = self.process(events)
+        except Exception as e:
+            self.errors += 1
+            print(f"Ошибка этапа обработки событий {self.name}: {e}")
+            result = None
+        elapsed = time.perf_counter_ns() - started
+        if result is None:
+            result = events
+        self.batches += 1
+        self.events_in += len(events)
+        self.events_out += len(result)
+        self.total_ns += elapsed
+        if elapsed > self.max_ns:
+            self.max_ns = elapsed
+        return result
+
+    def close(self):
+        close = getattr(self.processor, "close", None)
+        if close is not None:
+            try:
+                close()
+            except Exception as e:
+                print(f"Ошибка завершения этапа обработки событий {self.name}: {e}")
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "threaded": self.threaded,
+            "batches": self.batches,
+            "events": self.events_in,
+            "output": self.events_out,
+            "errors": self.errors,
+            "totalMs": round(self.total_ns / 1e6, 3),
+            "meanBatchMs": round(self.total_ns / self.batches / 1e6, 3) if self.batches else 0,
+            "maxBatchMs": round(self.max_ns / 1e6, 3),
+            "perEventUs": round(self.total_ns / self.events_in / 1000, 3) if self.events_in else 0,
+            "queued": self.queue.qsize() if self.queue is not None else 0,
+        }
+
+
+class EventPipeline:
+    """Конвейер этапов обработки событий сборщика"""
+
+    def __init__(self, seal_delay=SEAL_DELAY, batch_size=BATCH_SIZE, max_delay=MAX_DELAY):
+        self.seal_delay_ns = int(seal_delay * 1e9)
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.stages = []
+        self.submitted = 0
+        self.retracted = 0
+        self._pending = deque()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._running = False
+
+    def add_stage(self, processor, name=None, threaded=False, queue_size=STAGE_QUEUE):
+        """Добавляет этап в конец конвейера (до запуска)"""
+        if self._running:
+            raise RuntimeError("Этапы добавляются до запуска конвейера")
+        stage = PipelineStage(processor, name, threaded, queue_size)
+        self.stages.append(stage)
+        return stage
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        for index, stage in enumerate(self.stages):
+            if stage.threaded:
+                stage.queue = queue.Queue(stage.queue_size)
+                stage.thread = threading.Thread(target=self._stage_worker, args=(index,),
+                                                name=f"screencaster-pipeline-{stage.name}", daemon=True)
+                stage.thread.start()
+        self._thread = threading.Thread(target=self._dispatch, name="screencaster-pipeline", daemon=True)
+        self._thread.start()
+
+    def submit(self, event):
+        """Добавляет новое событие (поток обработки сборщика)"""
+        with self._condition:
+            self._pending.append((time.perf_counter_ns(), event))
+            self.submitted += 1
+
+    def retract(self):
+        """Убирает последнее событие, удаленное сборщиком; False, если оно уже передано этапам"""
+        with self._condition:
+            if not self._pending:
+                return False
+            self._pending.pop()
+            self.retracted += 1
+        return True
+
+    def _take(self, everything=False):
+        """Забирает пачку окончательных событий"""
+        sealed_before = time.perf_counter_ns() - self.seal_delay_ns
+        batch = []
+        with self._condition:
+            pending = self._pending
+            while pending and len(batch) < self.batch_size and (everything or pending[0][0] <= sealed_before):
+                batch.append(pending.popleft()[1])
+        return [_copy_event(event) for event in batch]
+
+    def _dispatch(self):
+        """Поток конвейера: передает готовые события первому этапу пачками"""
+        while True:
+            with self._condition:
+                if not self._running:
+                    break
+                self._condition.wait(self.max_delay)
+            while True:
+                batch = self._take()
+                if not batch:
+                    break
+                self._run_from(0, batch)
+        # Остановка: остальные события окончательны
+        while True:
+            batch = self._take(everything=True)
+            if not batch:
+                break
+            self._run_from(0, batch)
+
+    def _run_from(self, index, events):
+        """Выполняет этапы начиная с index; этап со своим потоком получает пачку в очередь"""
+        stages = self.stages
+        while index < len(stages) and events:
+            stage = stages[index]
+            if stage.threaded and threading.current_thread() is not stage.thread:
+                # Очередь ограничена: при ее заполнении ждет этот поток, но не сборщик
+                stage.queue.put(events)
+                return
+            events = stage.run(events)
+            index += 1
+
+    def _stage_worker(self, index):
+        stage = self.stages[index]
+        while True:
+            events = stage.queue.get()
+            if events is None:
+                break
+            self._run_from(index, events)
+
+    def stop(self):
+        """Передает этапам все оставшиеся события, дожидается их обработки и закрывает этапы"""
+        if not self._running:
+            return
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        self._thread.join()
+        self._thread = None
+        # Потоки этапов завершаются по порядку, чтобы пачки дошли до последних этапов
+        for stage in self.stages:
+            if stage.thread is not None:
+                stage.queue.put(None)
+                stage.thread.join()
+                stage.thread = None
+        for stage in self.stages:
+            stage.close()
+
+    def stats(self):
+        with self._condition:
+            pending = len(self._pending)
+        return {
+            "submitted": self.submitted,
+            "retracted": self.retracted,
+            "pending": pending,
+            "stages": [stage.stats() for stage in self.stages],
+        }
+
+
+class TypeFilter:
+    """Оставляет (или с exclude=True убирает) события указанных типов"""
+
+    def __init__(self, types, exclude=False):
+        self.types = frozenset(types)
+        self.exclude = exclude
+        self.name = "filter"
+
+    def process(self, events):
+        return [event for event in events if (event.get("type") in self.types) != self.exclude]
+
+
+class TextRedactor:
+    """
+    Скрывает набранный текст: значение ввода и символы клавиш заменяются на
+    mask. Служебные клавиши (Enter, стрелки) и сочетания с Ctrl, Alt, Meta
+    остаются; Shift+буква - это набор текста и тоже скрывается.
+    Этапом конвейера скрывает текст для следующих этапов (экспорта), а через
+    MetadataCollector.set_redactor - в метаданных, журнале и живом потоке.
+    """
+
+    def __init__(self, mask="*"):
+        self.mask = mask
+        self.name = "redact"
+
+    def _mask(self, key):
+        return self.mask if isinstance(key, str) and len(key) == 1 else key
+
+    def _mask_keys(self, event):
+        codes = event.get("codes") or []
+        masked = [code is not None and code.startswith(TEXT_CODES) for code in codes]
+        event["keys"] = [self._mask(key) if hidden else key
+                         for key, hidden in zip(event.get("keys") or [], masked)]
+        event["codes"] = [UNIDENTIFIED if hidden else code for code, hidden in zip(codes, masked)]
+        event["keyCodes"] = [0 if hidden else key_code
+                             for key_code, hidden in zip(event.get("keyCodes") or [], masked)]
+
+    def redacted(self, events):
+        """Копии событий со скрытым текстом; исходные события не меняются"""
+        events = [_copy_event(event) for event in events]
+        self.process(events)
+        return events
+
+    def process(self, events):
+        for event in events:
+            event_type = event.get("type")
+            if event_type in ("keyPress", "keyLongPress"):
+                if (event.get("code") or "").startswith(TEXT_CODES):
+                    event["key"] = self._mask(event.get("key"))
+                    event["code"] = UNIDENTIFIED
+                    event["keyCode"] = 0
+            elif event_type == "input":
+                value = event.get("value") or ""
+                event["value"] = "".join(c if c in "\n\t" else self.mask for c in value)
+                self._mask_keys(event)
+            elif event_type == "hotkey":
+                codes = event.get("codes") or []
+                if not any(code in COMMAND_MODIFIERS for code in codes):
+                    self._mask_keys(event)
+
+
+class JsonLinesExporter:
+    """Дописывает события в файл JSON Lines (обычно как этап со своим потоком)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.name = "export"
+        self._file = open(path, "a", encoding="utf-8")
+
+    def process(self, events):
+        self._file.write("".join(json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n"
+                                 for event in events))
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
@@ -0,0 +1,416 @@
+import threading
+from array import array
+from src.recorder.binary_events import pack_event, unpack_event
+
+# Тип-маркер для событий, которые не раскладываются по колонкам
+RAW_TYPE = 0xFFFF
+
+INT32_MIN = -2 ** 31
+INT32_MAX = 2 ** 31 - 1
+
+# Значение колонки кадра для событий без номера кадра
+NO_FRAME = -1
+
+# Допустимое время в колонке time_ms (мс)
+INT64_MIN = -2 ** 63
+INT64_MAX = 2 ** 63 - 1
+
+
+def _raw_time_ms(event):
+    """Время нестандартного события в мс или None, если оно не число"""
+    value = event.get("time")
+    if not isinstance(value, (int, float)) or isinstance(value, bool):
+        return None
+    try:
+        time_ms = round(value * 1000)
+    except (ValueError, OverflowError):
+        return None
+    return time_ms if INT64_MIN <= time_ms <= INT64_MAX else None
+
+
+class EventStore:
+    """
+    Колоночное хранилище событий на типизированных массивах.
+    Вместо отдельного словаря на каждое событие хранит колонки времени (мс),
+    типа (индекс в таблице типов), координат, номера кадра видео и смещений
+    в интернированных пулах строк и наборов клавиш, а также номера
+    последовательности целых чисел (путь траектории). Раскладка полей общая с бинарным форматом
+    (.scev). Для совместимости ведет себя как список событий: поддерживает
+    len(), индексацию, срезы и итерацию, возвращая словари прежнего формата.
+
+    Порядок событий - порядок добавления, а не времени (перетаскивание и ввод
+    текста записываются временем начала). Поэтому хранилище ведет индекс по
+    времени: номера событий (array('I')), упорядоченные по колонке time_ms,
+    общий и отдельно по каждому типу. Поиск интервала - двоичный поиск по
+    колонке за O(log n): events_between, events_at_frame, events_of_type.
+    События почти всегда приходят по времени, и номер дописывается в конец
+    индекса; иначе вставляется на свое место.
+    """
+
+    def __init__(self, events=None, fps=None):
+        self._lock = threading.Lock()
+        self._count = 0
+        self.fps = fps
+
+        # Индекс по времени: номера событий в порядке (time_ms, номер),
+        # общий и отдельно по каждому типу события
+        self._time_rows = array('I')
+        self._type_rows = {}
+        # Нестандартные события без числового времени (в индекс не попадают)
+        self._unindexed = set()
+        # Количество событий в индексе без номера кадра
+        self._unframed = 0
+
+        # Колонки
+        self.time_ms = array('q')
+        self.type = array('H')
+        self.event_id = array('H')
+        self.x = array('i')
+        self.y = array('i')
+        self.x2 = array('i')
+        self.y2 = array('i')
+        self.duration = array('i')
+        self.end = array('i')
+        self.aux = array('i')
+        self.str1 = array('I')
+        self.str2 = array('I')
+        self.keyset = array('I')
+        self.ints = array('I')
+        self.frame = array('q')
+
+        # Интернированные пулы
+        self.types = []
+        self._type_ids = {}
+        self.strings = [None]
+        self._string_ids = {None: 0}
+        # Клавиша-атом: тройка (key, code, keyCode)
+        self.atoms = []
+        self._atom_ids = {}
+        # Набор клавиш с номером i - отрезок keyset_atoms[keyset_offsets[i - 1]:keyset_offsets[i]]
+        self.keyset_offsets = array('I', [0])
+        self.keyset_atoms = array('I')
+        self._keyset_ids = {}
+        # Последовательность целых чисел с номером i (0 - нет) - отрезок
+        # int_values[int_offsets[i - 1]:int_offsets[i]]; не интернируется, так как
+        # пути траекторий почти не повторяются
+        self.int_offsets = array('I', [0])
+        self.int_values = array('i')
+
+        # События нестандартной формы хранятся как есть
+        self._raw = {}
+
+        if events:
+            for event in events:
+                self.append(event)
+
+    def _intern_type(self, value):
+        type_id = self._type_ids.get(value)
+        if type_id is None:
+            type_id = len(self.types)
+            self.types.append(value)
+            self._type_ids[value] = type_id
+        return type_id
+
+    def _intern_string(self, value):
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = len(self.strings)
+            self.strings.append(value)
+            self._string_ids[value] = string_id
+        return string_id
+
+    def _intern_keyset(self, keys):
+        """Возвращает номер набора клавиш (0 в колонке означает отсутствие набора)"""
+        atom_ids = array('I')
+        for atom in keys:
+            atom_id = self._atom_ids.get(atom)
+            if atom_id is None:
+                atom_id = len(self.atoms)
+                self.atoms.append(atom)
+                self._atom_ids[atom] = atom_id
+            atom_ids.append(atom_id)
+        # Ключ - байты номеров атомов, а не кортеж клавиш события: наборы ввода
+        # текста почти не повторяются, и кортежи занимали бы больше самих колонок
+        ids = atom_ids.tobytes()
+        keyset_id = self._keyset_ids.get(ids)
+        if keyset_id is None:
+            self.keyset_atoms.extend(atom_ids)
+            self.keyset_offsets.append(len(self.keyset_atoms))
+            keyset_id = len(self.keyset_offsets) - 1
+            self._keyset_ids[ids] = keyset_id
+        return keyset_id
+
+    def _add_ints(self, values):
+        """Добавляет последовательность целых чисел и возвращает ее номер"""
+        self.int_values.extend(values)
+        self.int_offsets.append(len(self.int_values))
+        return len(self.int_offsets) - 1
+
+    def _ints_at(self, ints_id):
+        return self.int_values[self.int_offsets[ints_id - 1]:self.int_offsets[ints_id]].tolist()
+
+    def _keys_at(self, keyset_id):
+        start = self.keyset_offsets[keyset_id - 1]
+        end = self.keyset_offsets[keyset_id]
+        atoms = self.atoms
+        return tuple(atoms[i] for i in self.keyset_atoms[start:end])
+
+    def append(self, event):
+        """Добавляет событие"""
+        packed = pack_event(event)
+        with self._lock:
+            if packed is not None and len(self.types) < RAW_TYPE:
+                time_ms, event_id, x, y, x2, y2, duration, end, aux, str1, str2, keys, ints, frame = packed
+                # Проверяем диапазоны до записи, чтобы колонки не разошлись
+                if all(INT32_MIN <= v <= INT32_MAX for v in (x, y, x2, y2, duration, end, aux)):
+                    values = (
+                        time_ms, self._intern_type(event["type"]), event_id,
+                        x, y, x2, y2, duration, end, aux,
+                        self._intern_string(str1), self._intern_string(str2),
+                        self._intern_keyset(keys) if keys is not None else 0,
+                        self._add_ints(ints) if ints is not None else 0,
+                        NO_FRAME if frame is None else frame
+                    )
+                else:
+                    packed = None
+            if packed is None:
+                frame = event.get("frame")
+                if type(frame) is not int or frame < 0:
+                    frame = NO_FRAME
+                # Время нестандартного события тоже хранится в колонке для индекса
+                time_ms = _raw_time_ms(event)
+                if time_ms is None:
+                    self._unindexed.add(self._count)
+                values = (time_ms or 0, RAW_TYPE, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, frame)
+                self._raw[self._count] = event
+            for column, value in zip(self._columns(), values):
+                column.append(value)
+            self._index_add(self._count)
+            self._count += 1
+
+    def pop(self):
+        """Удаляет и возвращает последнее событие"""
+        with self._lock:
+            if not self._count:
+                raise IndexError("pop from empty EventStore")
+            event = self._event_at(self._count - 1)
+            self._count -= 1
+            self._index_remove(self._count)
+            ints_id = self.ints[self._count]
+            if ints_id:
+                # Удаляется всегда последнее событие, поэтому и его последовательность последняя
+                del self.int_values[self.int_offsets[ints_id - 1]:]
+                self.int_offsets.pop()
+            for column in self._columns():
+                column.pop()
+            self._raw.pop(self._count, None)
+            return event
+
+    def _bisect(self, rows, time_ms):
+        """Первая позиция в индексе со временем события не меньше time_ms"""
+        times = self.time_ms
+        lo, hi = 0, len(rows)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if times[rows[mid]] < time_ms:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _insert_row(self, rows, row):
+        """Добавляет номер события в индекс после событий с тем же временем"""
+        time_ms = self.time_ms[row]
+        if not rows or self.time_ms[rows[-1]] <= time_ms:
+            rows.append(row)
+        else:
+            rows.insert(self._bisect(rows, time_ms + 1), row)
+
+    def _remove_row(self, rows, row):
+        """Удаляет номер последнего добавленного события: он последний среди событий с тем же временем"""
+        if rows[-1] == row:
+            rows.pop()
+        else:
+            del rows[self._bisect(rows, self.time_ms[row] + 1) - 1]
+
+    def _index_add(self, row):
+        """Добавляет событие в индекс по времени (вызывается под блокировкой)"""
+        if row in self._unindexed:
+            return
+        if self.frame[row] == NO_FRAME:
+            self._unframed += 1
+        self._insert_row(self._time_rows, row)
+        type_name = self.type_name(row)
+        type_rows = self._type_rows.get(type_name)
+        if type_rows is None:
+            type_rows = self._type_rows[type_name] = array('I')
+        self._insert_row(type_rows, row)
+
+    def _index_remove(self, row):
+        """Удаляет событие из индекса по времени (вызывается под блокировкой)"""
+        if row in self._unindexed:
+            self._unindexed.discard(row)
+            return
+        if self.frame[row] == NO_FRAME:
+            self._unframed -= 1
+        self._remove_row(self._time_rows, row)
+        self._remove_row(self._type_rows[self.type_name(row)], row)
+
+    def _columns(self):
+        return (self.time_ms, self.type, self.event_id, self.x, self.y, self.x2, self.y2,
+                self.duration, self.end, self.aux, self.str1, self.str2, self.keyset, self.ints, self.frame)
+
+    def _event_at(self, index):
+        type_id = self.type[index]
+        if type_id == RAW_TYPE:
+            return self._raw[index]
+        keyset_id = self.keyset[index]
+        ints_id = self.ints[index]
+        frame = self.frame[index]
+        return unpack_event(
+            self.types[type_id], self.event_id[index], self.time_ms[index],
+            self.x[index], self.y[index], self.x2[index], self.y2[index],
+            self.duration[index], self.end[index], self.aux[index],
+            self.strings[self.str1[index]], self.strings[self.str2[index]],
+            self._keys_at(keyset_id) if keyset_id else None,
+            self._ints_at(ints_id) if ints_id else None,
+            None if frame == NO_FRAME else frame
+        )
+
+    def __len__(self):
+        return self._count
+
+    def __bool__(self):
+        return self._count > 0
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._event_at(i) for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("EventStore index out of range")
+        return self._event_at(index)
+
+    def __iter__(self):
+        for index in range(self._count):
+            yield self._event_at(index)
+
+    def _range(self, rows, start, end):
+        """Позиции в индексе для интервала [start, end) секунд"""
+        lo = 0 if start is None else self._bisect(rows, round(start * 1000))
+        hi = len(rows) if end is None else self._bisect(rows, round(end * 1000))
+        return lo, hi
+
+    def _rows_between(self, rows, start, end):
+        """Номера событий индекса в интервале [start, end) секунд"""
+        lo, hi = self._range(rows, start, end)
+        return rows[lo:hi]
+
+    def events_between(self, start, end):
+        """Возвращает события со временем в интервале [start, end) секунд в порядке времени"""
+        with self._lock:
+            return [self._event_at(row) for row in self._rows_between(self._time_rows, start, end)]
+
+    def events_at_frame(self, frame, fps=None):
+        """
+        Возвращает события, попадающие на кадр видео с номером frame (с нуля).
+        Если у всех событий записан номер кадра, выбор точный; иначе кадр
+        вычисляется по времени и FPS.
+        """
+        with self._lock:
+            rows = self._time_rows
+            if rows and not self._unframed:
+                # Номера кадров не убывают вместе со временем события
+                lo = self._frame_bound(rows, frame)
+                hi = self._frame_bound(rows, frame + 1)
+                return [self._event_at(row) for row in rows[lo:hi]]
+
+        fps = fps or self.fps
+        if not fps:
+            raise ValueError("Для поиска событий по кадру нужен FPS записи")
+        return self.events_between(frame / fps, (frame + 1) / fps)
+
+    def _frame_bound(self, rows, frame):
+        """Первая позиция в индексе по времени с номером кадра не меньше frame"""
+        frames = self.frame
+        lo, hi = 0, len(rows)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if frames[rows[mid]] < frame:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def events_of_type(self, type_name, start=None, end=None):
+        """Возвращает события заданного типа (при необходимости - за интервал) в порядке времени"""
+        with self._lock:
+            rows = self._type_rows.get(type_name)
+            if not rows:
+                return []
+            return [self._event_at(row) for row in self._rows_between(rows, start, end)]
+
+    def count_between(self, start, end, type_name=None):
+        """Возвращает количество событий в интервале [start, end) без их распаковки"""
+        with self._lock:
+            rows = self._time_rows if type_name is None else self._type_rows.get(type_name, ())
+            lo, hi = self._range(rows, start, end)
+            return hi - lo
+
+    def event_types(self):
+        """Возвращает типы событий, встречающиеся в хранилище"""
+        with self._lock:
+            return [name for name, rows in self._type_rows.items() if rows]
+
+    def to_list(self):
+        """Возвращает события списком словарей (формат JSON-метаданных)"""
+        return list(self)
+
+    def type_name(self, index):
+        """Возвращает тип события без полной распаковки"""
+        type_id = self.type[index]
+        if type_id == RAW_TYPE:
+            return self._raw[index].get("type")
+        return self.types[type_id]
+
+    def time_at(self, index):
+        """Возвращает время события в секундах без полной распаковки"""
+        if self.type[index] == RAW_TYPE:
+            return self._raw[index].get("time")
+        return self.time_ms[index] / 1000
+
+    def nbytes(self):
+        """Приблизительный объем колонок в байтах"""
+        columns = self._columns() + (self.keyset_offsets, self.keyset_atoms, self.int_offsets, self.int_values,
+                                     self._time_rows) + tuple(self._type_rows.values())
+        return sum(column.itemsize * len(column) for column in columns)
+
+    def to_numpy(self):
+        """
+        Возвращает события как структурированный массив NumPy.
+        Поле type содержит индекс в self.types (RAW_TYPE для нестандартных событий).
+        """
+        import numpy as np
+
+        dtype = np.dtype([
+            ("time", "f8"), ("type", "u2"), ("x", "i4"), ("y", "i4"),
+            ("x2", "i4"), ("y2", "i4"), ("duration", "f8"), ("end", "f8"),
+            ("aux", "i4"), ("keyset", "u4"), ("frame", "i8"),
+        ])
+        with self._lock:
+            count = self._count
+            result = np.empty(count, dtype=dtype)
+            result["time"] = np.frombuffer(self.time_ms, dtype=np.int64, count=count) / 1000
+            result["type"] = np.frombuffer(self.type, dtype=np.uint16, count=count)
+            for name in ("x", "y", "x2", "y2", "aux"):
+                result[name] = np.frombuffer(getattr(self, name), dtype=np.int32, count=count)
+            result["duration"] = np.frombuffer(self.duration, dtype=np.int32, count=count) / 1000
+            result["end"] = np.frombuffer(self.end, dtype=np.int32, count=count) / 1000
+            result["keyset"] = np.frombuffer(self.keyset, dtype=np.uint32, count=count)
+            result["frame"] = np.frombuffer(self.frame, dtype=np.int64, count=count)
+            # Время нестандартных событий берем из исходных словарей
+            for index, event in self._raw.items():
+                value = event.get("time")
+                result["time"][index] = value if isinstance(value, (int, float)) else np.nan
+        return result
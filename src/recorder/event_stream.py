@@ -0,0 +1,381 @@
+import os
+import json
+import time
+import socket
+import struct
+import threading
+from collections import deque
+
+# Живой поток событий через локальный сокет.
+#
+# Каждое новое событие MetadataCollector кодируется один раз в кадр
+# (длина uint32 little-endian + JSON) и раздается подписчикам. У каждого
+# подписчика своя ограниченная очередь кадров и свой поток отправки, поэтому
+# медленный подписчик не задерживает поток обработки событий и других
+# подписчиков: при переполнении очереди применяется политика сброса.
+#
+# Кадр: {"seq": номер, "sourceNs": время колбэка ввода, "event": событие}.
+# sourceNs - perf_counter_ns колбэка слушателя (или срока планировщика), по
+# которому создано событие; часы общие для процессов одной машины, поэтому
+# клиент может измерить задержку от ввода до получения. Пропуск номеров seq
+# означает сброшенные кадры.
+#
+# События раздаются сразу, а не после окна объединения, как в EventPipeline:
+# поток нужен с минимальной задержкой. Если сборщик затем удаляет событие
+# (нажатия, объединенные во ввод текста, клик, ставший двойным), подписчики
+# получают кадр отзыва {"seq": номер отозванного кадра, "sourceNs": ...,
+# "retract": true, "id": id события}. Кадр отзыва не получает нового номера и
+# может быть сброшен при переполнении очереди, как и обычный кадр.
+
+FRAME_LENGTH = struct.Struct("<I")
+# Кадры больше этого размера клиент считает ошибкой потока
+MAX_FRAME = 16 * 1024 * 1024
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 47800
+UNIX_PREFIX = "unix:"
+AF_UNIX = getattr(socket, "AF_UNIX", None)
+
+# Емкость очереди подписчика в кадрах
+BUFFER_FRAMES = 1024
+# Сколько последних номеров кадров помнить для отзыва (сборщик удаляет
+# не больше двух последних событий подряд)
+RETRACT_DEPTH = 16
+
+# Политики переполнения очереди подписчика
+DROP_OLDEST = "drop-oldest"
+DROP_NEWEST = "drop-newest"
+DISCONNECT = "disconnect"
+DROP_POLICIES = (DROP_OLDEST, DROP_NEWEST, DISCONNECT)
+
+# Размер блока приема клиента
+RECV_CHUNK = 65536
+# Период проверки остановки в потоке приема подключений, секунды
+ACCEPT_POLL = 0.2
+# Сколько ждать отправки оставшихся кадров при остановке, секунды
+DRAIN_TIMEOUT = 1.0
+
+
+def parse_address(address):
+    """
+    Разбирает адрес потока: "unix:/путь/к/сокету", "хост:порт" или "порт".
+    Возвращает (семейство сокета, адрес для bind/connect).
+    """
+    if address is None:
+        return socket.AF_INET, (DEFAULT_HOST, DEFAULT_PORT)
+    if isinstance(address, (tuple, list)):
+        return socket.AF_INET, (address[0], int(address[1]))
+    address = str(address)
+    if address.startswith(UNIX_PREFIX):
+        if AF_UNIX is None:
+            raise ValueError("Сокеты Unix не поддерживаются в этой системе")
+        return AF_UNIX, address[len(UNIX_PREFIX):]
+    host, _, port = address.rpartition(":")
+    try:
+        return socket.AF_INET, (host or DEFAULT_HOST, int(port))
+    except ValueError:
+        raise ValueError(f"Некорректный адрес потока событий: {address}")
+
+
+def encode_frame(seq, source_ns, event):
+    data = json.dumps({"seq": seq, "sourceNs": source_ns, "event": event},
+                      ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return FRAME_LENGTH.pack(len(data)) + data
+
+
+def encode_retract_frame(seq, source_ns, event_id):
+    data = json.dumps({"seq": seq, "sourceNs": source_ns, "retract": True, "id": event_id},
+                      ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return FRAME_LENGTH.pack(len(data)) + data
+
+
+class Subscriber:
+    """Подключенный клиент: ограниченная очередь кадров и поток отправки"""
+
+    def __init__(self, sock, address, capacity=BUFFER_FRAMES, policy=DROP_OLDEST):
+        self.sock = sock
+        self.address = address
+        self.capacity = capacity
+        self.policy = policy
+        self.sent = 0
+        self.dropped = 0
+        self.closed = False
+        self._draining = False
+        self._frames = deque()
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="screencaster-stream-sender", daemon=True)
+        self._thread.start()
+
+    def offer(self, frame):
+        """
+        Ставит кадр в очередь без блокировки; при переполнении применяет
+        политику. Возвращает False, если подписчик отключен.
+        """
+        with self._condition:
+            if self.closed:
+                return False
+            if len(self._frames) >= self.capacity:
+                if self.policy == DISCONNECT:
+                    self.dropped += 1
+                    self._close_locked()
+                    return False
+                self.dropped += 1
+                if self.policy == DROP_NEWEST:
+                    return True
+                self._frames.popleft()
+            self._frames.append(frame)
+            self._condition.notify()
+        return True
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._frames and not self.closed and not self._draining:
+                    self._condition.wait()
+                if self.closed:
+                    return
+                if not self._frames:
+                    # Остановка: все кадры отправлены
+                    self._close_locked()
+                    return
+                # Все накопленные кадры отправляются одним вызовом
+                frames = list(self._frames)
+                self._frames.clear()
+            try:
+                self.sock.sendall(b"".join(frames))
+            except OSError:
+                self.close()
+                return
+            self.sent += len(frames)
+
+    def _close_locked(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._frames.clear()
+        self._condition.notify()
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+    def close(self, drain_timeout=None):
+        """Отключает подписчика; с drain_timeout сначала дожидается отправки очереди"""
+        if drain_timeout:
+            with self._condition:
+                self._draining = True
+                self._condition.notify()
+            self._thread.join(drain_timeout)
+        with self._condition:
+            self._close_locked()
+
+    def stats(self):
+        with self._condition:
+            queued = len(self._frames)
+        return {"address": str(self.address), "sent": self.sent, "dropped": self.dropped,
+                "queued": queued, "closed": self.closed}
+
+
+class EventPublisher:
+    """
+    Сервер живого потока событий. publish() вызывается в потоке обработки
+    MetadataCollector (через attach) и только ставит кадр в очереди подписчиков.
+    """
+
+    def __init__(self, address=None, capacity=BUFFER_FRAMES, policy=DROP_OLDEST):
+        if policy not in DROP_POLICIES:
+            raise ValueError(f"Неизвестная политика переполнения: {policy}")
+        self.family, self.address = parse_address(address)
+        self.capacity = capacity
+        self.policy = policy
+        self.published = 0
+        self.retracted = 0
+        self.subscribers = []
+        # Отключенные подписчики для итогов
+        self.finished = []
+        self._seq = 0
+        # Номера последних разосланных кадров для отзыва
+        self._recent = deque(maxlen=RETRACT_DEPTH)
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+        self._collector = None
+
+    def start(self):
+        """Открывает сокет и начинает принимать подписчиков"""
+        if self._server is not None:
+            return
+        server = socket.socket(self.family, socket.SOCK_STREAM)
+        if self.family == AF_UNIX:
+            # Сокет от прошлого запуска
+            if os.path.exists(self.address):
+                os.remove(self.address)
+        else:
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind(self.address)
+        server.listen()
+        server.settimeout(ACCEPT_POLL)
+        if self.family != AF_UNIX:
+            # Порт 0 - выбранный системой свободный порт
+            self.address = server.getsockname()[:2]
+        self._server = server
+        self._thread = threading.Thread(target=self._accept, name="screencaster-stream", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Закрывает сокет и отключает подписчиков"""
+        self.detach()
+        server, self._server = self._server, None
+        if server is None:
+            return
+        self._thread.join()
+        self._thread = None
+        server.close()
+        with self._lock:
+            subscribers, self.subscribers = self.subscribers, []
+            self.finished.extend(subscribers)
+        for subscriber in subscribers:
+            subscriber.close(DRAIN_TIMEOUT)
+        if self.family == AF_UNIX and os.path.exists(self.address):
+            os.remove(self.address)
+
+    def _accept(self):
+        while True:
+            server = self._server
+            if server is None:
+                return
+            try:
+                sock, address = server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            sock.settimeout(None)
+            if self.family != AF_UNIX:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            subscriber = Subscriber(sock, address or "unix", self.capacity, self.policy)
+            with self._lock:
+                self.subscribers = self.subscribers + [subscriber]
+
+    def publish(self, event, source_ns=None):
+        """Раздает событие подписчикам"""
+        subscribers = self.subscribers
+        self._seq += 1
+        self.published += 1
+        self._recent.append(self._seq)
+        if not subscribers:
+            return
+        self._offer(subscribers, encode_frame(self._seq, source_ns, event))
+
+    def retract(self, event_id, source_ns=None):
+        """Отзывает последнее разосланное событие, удаленное сборщиком"""
+        if not self._recent:
+            return
+        seq = self._recent.pop()
+        self.retracted += 1
+        subscribers = self.subscribers
+        if not subscribers:
+            return
+        self._offer(subscribers, encode_retract_frame(seq, source_ns, event_id))
+
+    def _offer(self, subscribers, frame):
+        closed = [subscriber for subscriber in subscribers if not subscriber.offer(frame)]
+        if closed:
+            with self._lock:
+                self.subscribers = [s for s in self.subscribers if s not in closed]
+                self.finished.extend(closed)
+
+    def _on_event(self, event):
+        self.publish(event, self._collector.handling_ns)
+
+    def _on_retract(self, event):
+        self.retract(event.get("id"), self._collector.handling_ns)
+
+    def attach(self, collector):
+        """Подписывается на события сборщика и их отзыв"""
+        self.detach()
+        self._collector = collector
+        collector.add_event_listener(self._on_event)
+        collector.add_retract_listener(self._on_retract)
+
+    def detach(self):
+        if self._collector is not None:
+            self._collector.remove_event_listener(self._on_event)
+            self._collector.remove_retract_listener(self._on_retract)
+            self._collector = None
+
+    def stats(self):
+        with self._lock:
+            subscribers = self.finished + self.subscribers
+        clients = [subscriber.stats() for subscriber in subscribers]
+        return {
+            "address": self.address if self.family == AF_UNIX else "%s:%d" % tuple(self.address),
+            "policy": self.policy,
+            "published": self.published,
+            "retracted": self.retracted,
+            "subscribers": len(clients),
+            "dropped": sum(client["dropped"] for client in clients),
+            "clients": clients,
+        }
+
+
+class EventStreamClient:
+    """
+    Локальный клиент потока. receive() возвращает кадры одного приема с
+    временем получения perf_counter_ns; итерация дает кадры до закрытия потока.
+    """
+
+    def __init__(self, address=None, timeout=None):
+        family, self.address = parse_address(address)
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        self.sock.connect(self.address)
+        self.sock.settimeout(timeout)
+        if family != AF_UNIX:
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.closed = False
+        self._buffer = bytearray()
+
+    def receive(self):
+        """
+        Принимает данные и возвращает (список кадров, время получения).
+        Список пуст, если истек таймаут; closed - True, если сервер закрыл поток.
+        """
+        try:
+            chunk = self.sock.recv(RECV_CHUNK)
+        except socket.timeout:
+            return [], time.perf_counter_ns()
+        received_ns = time.perf_counter_ns()
+        if not chunk:
+            self.closed = True
+            return [], received_ns
+        buffer = self._buffer
+        buffer += chunk
+        frames = []
+        offset = 0
+        while len(buffer) - offset >= FRAME_LENGTH.size:
+            (length,) = FRAME_LENGTH.unpack_from(buffer, offset)
+            if length > MAX_FRAME:
+                raise ValueError(f"Слишком большой кадр потока событий: {length} байт")
+            end = offset + FRAME_LENGTH.size + length
+            if end > len(buffer):
+                break
+            frames.append(json.loads(bytes(buffer[offset + FRAME_LENGTH.size:end])))
+            offset = end
+        del buffer[:offset]
+        return frames, received_ns
+
+    def __iter__(self):
+        while not self.closed:
+            frames, received_ns = self.receive()
+            for frame in frames:
+                yield frame, received_ns
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,138 @@
+# Биты модификаторов: левая и правая клавиши дают один и тот же бит
+CTRL = 1
+SHIFT = 2
+ALT = 4
+WIN = 8
+
+MODIFIER_BITS = {
+    "ControlLeft": CTRL, "ControlRight": CTRL,
+    "ShiftLeft": SHIFT, "ShiftRight": SHIFT,
+    "AltLeft": ALT, "AltRight": ALT,
+    "MetaLeft": WIN, "MetaRight": WIN,
+}
+
+# Порядок модификаторов в имени горячей клавиши
+MODIFIER_NAMES = (("Ctrl", CTRL), ("Shift", SHIFT), ("Alt", ALT), ("Win", WIN))
+
+# Написания модификаторов, допустимые в настройках
+MODIFIER_ALIASES = {
+    "ctrl": CTRL, "control": CTRL,
+    "shift": SHIFT,
+    "alt": ALT, "option": ALT,
+    "win": WIN, "meta": WIN, "cmd": WIN, "super": WIN,
+}
+
+# Символы клавиш без Shift и их коды DOM
+SYMBOL_CODES = {
+    "-": "Minus", "=": "Equal", "[": "BracketLeft", "]": "BracketRight",
+    ";": "Semicolon", "'": "Quote", "`": "Backquote", "\\": "Backslash",
+    ",": "Comma", ".": "Period", "/": "Slash",
+}
+SYMBOL_LABELS = {code: char for char, code in SYMBOL_CODES.items()}
+
+# Горячие клавиши, которые распознаются всегда
+DEFAULT_HOTKEYS = (
+    "Ctrl+C", "Ctrl+V", "Ctrl+X", "Ctrl+Z", "Ctrl+Y", "Ctrl+A", "Ctrl+S",
+    "Ctrl+F", "Ctrl+P", "Ctrl+O", "Ctrl+N", "Alt+F4", "Ctrl+Shift+Z",
+)
+
+
+def modifier_mask(codes):
+    """Возвращает битовую маску модификаторов для набора кодов клавиш"""
+    mask = 0
+    for code in codes:
+        mask |= MODIFIER_BITS.get(code, 0)
+    return mask
+
+
+def key_label(code):
+    """Возвращает подпись клавиши для имени горячей клавиши (KeyZ -> Z)"""
+    if code.startswith("Key") and len(code) == 4:
+        return code[3:]
+    if code.startswith("Digit") and len(code) == 6:
+        return code[5:]
+    return SYMBOL_LABELS.get(code, code)
+
+
+def format_hotkey(mask, label):
+    """Формирует имя горячей клавиши вида Ctrl+Shift+Z"""
+    parts = [name for name, bit in MODIFIER_NAMES if mask & bit]
+    parts.append(label)
+    return "+".join(parts)
+
+
+def parse_hotkey(text):
+    """
+    Разбирает запись горячей клавиши ("Ctrl+Shift+Z", "Alt+F4", "Ctrl+/")
+    в пару (маска модификаторов, код клавиши DOM)
+    """
+    tokens = text.split("+")
+    # "Ctrl++" - клавиша плюс
+    if text.endswith("++"):
+        tokens = tokens[:-2] + ["+"]
+    mask = 0
+    for token in tokens[:-1]:
+        bit = MODIFIER_ALIASES.get(token.strip().lower())
+        if bit is None:
+            raise ValueError(f"Неизвестный модификатор {token!r} в горячей клавише {text!r}")
+        mask |= bit
+    key = tokens[-1].strip()
+    if not mask or not key:
+        raise ValueError(f"Горячая клавиша {text!r} должна содержать модификатор и клавишу")
+
+    if len(key) == 1 and key.isalpha():
+        code = f"Key{key.upper()}"
+    elif len(key) == 1 and key.isdigit():
+        code = f"Digit{key}"
+    elif key in SYMBOL_CODES:
+        code = SYMBOL_CODES[key]
+    else:
+        # F1-F12, Enter, ArrowLeft и другие коды DOM
+        code = key
+    return mask, code
+
+
+class HotkeyMatcher:
+    """
+    Распознавание горячих клавиш по заранее скомпилированной таблице.
+    Таблица строится один раз: ключ - (маска модификаторов, код клавиши),
+    поэтому проверка нажатия - один поиск в словаре. Набор горячих клавиш
+    расширяется настройками, для отдельных приложений можно задать свои наборы.
+    """
+
+    def __init__(self, hotkeys=None, application_hotkeys=None):
+        self.table = self._compile(DEFAULT_HOTKEYS)
+        if hotkeys:
+            self.table.update(self._compile(hotkeys))
+
+        self.application_tables = {}
+        for application, entries in (application_hotkeys or {}).items():
+            self.application_tables[application.lower()] = self._compile(entries)
+
+    def _compile(self, entries):
+        """Строит таблицу (маска, код) -> имя из списка записей или словаря запись -> имя"""
+        if isinstance(entries, dict):
+            items = entries.items()
+        else:
+            items = ((entry, None) for entry in entries)
+
+        table = {}
+        for text, name in items:
+            try:
+                mask, code = parse_hotkey(text)
+            except ValueError as e:
+                print(f"Горячая клавиша пропущена: {e}")
+                continue
+            table[(mask, code)] = name or format_hotkey(mask, key_label(code))
+        return table
+
+    def match(self, mask, code, application=None):
+        """Возвращает имя горячей клавиши или None, если комбинация не известна"""
+        key = (mask, code)
+        if application:
+            table = self.application_tables.get(application.lower())
+            if table is not None:
+                name = table.get(key)
+                if name is not None:
+                    return name
+        return self.table.get(key)
@@ -0,0 +1,119 @@
+import time
+import numpy as np
+
+# Режимы простоя: пауза (захват и кодирование останавливаются, время простоя
+# исключается из видео и метаданных) или редкий захват (видео идет с прежним
+# FPS, но кадры захватываются trickle_fps раз в секунду и повторяются)
+MODE_PAUSE = "pause"
+MODE_TRICKLE = "trickle"
+MODES = (MODE_PAUSE, MODE_TRICKLE)
+
+# Частота захвата в простое: в режиме паузы кадры только сравниваются
+# с последним, чтобы продолжить запись при изменении экрана
+TRICKLE_FPS = 1.0
+
+# Кадры сравниваются по каждому SAMPLE_STEP-му пикселю по обеим осям;
+# экран считается изменившимся, если средняя разница выборки больше порога
+SAMPLE_STEP = 8
+CHANGE_THRESHOLD = 1.0
+
+
+class IdleDetector:
+    """
+    Определяет простой записи: нет ввода (время последнего колбэка слушателей
+    MetadataCollector) и экран не меняется (сравнение уменьшенной выборки
+    пикселей соседних кадров) дольше timeout секунд.
+    Время - perf_counter_ns (реальное время, а не часы сессии: в режиме
+    паузы часы сессии стоят).
+    """
+
+    def __init__(self, timeout, mode=MODE_PAUSE, trickle_fps=TRICKLE_FPS,
+                 change_threshold=CHANGE_THRESHOLD, sample_step=SAMPLE_STEP):
+        if mode not in MODES:
+            raise ValueError(f"Неизвестный режим простоя: {mode}")
+        self.timeout_ns = int(timeout * 1e9)
+        self.mode = mode
+        self.trickle_ns = int(1e9 / trickle_fps)
+        self.change_threshold = change_threshold
+        self.sample_step = max(int(sample_step), 1)
+        self.reset()
+
+    def reset(self):
+        self.last_activity_ns = time.perf_counter_ns()
+        self._sample = None
+        # Текущий простой: начало (реальное время и время сессии) и время последнего захвата
+        self.idle = False
+        self.idle_started_ns = None
+        self.idle_session_start = None
+        self.last_grab_ns = None
+        # Завершенные простои (как события idle в метаданных)
+        self.spans = []
+
+    def frame_changed(self, frame):
+        """Сравнивает кадр с предыдущим по выборке пикселей"""
+        sample = frame[::self.sample_step, ::self.sample_step].astype(np.int16)
+        previous = self._sample
+        self._sample = sample
+        if previous is None or previous.shape != sample.shape:
+            return True
+        return float(np.abs(sample - previous).mean()) > self.change_threshold
+
+    def observe_frame(self, frame, now_ns=None):
+        """Учитывает захваченный кадр; возвращает True, если экран изменился"""
+        changed = self.frame_changed(frame)
+        if changed:
+            self.last_activity_ns = max(self.last_activity_ns, now_ns or time.perf_counter_ns())
+        return changed
+
+    def observe_input(self, activity_ns):
+        """Учитывает время последнего ввода (perf_counter_ns) или None"""
+        if activity_ns is not None and activity_ns > self.last_activity_ns:
+            self.last_activity_ns = activity_ns
+
+    def expired(self, now_ns=None):
+        """Пора ли переходить в простой"""
+        now_ns = now_ns or time.perf_counter_ns()
+        return not self.idle and now_ns - self.last_activity_ns >= self.timeout_ns
+
+    def input_since_idle(self, activity_ns):
+        return self.idle and activity_ns is not None and activity_ns > self.idle_started_ns
+
+    def grab_due(self, now_ns=None):
+        """Пора ли захватить кадр в простое"""
+        now_ns = now_ns or time.perf_counter_ns()
+        return self.last_grab_ns is None or now_ns - self.last_grab_ns >= self.trickle_ns
+
+    def begin(self, session_time, now_ns=None):
+        """Начинает простой в момент session_time (время сессии, секунды)"""
+        self.idle = True
+        self.idle_started_ns = now_ns or time.perf_counter_ns()
+        self.idle_session_start = session_time
+        self.last_grab_ns = self.idle_started_ns
+
+    def end(self, session_time, reason, now_ns=None):
+        """
+        Завершает простой; возвращает описание простоя для события idle.
+        duration - длительность на шкале сессии (0 в режиме паузы),
+        idleSeconds - реальная длительность.
+        """
+        now_ns = now_ns or time.perf_counter_ns()
+        span = {
+            "time": self.idle_session_start,
+            "duration": round(max(session_time - self.idle_session_start, 0), 3),
+            "idleSeconds": round((now_ns - self.idle_started_ns) / 1e9, 3),
+            "mode": self.mode,
+            "reason": reason,
+        }
+        self.spans.append(span)
+        self.idle = False
+        self.idle_started_ns = None
+        self.idle_session_start = None
+        self.last_activity_ns = now_ns
+        return span
+
+    def summary(self):
+        return {
+            "count": len(self.spans),
+            "idleSeconds": round(sum(span["idleSeconds"] for span in self.spans), 3),
+            "mode": self.mode,
+        }
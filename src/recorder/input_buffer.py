@@ -0,0 +1,202 @@
+from src.recorder.hotkey_matcher import ALT, CTRL, SHIFT, SYMBOL_CODES, WIN
+
+# Восстановление введенного текста по нажатиям клавиш.
+#
+# Текст хранится как буфер с разрывом: символы слева от каретки - в списке
+# _left, справа - в списке _right в обратном порядке, поэтому ввод, удаление
+# и перемещение каретки на символ стоят O(1) амортизированно. Выделение -
+# позиция якоря (anchor) относительно начала текста.
+
+# Бит CapsLock в маске состояния нажатия (биты ниже - модификаторы hotkey_matcher)
+CAPS_LOCK = 16
+
+# Символы с Shift в раскладке US
+SHIFT_DIGITS = {
+    "1": "!", "2": "@", "3": "#", "4": "$", "5": "%",
+    "6": "^", "7": "&", "8": "*", "9": "(", "0": ")",
+}
+SHIFT_SYMBOLS = {
+    "Minus": "_", "Equal": "+", "BracketLeft": "{", "BracketRight": "}",
+    "Semicolon": ":", "Quote": "\"", "Backquote": "~", "Backslash": "|",
+    "Comma": "<", "Period": ">", "Slash": "?",
+}
+SYMBOLS = {code: char for char, code in SYMBOL_CODES.items()}
+
+CONTROL_CHARS = {"Enter": "\n", "NumpadEnter": "\n", "Tab": "\t", "Space": " "}
+
+
+def char_for(code, key, modifiers):
+    """
+    Символ, который вводит клавиша code (key - ее символьное представление)
+    при состоянии modifiers, или None для клавиш, не вводящих текст
+    """
+    shift = bool(modifiers & SHIFT)
+    if code in CONTROL_CHARS:
+        return CONTROL_CHARS[code]
+    if code.startswith("Key") and len(code) == 4:
+        # CapsLock меняет регистр только букв
+        upper = shift != bool(modifiers & CAPS_LOCK)
+        return code[3] if upper else code[3].lower()
+    if code.startswith("Digit") and len(code) == 6:
+        digit = code[5]
+        return SHIFT_DIGITS[digit] if shift else digit
+    if code in SYMBOLS:
+        return SHIFT_SYMBOLS[code] if shift else SYMBOLS[code]
+    if key and len(key) == 1:
+        return key
+    return None
+
+
+class InputBuffer:
+    """
+    Текст поля ввода с кареткой и выделением. press() применяет нажатие
+    клавиши с состоянием модификаторов в момент нажатия.
+    Ctrl/Alt/Win-комбинации, кроме навигации и удаления, текст не вводят:
+    содержимое буфера обмена при вставке неизвестно.
+    """
+
+    def __init__(self):
+        self._left = []
+        self._right = []
+        self.anchor = None
+
+    def __len__(self):
+        return len(self._left) + len(self._right)
+
+    @property
+    def caret(self):
+        return len(self._left)
+
+    @property
+    def value(self):
+        return "".join(self._left) + "".join(reversed(self._right))
+
+    def selection(self):
+        """Границы выделения (start, end) или None"""
+        if self.anchor is None or self.anchor == self.caret:
+            return None
+        return min(self.anchor, self.caret), max(self.anchor, self.caret)
+
+    def press(self, code, key, modifiers=0):
+        """Применяет нажатие клавиши; возвращает True, если текст изменился"""
+        shift = modifiers & SHIFT
+        command = modifiers & (CTRL | ALT | WIN)
+        if code in ("ArrowLeft", "ArrowRight", "ArrowUp", "ArrowDown", "Home", "End"):
+            self._navigate(code, shift, modifiers & CTRL)
+            return False
+        if code == "Backspace" or code == "Delete":
+            if self._delete_selection():
+                return True
+            if modifiers & CTRL:
+                count = self._word_left() if code == "Backspace" else self._word_right()
+            else:
+                count = 1
+            source = self._left if code == "Backspace" else self._right
+            count = min(count, len(source))
+            if count:
+                del source[-count:]
+            return count > 0
+        if command:
+            if modifiers & CTRL and code == "KeyA":
+                self._move_to(0)
+                self.anchor = len(self)
+            elif modifiers & CTRL and code == "KeyX":
+                return self._delete_selection()
+            return False
+        char = char_for(code, key, modifiers)
+        if char is None:
+            return False
+        self._delete_selection()
+        self._left.append(char)
+        return True
+
+    def _delete_selection(self):
+        selection = self.selection()
+        self.anchor = None
+        if selection is None:
+            return False
+        start, end = selection
+        self._move_to(end)
+        del self._left[start:]
+        return True
+
+    def _navigate(self, code, shift, word):
+        selection = self.selection()
+        if shift:
+            if self.anchor is None:
+                self.anchor = self.caret
+        else:
+            self.anchor = None
+            # Стрелка без Shift схлопывает выделение к его краю
+            if selection is not None and code in ("ArrowLeft", "ArrowRight"):
+                self._move_to(selection[0] if code == "ArrowLeft" else selection[1])
+                return
+        if code == "ArrowLeft":
+            self._move_to(self.caret - (self._word_left() if word else 1))
+        elif code == "ArrowRight":
+            self._move_to(self.caret + (self._word_right() if word else 1))
+        elif code == "Home":
+            self._move_to(0 if word else self.caret - self._column())
+        elif code == "End":
+            self._move_to(len(self) if word else self.caret + self._line_rest())
+        elif code == "ArrowUp":
+            column = self._column()
+            line_start = self.caret - column
+            if line_start == 0:
+                self._move_to(0)
+                return
+            self._move_to(line_start - 1)
+            previous = self._column()
+            self._move_to(self.caret - previous + min(column, previous))
+        else:
+            column = self._column()
+            rest = self._line_rest()
+            if rest == len(self._right):
+                self._move_to(len(self))
+                return
+            self._move_to(self.caret + rest + 1)
+            self._move_to(self.caret + min(column, self._line_rest()))
+
+    def _move_to(self, position):
+        """Переносит каретку; стоимость пропорциональна расстоянию"""
+        position = max(0, min(position, len(self)))
+        left, right = self._left, self._right
+        while len(left) > position:
+            right.append(left.pop())
+        while len(left) < position:
+            left.append(right.pop())
+
+    def _column(self):
+        """Количество символов от начала строки до каретки"""
+        left = self._left
+        index = len(left)
+        while index and left[index - 1] != "\n":
+            index -= 1
+        return len(left) - index
+
+    def _line_rest(self):
+        """Количество символов от каретки до конца строки"""
+        right = self._right
+        index = len(right)
+        while index and right[index - 1] != "\n":
+            index -= 1
+        return len(right) - index
+
+    def _word_left(self):
+        # Пробелы перед кареткой и слово перед ними
+        left = self._left
+        index = len(left)
+        while index and left[index - 1].isspace():
+            index -= 1
+        while index and not left[index - 1].isspace():
+            index -= 1
+        return len(left) - index
+
+    def _word_right(self):
+        right = self._right
+        index = len(right)
+        while index and not right[index - 1].isspace():
+            index -= 1
+        while index and right[index - 1].isspace():
+            index -= 1
+        return len(right) - index
@@ -0,0 +1,297 @@
+import threading
+from types import MappingProxyType
+from pynput import keyboard
+
+# Все таблицы модуля неизменяемы и общие для всех экземпляров MetadataCollector
+
+
+def _freeze(table):
+    return MappingProxyType(table)
+
+
+# Специальные клавиши pynput -> code (стандарт DOM)
+SPECIAL_KEYS = _freeze({
+    keyboard.Key.enter: "Enter",
+    keyboard.Key.tab: "Tab",
+    keyboard.Key.space: "Space",
+    keyboard.Key.backspace: "Backspace",
+    keyboard.Key.esc: "Escape",
+    keyboard.Key.caps_lock: "CapsLock",
+    keyboard.Key.delete: "Delete",
+    keyboard.Key.insert: "Insert",
+    keyboard.Key.home: "Home",
+    keyboard.Key.end: "End",
+    keyboard.Key.page_up: "PageUp",
+    keyboard.Key.page_down: "PageDown",
+    keyboard.Key.up: "ArrowUp",
+    keyboard.Key.down: "ArrowDown",
+    keyboard.Key.left: "ArrowLeft",
+    keyboard.Key.right: "ArrowRight",
+    keyboard.Key.f1: "F1",
+    keyboard.Key.f2: "F2",
+    keyboard.Key.f3: "F3",
+    keyboard.Key.f4: "F4",
+    keyboard.Key.f5: "F5",
+    keyboard.Key.f6: "F6",
+    keyboard.Key.f7: "F7",
+    keyboard.Key.f8: "F8",
+    keyboard.Key.f9: "F9",
+    keyboard.Key.f10: "F10",
+    keyboard.Key.f11: "F11",
+    keyboard.Key.f12: "F12",
+    keyboard.Key.shift: "ShiftLeft",
+    keyboard.Key.shift_r: "ShiftRight",
+    keyboard.Key.ctrl: "ControlLeft",
+    keyboard.Key.ctrl_r: "ControlRight",
+    keyboard.Key.alt: "AltLeft",
+    keyboard.Key.alt_r: "AltRight",
+    keyboard.Key.cmd: "MetaLeft",
+    keyboard.Key.cmd_r: "MetaRight",
+    keyboard.Key.num_lock: "NumLock",
+    # Mac-специфичные клавиши
+    keyboard.Key.alt_gr: "AltGraph",
+})
+
+# Символы -> code: знаки, буквы и цифры раскладки US
+_char_codes = {
+    '!': "Digit1", '@': "Digit2", '#': "Digit3", '$': "Digit4", '%': "Digit5",
+    '^': "Digit6", '&': "Digit7", '*': "Digit8", '(': "Digit9", ')': "Digit0",
+    '_': "Minus", '+': "Equal", '-': "Minus", '=': "Equal",
+    '"': "Quote", "'": "Quote", ':': "Semicolon", ';': "Semicolon",
+    '?': "Slash", '/': "Slash", '>': "Period", '.': "Period",
+    '<': "Comma", ',': "Comma", '~': "Backquote", '`': "Backquote",
+    '|': "Backslash", '\\': "Backslash", '{': "BracketLeft", '[': "BracketLeft",
+    '}': "BracketRight", ']': "BracketRight", '№': "Digit3",
+}
+for _i in range(26):
+    _char_codes[chr(97 + _i)] = f"Key{chr(65 + _i)}"
+    _char_codes[chr(65 + _i)] = f"Key{chr(65 + _i)}"
+for _i in range(10):
+    _char_codes[str(_i)] = f"Digit{_i}"
+CHAR_CODES = _freeze(_char_codes)
+
+# Виртуальные коды (vk) клавиш, которые pynput не распознает как Key
+_vk_codes = {
+    55: "MetaLeft", 54: "MetaLeft",     # Command на Mac
+    58: "AltLeft", 61: "AltRight",      # Option на Mac
+    225: "AltGraph",
+    106: "NumpadMultiply", 107: "NumpadAdd", 109: "NumpadSubtract",
+    110: "NumpadDecimal", 111: "NumpadDivide", 144: "NumLock",
+}
+for _i in range(10):
+    _vk_codes[96 + _i] = f"Numpad{_i}"
+VK_CODES = _freeze(_vk_codes)
+
+# Строковые имена клавиш (str(key) без "Key.") -> code
+_name_codes = {
+    "enter": "Enter", "tab": "Tab", "space": "Space", "backspace": "Backspace",
+    "esc": "Escape", "caps_lock": "CapsLock", "delete": "Delete", "insert": "Insert",
+    "home": "Home", "end": "End", "page_up": "PageUp", "page_down": "PageDown",
+    "up": "ArrowUp", "down": "ArrowDown", "left": "ArrowLeft", "right": "ArrowRight",
+    "f1": "F1", "f2": "F2", "f3": "F3", "f4": "F4", "f5": "F5", "f6": "F6",
+    "f7": "F7", "f8": "F8", "f9": "F9", "f10": "F10", "f11": "F11", "f12": "F12",
+    "shift": "ShiftLeft", "shift_r": "ShiftRight",
+    "ctrl": "ControlLeft", "ctrl_r": "ControlRight", "ctrl_l": "ControlLeft",
+    "alt": "AltLeft", "alt_l": "AltLeft", "alt_r": "AltRight", "alt_gr": "AltGraph",
+    "cmd": "MetaLeft", "cmd_r": "MetaRight", "cmd_l": "MetaLeft",
+    "option": "AltLeft", "option_r": "AltRight",
+    "num_lock": "NumLock",
+}
+# Нестандартные коды Key1-Key26 (A-Z)
+for _i in range(1, 27):
+    _name_codes[f"Key{_i}"] = f"Key{chr(64 + _i)}"
+NAME_CODES = _freeze(_name_codes)
+
+# code -> числовой код (keyCode)
+_key_code_map = {
+    "ControlLeft": 17, "ControlRight": 17,
+    "ShiftLeft": 16, "ShiftRight": 16,
+    "AltLeft": 18, "AltRight": 18,
+    "MetaLeft": 224, "MetaRight": 224,
+    "AltGraph": 225,
+    "Enter": 13, "Tab": 9, "Space": 32,
+    "Backspace": 8, "Escape": 27, "CapsLock": 20,
+    "Delete": 46, "Insert": 45,
+    "Home": 36, "End": 35, "PageUp": 33, "PageDown": 34,
+    "ArrowUp": 38, "ArrowDown": 40, "ArrowLeft": 37, "ArrowRight": 39,
+    "F1": 112, "F2": 113, "F3": 114, "F4": 115, "F5": 116, "F6": 117,
+    "F7": 118, "F8": 119, "F9": 120, "F10": 121, "F11": 122, "F12": 123,
+    "Minus": 189, "Equal": 187, "BracketLeft": 219, "BracketRight": 221,
+    "Semicolon": 186, "Quote": 222, "Backquote": 192, "Backslash": 220,
+    "Comma": 188, "Period": 190, "Slash": 191,
+    "NumLock": 144,
+    "Numpad0": 96, "Numpad1": 97, "Numpad2": 98, "Numpad3": 99, "Numpad4": 100,
+    "Numpad5": 101, "Numpad6": 102, "Numpad7": 103, "Numpad8": 104, "Numpad9": 105,
+    "NumpadMultiply": 106, "NumpadAdd": 107, "NumpadSubtract": 109,
+    "NumpadDecimal": 110, "NumpadDivide": 111, "NumpadEnter": 13,
+}
+for _i in range(26):
+    _key_code_map[f"Key{chr(65 + _i)}"] = 65 + _i
+for _i in range(10):
+    _key_code_map[f"Digit{_i}"] = 48 + _i
+KEY_CODE_MAP = _freeze(_key_code_map)
+
+# code -> key (символьное представление)
+_key_map = {
+    "ControlLeft": "Control", "ControlRight": "Control",
+    "ShiftLeft": "Shift", "ShiftRight": "Shift",
+    "AltLeft": "Alt", "AltRight": "Alt",
+    "MetaLeft": "Meta", "MetaRight": "Meta",
+    "AltGraph": "AltGraph",
+    "Enter": "Enter", "Tab": "Tab", "Space": " ",
+    "Backspace": "Backspace", "Escape": "Escape", "CapsLock": "CapsLock",
+    "Delete": "Delete", "Insert": "Insert",
+    "Home": "Home", "End": "End", "PageUp": "PageUp", "PageDown": "PageDown",
+    "ArrowUp": "ArrowUp", "ArrowDown": "ArrowDown", "ArrowLeft": "ArrowLeft", "ArrowRight": "ArrowRight",
+    "F1": "F1", "F2": "F2", "F3": "F3", "F4": "F4", "F5": "F5", "F6": "F6",
+    "F7": "F7", "F8": "F8", "F9": "F9", "F10": "F10", "F11": "F11", "F12": "F12",
+    "Minus": "-", "Equal": "=", "BracketLeft": "[", "BracketRight": "]",
+    "Semicolon": ";", "Quote": "'", "Backquote": "`", "Backslash": "\\",
+    "Comma": ",", "Period": ".", "Slash": "/",
+    "NumLock": "NumLock",
+    "Numpad0": "0", "Numpad1": "1", "Numpad2": "2", "Numpad3": "3", "Numpad4": "4",
+    "Numpad5": "5", "Numpad6": "6", "Numpad7": "7", "Numpad8": "8", "Numpad9": "9",
+    "NumpadMultiply": "*", "NumpadAdd": "+", "NumpadSubtract": "-",
+    "NumpadDecimal": ".", "NumpadDivide": "/", "NumpadEnter": "Enter",
+}
+for _i in range(26):
+    _key_map[f"Key{chr(65 + _i)}"] = chr(65 + _i)
+for _i in range(10):
+    _key_map[f"Digit{_i}"] = str(_i)
+KEY_MAP = _freeze(_key_map)
+
+
+def _positional_layout(chars, us_chars):
+    """Строит таблицу символ раскладки -> code по положению клавиш на US-раскладке"""
+    table = {}
+    for char, us_char in zip(chars, us_chars):
+        table[char] = CHAR_CODES[us_char]
+        if char.upper() != char:
+            table[char.upper()] = CHAR_CODES[us_char]
+    return table
+
+
+def _load_ru():
+    return _positional_layout("йцукенгшщзхъфывапролджэячсмитьбюё",
+                              "qwertyuiop[]asdfghjkl;'zxcvbnm,.`")
+
+
+def _load_de():
+    table = _positional_layout("zyäöüß", "yz';[-")
+    table.update({'Z': "KeyY", 'Y': "KeyZ", '§': "Digit3"})
+    return table
+
+
+# Таблицы символов для раскладок, отличных от US, загружаются при первом обращении
+LAYOUT_LOADERS = {
+    "ru": _load_ru,
+    "de": _load_de,
+}
+
+# Максимальный размер кэша перевода клавиш
+CACHE_LIMIT = 4096
+
+
+class KeyTranslator:
+    """
+    Перевод клавиш pynput в коды DOM (code) по таблицам модуля.
+    Результаты кэшируются по символу (KeyCode) или имени (Key): хэш строки
+    считается в C, тогда как __hash__ и __eq__ объектов pynput написаны на
+    Python. Если задана раскладка layout, символы сначала ищутся в ее таблице,
+    затем в таблице US.
+    """
+
+    def __init__(self, layout=None):
+        self.layout = layout
+        self._layout_codes = None
+        self._char_cache = {}
+        self._name_cache = {}
+
+    def _layout_table(self):
+        if self._layout_codes is None:
+            loader = LAYOUT_LOADERS.get(self.layout)
+            if loader is None:
+                print(f"Неизвестная раскладка клавиатуры: {self.layout}")
+                self._layout_codes = {}
+            else:
+                self._layout_codes = _freeze(loader())
+        return self._layout_codes
+
+    def code(self, key):
+        """Возвращает code клавиши (стандарт DOM)"""
+        cls = key.__class__
+        if cls is keyboard.KeyCode:
+            char = key.char
+            if not char:
+                # Клавиши без символа переводятся по таблице виртуальных кодов
+                return self._translate(key)
+            cache = self._char_cache
+            cache_key = char
+        elif cls is keyboard.Key:
+            cache = self._name_cache
+            cache_key = key._name_
+        else:
+            return self._translate(key)
+
+        code = cache.get(cache_key)
+        if code is None:
+            code = self._translate(key)
+            if len(cache) >= CACHE_LIMIT:
+                cache.clear()
+            cache[cache_key] = code
+        return code
+
+    def _translate(self, key):
+        try:
+            code = SPECIAL_KEYS.get(key)
+            if code is not None:
+                return code
+
+            char = getattr(key, 'char', None)
+            if char:
+                # Таблица раскладки важнее US: на QWERTZ символ z находится на клавише KeyY
+                code = self._layout_table().get(char) if self.layout else None
+                if code is None:
+                    code = CHAR_CODES.get(char)
+                # Если символ не найден в таблицах, используем его код
+                return code if code is not None else f"Key{ord(char)}"
+
+            if hasattr(key, 'vk'):
+                if key.vk is None:
+                    return str(key)
+                code = VK_CODES.get(key.vk)
+                if code is not None:
+                    return code
+
+            # Если ничего не подошло, используем строковое представление
+            key_str = str(key).replace('Key.', '')
+            code = NAME_CODES.get(key_str)
+            if code is not None:
+                return code
+            if key_str.lower() == 'key26':
+                return "KeyZ"
+
+            # Нестандартные коды вида Key05
+            if key_str.startswith('Key') and key_str[3:].isdigit():
+                num = int(key_str[3:])
+                if 1 <= num <= 26:
+                    return f"Key{chr(64 + num)}"
+            return key_str
+
+        except Exception as e:
+            print(f"Error mapping key {key}: {e}")
+            return str(key)
+
+
+_translators = {}
+_translators_lock = threading.Lock()
+
+
+def get_translator(layout=None):
+    """Возвращает общий переводчик клавиш для раскладки"""
+    with _translators_lock:
+        translator = _translators.get(layout)
+        if translator is None:
+            translator = KeyTranslator(layout)
+            _translators[layout] = translator
+        return translator
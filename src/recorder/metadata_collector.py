@@ -1,8 +1,19 @@
+import os
 import time
-import json
 import uuid
+import queue
 from pynput import mouse, keyboard
 import threading
+from src.recorder.metadata_io import (EventStreamWriter, journal_path_for, write_json_atomic,
+                                      COMMIT_INTERVAL, COMMIT_BATCH)
+from src.recorder.compression import check_compression, compressed_path
+from src.recorder.event_store import EventStore
+from src.recorder.deadline_scheduler import DeadlineScheduler
+from src.recorder.session_clock import SessionClock
+from src.recorder.key_translation import KEY_CODE_MAP, KEY_MAP, get_translator
+from src.recorder.trajectory import TrajectorySimplifier, encode_path
+from src.recorder.hotkey_matcher import HotkeyMatcher, MODIFIER_BITS, format_hotkey, modifier_mask
+from src.recorder.input_buffer import CAPS_LOCK, InputBuffer
 
 class MetadataCollector:
     """
@@ -14,28 +25,47 @@ class MetadataCollector:
         """Инициализирует сборщик метаданных"""
         self.collecting = False
         self.paused = False
-        self.events = []
+        self.events = EventStore()
         self.metadata_file = None
 
         # Размер экрана
         self.screen_width = 1920  # Значение по умолчанию
         self.screen_height = 1080  # Значение по умолчанию
+        # Область записи (x, y, ширина, высота) или None - весь экран;
+        # координаты событий остаются экранными
+        self.recording_region = None
 
         self.fps = 30  # Значение по умолчанию
+        # Определять FPS через PyQt5 при старте (в headless-режиме отключается)
+        self.auto_detect_fps = True
 
         # Для отслеживания длительных нажатий
-        self.long_press_timers = {}  # Словарь таймеров для длительных нажатий
         self.long_press_threshold = 0.5  # Порог в секундах для длительного нажатия
+        
+        # Прокрутка завершается после паузы, ввод текста - после паузы в наборе
+        self.scroll_end_delay = 0.5
+        self.input_end_delay = 3.0
+        
+        # Один поток планировщика обслуживает все сроки: длительные нажатия,
+        # завершение прокрутки и ввода
+        self.scheduler = DeadlineScheduler()
             
-        # Время начала и паузы записи
-        self.start_time = None
-        self.pause_time = None
-        self.total_pause_time = 0
+        # Часы сессии (время без пауз). При записи видео ScreenRecorder передает
+        # свои часы через set_clock, и события получают номер кадра видео
+        self.clock = SessionClock()
+        self._owns_clock = True
+        self.timing = None
         self.recording_start = None
         
         # Состояние клавиш и мыши
         self.pressed_keys = set()
         self.key_press_times = {}
+        self.modifier_mask = 0
+        
+        # Распознавание горячих клавиш; application_provider - необязательная функция,
+        # возвращающая имя активного приложения для наборов горячих клавиш приложений
+        self.hotkey_matcher = HotkeyMatcher()
+        self.application_provider = None
         
         # Состояние перетаскивания
         self.is_dragging = False
@@ -45,228 +75,105 @@ class MetadataCollector:
         self.drag_codes = None
         self.drag_key_codes = None
         
+        # Траектории курсора: движение упрощается на лету с допуском в пикселях
+        # и сохраняется событиями mouseMove (и путем в событиях drag)
+        self.record_trajectories = True
+        self.trajectory_tolerance = 2.0
+        self.move_end_delay = 0.5
+        self.trajectory = None
+        self.last_move_time = 0
+        
         # Состояние прокрутки
         self.is_scrolling = False
         self.scroll_start_pos = None
         self.scroll_start_time = None
         self.scroll_amount = 0
         self.last_scroll_time = 0
+        self.last_scroll_pos = None
         
         # Состояние ввода текста
         self.in_input_field = False
         self.input_start_time = None
+        self.last_input_time = None
         self.input_codes = []
         self.input_keys = []
         self.input_key_codes = []
+        # Состояние Shift и CapsLock в момент каждого нажатия при вводе
+        self.input_modifiers = []
+        self.input_buffer = None
+        # CapsLock переключается нажатиями; исходное состояние неизвестно и считается выключенным
+        self.caps_lock = False
+        self.last_press_modifiers = 0
         
-        # Инициализация маппингов клавиш
-        self._init_key_mappings()
+        # Таблицы клавиш общие для всех экземпляров (модуль key_translation);
+        # переводчик для раскладки подключается при первом запуске сбора
+        self.key_map = KEY_MAP
+        self.key_code_map = KEY_CODE_MAP
+        self.keyboard_layout = None
+        self.key_translator = None
+        self._key_mappings_ready = False
+        
+        # Режим ожидания: слушатели запущены заранее, сбор еще не начат
+        self.prepared = False
         
         # Инициализация слушателей событий
         self.mouse_listener = None
         self.keyboard_listener = None
         
-        # Таймер для периодического сохранения метаданных
-        self.save_timer = None
-        
-    def _init_key_mappings(self):
-        """Инициализирует маппинги кодов клавиш согласно стандартным кодам JavaScript"""
-        # Маппинг специальных клавиш (code)
-        self.special_keys = {
-            keyboard.Key.enter: "Enter",
-            keyboard.Key.tab: "Tab",
-            keyboard.Key.space: "Space",
-            keyboard.Key.backspace: "Backspace",
-            keyboard.Key.esc: "Escape",
-            keyboard.Key.caps_lock: "CapsLock",
-            keyboard.Key.delete: "Delete",
-            keyboard.Key.insert: "Insert",
-            keyboard.Key.home: "Home",
-            keyboard.Key.end: "End",
-            keyboard.Key.page_up: "PageUp",
-            keyboard.Key.page_down: "PageDown",
-            keyboard.Key.up: "ArrowUp",
-            keyboard.Key.down: "ArrowDown",
-            keyboard.Key.left: "ArrowLeft",
-            keyboard.Key.right: "ArrowRight",
-            keyboard.Key.f1: "F1",
-            keyboard.Key.f2: "F2",
-            keyboard.Key.f3: "F3",
-            keyboard.Key.f4: "F4",
-            keyboard.Key.f5: "F5",
-            keyboard.Key.f6: "F6",
-            keyboard.Key.f7: "F7",
-            keyboard.Key.f8: "F8",
-            keyboard.Key.f9: "F9",
-            keyboard.Key.f10: "F10",
-            keyboard.Key.f11: "F11",
-            keyboard.Key.f12: "F12",
-            keyboard.Key.shift: "ShiftLeft",
-            keyboard.Key.shift_r: "ShiftRight",
-            keyboard.Key.ctrl: "ControlLeft",
-            keyboard.Key.ctrl_r: "ControlRight",
-            keyboard.Key.alt: "AltLeft",
-            keyboard.Key.alt_r: "AltRight",
-            keyboard.Key.cmd: "MetaLeft",
-            keyboard.Key.cmd_r: "MetaRight",
-            keyboard.Key.num_lock: "NumLock",
-            # Mac-специфичные клавиши
-            keyboard.Key.alt_gr: "AltGraph",
-        }
+        # Журнал упреждающей записи (JSON Lines), в который дописываются только
+        # новые события. Фиксация групповая: не позже чем через commit_interval
+        # секунд или при накоплении commit_batch событий, с fsync (если wal_sync)
+        self.metadata_writer = None
+        self.commit_interval = COMMIT_INTERVAL
+        self.commit_batch = COMMIT_BATCH
+        self.wal_sync = True
         
-        # Маппинг символов согласно стандартным кодам (code)
-        self.symbol_codes = {
-            '!': "Digit1",
-            '@': "Digit2",
-            '#': "Digit3",
-            '$': "Digit4",
-            '%': "Digit5",
-            '^': "Digit6",
-            '&': "Digit7",
-            '*': "Digit8",
-            '(': "Digit9",
-            ')': "Digit0",
-            '_': "Minus",
-            '+': "Equal",
-            '-': "Minus",
-            '=': "Equal",
-            '"': "Quote",
-            "'": "Quote",
-            ':': "Semicolon",
-            ';': "Semicolon",
-            '?': "Slash",
-            '/': "Slash",
-            '>': "Period",
-            '.': "Period",
-            '<': "Comma",
-            ',': "Comma",
-            '~': "Backquote",
-            '`': "Backquote",
-            '|': "Backslash",
-            '\\': "Backslash",
-            '{': "BracketLeft",
-            '[': "BracketLeft",
-            '}': "BracketRight",
-            ']': "BracketRight",
-            '№': "Digit3"
-        }
+        # Потоковое сжатие журнала и итогового файла метаданных (None, "gzip" или "zstd")
+        self.compression = None
+        self.compression_level = None
         
-        # Маппинг букв и цифр согласно стандартным кодам (code)
-        self.letter_codes = {}
-        for i in range(26):
-            char = chr(97 + i)  # a-z
-            self.letter_codes[char] = f"Key{char.upper()}"
-            self.letter_codes[char.upper()] = f"Key{char.upper()}"
-            
-        for i in range(10):
-            self.letter_codes[str(i)] = f"Digit{i}"
-            
-        # Маппинг кодов клавиш в числовые коды (keyCode)
-        self.key_code_map = {
-            "ControlLeft": 17, "ControlRight": 17,
-            "ShiftLeft": 16, "ShiftRight": 16,
-            "AltLeft": 18, "AltRight": 18,
-            "MetaLeft": 224, "MetaRight": 224,  # Обновлено для Mac
-            "AltGraph": 225,  # Добавлено для Mac
-            "Enter": 13, "Tab": 9, "Space": 32,
-            "Backspace": 8, "Escape": 27, "CapsLock": 20,
-            "Delete": 46, "Insert": 45,
-            "Home": 36, "End": 35, "PageUp": 33, "PageDown": 34,
-            "ArrowUp": 38, "ArrowDown": 40, "ArrowLeft": 37, "ArrowRight": 39,
-            "F1": 112, "F2": 113, "F3": 114, "F4": 115, "F5": 116, "F6": 117,
-            "F7": 118, "F8": 119, "F9": 120, "F10": 121, "F11": 122, "F12": 123,
-            "Minus": 189, "Equal": 187, "BracketLeft": 219, "BracketRight": 221,
-            "Semicolon": 186, "Quote": 222, "Backquote": 192, "Backslash": 220,
-            "Comma": 188, "Period": 190, "Slash": 191,
-            "NumLock": 144,
-            
-            # Добавляем коды для Numpad клавиш
-            "Numpad0": 96, "Numpad1": 97, "Numpad2": 98, "Numpad3": 99, "Numpad4": 100,
-            "Numpad5": 101, "Numpad6": 102, "Numpad7": 103, "Numpad8": 104, "Numpad9": 105,
-            "NumpadMultiply": 106, "NumpadAdd": 107, "NumpadSubtract": 109,
-            "NumpadDecimal": 110, "NumpadDivide": 111, "NumpadEnter": 13
-        }
+        # Очередь сырых событий: колбэки слушателей только ставят в нее
+        # (обработчик, время, аргументы, perf_counter_ns колбэка), разбор
+        # выполняет один поток обработки
+        self._event_queue = queue.SimpleQueue()
+        self._event_worker = None
         
-        # Добавляем коды для букв A-Z (65-90)
-        for i in range(26):
-            char = chr(65 + i)  # A-Z
-            self.key_code_map[f"Key{char}"] = 65 + i
-            
-        # Добавляем коды для цифр 0-9 (48-57)
-        for i in range(10):
-            self.key_code_map[f"Digit{i}"] = 48 + i
+        # Задержка колбэков слушателей в наносекундах: [количество, сумма, максимум]
+        # отдельно для каждого слушателя, так как колбэки мыши и клавиатуры
+        # выполняются в разных потоках pynput и обновляют счетчики без блокировки
+        self._mouse_callbacks = [0, 0, 0]
+        self._keyboard_callbacks = [0, 0, 0]
+        # Время последнего колбэка ввода (perf_counter_ns) для определения простоя
+        self.last_input_ns = None
+        # perf_counter_ns колбэка (или срока планировщика), который сейчас
+        # разбирает поток обработки: по нему считается задержка живого потока
+        self.handling_ns = None
         
-        # Маппинг для key (символьное представление)
-        self.key_map = {
-            "ControlLeft": "Control", "ControlRight": "Control",
-            "ShiftLeft": "Shift", "ShiftRight": "Shift",
-            "AltLeft": "Alt", "AltRight": "Alt",
-            "MetaLeft": "Meta", "MetaRight": "Meta",
-            "AltGraph": "AltGraph",  # Добавлено для Mac
-            "Enter": "Enter", "Tab": "Tab", "Space": " ",
-            "Backspace": "Backspace", "Escape": "Escape", "CapsLock": "CapsLock",
-            "Delete": "Delete", "Insert": "Insert",
-            "Home": "Home", "End": "End", "PageUp": "PageUp", "PageDown": "PageDown",
-            "ArrowUp": "ArrowUp", "ArrowDown": "ArrowDown", "ArrowLeft": "ArrowLeft", "ArrowRight": "ArrowRight",
-            "F1": "F1", "F2": "F2", "F3": "F3", "F4": "F4", "F5": "F5", "F6": "F6",
-            "F7": "F7", "F8": "F8", "F9": "F9", "F10": "F10", "F11": "F11", "F12": "F12",
-            "Minus": "-", "Equal": "=", "BracketLeft": "[", "BracketRight": "]",
-            "Semicolon": ";", "Quote": "'", "Backquote": "`", "Backslash": "\\",
-            "Comma": ",", "Period": ".", "Slash": "/",
-            "NumLock": "NumLock",
-            
-            # Добавляем символы для Numpad клавиш
-            "Numpad0": "0", "Numpad1": "1", "Numpad2": "2", "Numpad3": "3", "Numpad4": "4",
-            "Numpad5": "5", "Numpad6": "6", "Numpad7": "7", "Numpad8": "8", "Numpad9": "9",
-            "NumpadMultiply": "*", "NumpadAdd": "+", "NumpadSubtract": "-",
-            "NumpadDecimal": ".", "NumpadDivide": "/", "NumpadEnter": "Enter"
-        }
+        # Подписчики живого потока событий (например, наложение кликов на видео),
+        # вызываются в потоке обработки для каждого нового события
+        self.event_listeners = []
+        # Подписчики удаления последнего события (нажатия, объединенные во ввод
+        # текста, клик, ставший двойным): уже разосланное событие отзывается
+        self.retract_listeners = []
+        # Конвейер обработчиков событий (EventPipeline): получает окончательные
+        # события пачками в своих потоках
+        self.pipeline = None
+        # Скрытие текста (TextRedactor) в записываемых событиях: журнале,
+        # итоговом файле, живом потоке и конвейере. В списке событий сборщика
+        # события остаются исходными - по ним объединяются нажатия во ввод
+        self.redactor = None
         
-        # Добавляем символы для букв A-Z
-        for i in range(26):
-            char = chr(65 + i)  # A-Z
-            self.key_map[f"Key{char}"] = char
-            
-        # Добавляем символы для цифр 0-9
-        for i in range(10):
-            self.key_map[f"Digit{i}"] = str(i)
-            
-        # Обратный маппинг для старых кодов клавиш
-        self.old_to_new_code = {
-            "enter": "Enter",
-            "tab": "Tab",
-            "space": "Space",
-            "backspace": "Backspace",
-            "esc": "Escape",
-            "caps_lock": "CapsLock",
-            "delete": "Delete",
-            "insert": "Insert",
-            "home": "Home",
-            "end": "End",
-            "page_up": "PageUp",
-            "page_down": "PageDown",
-            "up": "ArrowUp",
-            "down": "ArrowDown",
-            "left": "ArrowLeft",
-            "right": "ArrowRight",
-            "f1": "F1", "f2": "F2", "f3": "F3", "f4": "F4", "f5": "F5", "f6": "F6",
-            "f7": "F7", "f8": "F8", "f9": "F9", "f10": "F10", "f11": "F11", "f12": "F12",
-            "shift": "ShiftLeft", "shift_r": "ShiftRight",
-            "ctrl": "ControlLeft", "ctrl_r": "ControlRight",
-            "ctrl_l": "ControlLeft",  # Добавлено для обратной совместимости
-            "alt_l": "AltLeft", "alt_r": "AltRight",
-            "alt_gr": "AltGraph",  # Добавлено для Mac
-            "cmd": "MetaLeft", "cmd_r": "MetaRight",
-            "cmd_l": "MetaLeft",  # Добавлено для обратной совместимости
-            "option": "AltLeft",  # Добавлено для Mac (альтернативное название для Alt)
-            "option_r": "AltRight",  # Добавлено для Mac
-            "num_lock": "NumLock"
-        }
-        
-        # Добавляем маппинг для Key1-Key26 (A-Z)
-        for i in range(1, 27):
-            char = chr(64 + i)  # A-Z (ASCII 65-90)
-            self.old_to_new_code[f"Key{i}"] = f"Key{char}"
+    def _init_key_mappings(self):
+        """Подключает общий переводчик клавиш в коды JavaScript для текущей раскладки"""
+        self.key_translator = get_translator(self.keyboard_layout)
+        self._key_mappings_ready = True
+
+    def set_keyboard_layout(self, layout):
+        """Задает раскладку клавиатуры ("ru", "de") для символов вне раскладки US"""
+        self.keyboard_layout = layout or None
+        self._key_mappings_ready = False
+        if self.collecting or self.prepared:
+            self._init_key_mappings()
 
     def detect_screen_fps(self):
         """Автоматически определяет частоту обновления экрана (FPS) с использованием PyQt5"""
@@ -303,48 +210,113 @@ class MetadataCollector:
     def set_fps(self, fps):
         """Устанавливает значение FPS (кадров в секунду)"""
         self.fps = fps
+        self.events.fps = fps
 
+    def set_clock(self, clock):
+        """
+        Использует общие часы сессии. Запуском, паузой и журналом кадров таких
+        часов управляет владелец (ScreenRecorder), а события получают номер кадра.
+        """
+        self.clock = clock
+        self._owns_clock = False
 
+
+    
+    def prepare(self):
+        """
+        Заранее выполняет подготовку к сбору (режим ожидания): строит маппинги клавиш,
+        определяет FPS и запускает слушателей. Пока сбор не начат, события игнорируются.
+        """
+        if self.collecting or self.prepared:
+            return
+            
+        if not self._key_mappings_ready:
+            self._init_key_mappings()
+        if self.auto_detect_fps:
+            self.detect_screen_fps()
+        self._start_listeners()
+        self.prepared = True
+        
+    def release(self):
+        """Останавливает слушателей, запущенные в режиме ожидания"""
+        if self.collecting or not self.prepared:
+            return
+            
+        self._stop_listeners()
+        self.prepared = False
+        
+    def _start_listeners(self):
+        """Запускает слушателей событий мыши и клавиатуры"""
+        self.mouse_listener = mouse.Listener(
+            on_move=self._on_mouse_move,
+            on_click=self._on_mouse_click,
+            on_scroll=self._on_scroll
+        )
+        self.mouse_listener.start()
+        
+        self.keyboard_listener = keyboard.Listener(
+            on_press=self._on_key_press,
+            on_release=self._on_key_release
+        )
+        self.keyboard_listener.start()
+        
+    def _stop_listeners(self):
+        """Останавливает слушателей событий мыши и клавиатуры"""
+        if self.mouse_listener:
+            self.mouse_listener.stop()
+            self.mouse_listener = None
+            
+        if self.keyboard_listener:
+            self.keyboard_listener.stop()
+            self.keyboard_listener = None
     
     def start_collection(self, metadata_file):
         """Начинает сбор метаданных"""
         if self.collecting:
             return
         
-
-        self.detect_screen_fps()
+        # В режиме ожидания все уже подготовлено в prepare()
+        was_prepared = self.prepared
+        if not was_prepared:
+            if not self._key_mappings_ready:
+                self._init_key_mappings()
+            if self.auto_detect_fps:
+                self.detect_screen_fps()
+        self.prepared = False
         self.collecting = True
         self.paused = False
-        self.events = []
-        self.metadata_file = metadata_file
+        self.events = EventStore(fps=self.fps)
+        # Сжатый файл метаданных получает расширение способа сжатия (.json.gz)
+        self.metadata_file = compressed_path(metadata_file, self.compression)
+        self.metadata_writer = EventStreamWriter(journal_path_for(metadata_file, self.compression),
+                                                 self._metadata_header(), commit_interval=self.commit_interval, commit_batch=self.commit_batch, sync=self.wal_sync,
+           compression=self.compression, level=self.compression_level)
 
         
-        # Устанавливаем время начала записи
-        self.start_time = time.time()
+        # Запускаем часы сессии, если они не общие с рекордером
+        if self._owns_clock:
+            self.clock.start(self.fps)
+        self.timing = None
         self.recording_start = time.strftime("%Y-%m-%d %H:%M:%S")
-        self.total_pause_time = 0
         
         # Сбрасываем состояние клавиш и мыши
         self.pressed_keys = set()
         self.key_press_times = {}
+        self.modifier_mask = 0
+        self._mouse_callbacks = [0, 0, 0]
+        self._keyboard_callbacks = [0, 0, 0]
+        self.last_input_ns = None
+        if self.pipeline is not None:
+            self.pipeline.start()
         
-        # Запускаем слушателей событий
-        self.mouse_listener = mouse.Listener(
-            on_click=self._on_mouse_click,
-            on_scroll=self._on_scroll
-        )
-        self.mouse_listener.start()
+        # Поток обработки запускается до слушателей, чтобы не терять события
+        self._start_event_worker()
         
-        self.keyboard_listener = keyboard.Listener(
-            on_press=self._on_key_press,
-            on_release=self._on_key_release
-        )
-        self.keyboard_listener.start()
+        # Запускаем слушателей событий
+        if not was_prepared:
+            self._start_listeners()
         
-        # Запускаем таймер для периодического сохранения метаданных
-        self.save_timer = threading.Timer(5.0, self._save_metadata_periodically)
-        self.save_timer.daemon = True
-        self.save_timer.start()
+        self.scheduler.start()
     
     def pause_collection(self):
         """Приостанавливает сбор метаданных"""
@@ -352,36 +324,88 @@ class MetadataCollector:
             return
             
         self.paused = True
-        self.pause_time = time.time()
+        if self._owns_clock:
+            self.clock.pause()
         
-        # Завершаем текущие события
-        if self.is_dragging:
-            # Получаем текущую позицию мыши
-            current_pos = mouse.Controller().position
-            self._on_mouse_click(current_pos[0], current_pos[1], mouse.Button.left, False)
-            
-        if self.is_scrolling:
-            current_pos = mouse.Controller().position
-            self._finish_scroll(current_pos[0], current_pos[1])
-            
-        if self.in_input_field:
-            self._finish_input("Escape")
+        # Текущие события завершает поток обработки после уже поставленных в очередь
+        self._submit(self._finish_current_events)
     
     def resume_collection(self):
         """Возобновляет сбор метаданных после паузы"""
         if not self.collecting or not self.paused:
             return
             
-        # Вычисляем время паузы
-        pause_duration = time.time() - self.pause_time
-        self.total_pause_time += pause_duration
+        # Время паузы исключают часы сессии
+        if self._owns_clock:
+            self.clock.resume()
         
         self.paused = False
     
+    def set_hotkeys(self, hotkeys=None, application_hotkeys=None):
+        """Задает дополнительные горячие клавиши и наборы горячих клавиш приложений"""
+        self.hotkey_matcher = HotkeyMatcher(hotkeys, application_hotkeys)
+    
+    def set_application_provider(self, provider):
+        """Задает функцию, возвращающую имя активного приложения (или None)"""
+        self.application_provider = provider
+    
+    def set_trajectory_options(self, enabled=True, tolerance=2.0):
+        """Включает запись траекторий курсора и задает допуск упрощения в пикселях"""
+        self.record_trajectories = enabled
+        self.trajectory_tolerance = tolerance
+    
+    def set_wal_options(self, commit_interval=COMMIT_INTERVAL, commit_batch=COMMIT_BATCH, sync=True):
+        """
+        Задает групповую фиксацию журнала событий: максимальную задержку записи
+        на диск в секундах, размер группы и использование fsync
+        """
+        self.commit_interval = commit_interval
+        self.commit_batch = commit_batch
+        self.wal_sync = sync
+    
+    def set_compression(self, compression=None, level=None):
+        """
+        Задает сжатие журнала и итогового файла метаданных ("gzip" или "zstd")
+        и его уровень. При ошибке в настройках метаданные сохраняются без сжатия.
+        """
+        try:
+            self.compression_level = check_compression(compression, level)
+            self.compression = compression
+        except (ValueError, RuntimeError) as e:
+            print(f"Сжатие метаданных отключено: {e}")
+            self.compression = None
+            self.compression_level = None
+    
+    def set_pipeline(self, pipeline):
+        """Задает конвейер обработчиков событий (до начала сбора)"""
+        self.pipeline = pipeline
+    
+    def set_redactor(self, redactor):
+        """Задает скрытие текста в записываемых событиях (объект с методом redacted(events)) или None"""
+        self.redactor = redactor
+    
     def set_screen_size(self, width, height):
         self.screen_width = width
         self.screen_height = height
 
+    def set_recording_region(self, region):
+        """Область экрана, записанная в видео (x, y, ширина, высота); None - весь экран"""
+        self.recording_region = [int(v) for v in region] if region else None
+
+    def _metadata_header(self):
+        """Заголовок метаданных: версия, размер экрана, область записи и частота кадров"""
+        header = {
+            "version": "1.0",
+            "screen": {
+                "width": self.screen_width,
+                "height": self.screen_height
+            },
+            "fps": self.fps
+        }
+        if self.recording_region:
+            header["region"] = list(self.recording_region)
+        return header
+
     def stop_collection(self):
         """Останавливает сбор метаданных и сохраняет результаты"""
         if not self.collecting:
@@ -392,55 +416,27 @@ class MetadataCollector:
             self.resume_collection()
             
         # Останавливаем слушателей событий
-        if self.mouse_listener:
-            self.mouse_listener.stop()
-            self.mouse_listener = None
-            
-        if self.keyboard_listener:
-            self.keyboard_listener.stop()
-            self.keyboard_listener = None
-            
-        # Останавливаем таймер сохранения
-        if self.save_timer:
-            self.save_timer.cancel()
-            self.save_timer = None
+        self._stop_listeners()
             
-        # Завершаем текущие события
-        if self.is_dragging:
-            # Получаем текущую позицию мыши
-            current_pos = mouse.Controller().position
-            self._on_mouse_click(current_pos[0], current_pos[1], mouse.Button.left, False)
-            
-        if self.is_scrolling:
-            current_pos = mouse.Controller().position
-            self._finish_scroll(current_pos[0], current_pos[1])
-            
-        if self.in_input_field:
-            self._finish_input("Escape")
-            
-        # Сохраняем метаданные
-        self._save_metadata()
-
-        # В методе stop_collection перед self.collecting = False:
-# Отменяем все таймеры длительных нажатий
-        for code, timer in self.long_press_timers.items():
-            timer.cancel()
-        self.long_press_timers.clear()
-
+        # Завершаем текущие события и дожидаемся разбора очереди
+        self._submit(self._finish_current_events)
+        self._stop_event_worker()
         
-        self.collecting = False
-    
-    def _save_metadata_periodically(self):
-        """Периодически сохраняет метаданные"""
-        if not self.collecting:
-            return
+        # Отменяем все отложенные задачи (длительные нажатия, завершение ввода)
+        self.scheduler.stop()
+        
+        # Этапы конвейера получают оставшиеся события и завершаются
+        if self.pipeline is not None:
+            self.pipeline.stop()
+        
+        # Расхождение видео с часами сессии известно только при записи видео
+        if not self._owns_clock:
+            self.timing = self.clock.report()
             
-        self._save_metadata()
+        # Дописываем журнал и сохраняем метаданные в итоговом формате JSON
+        self._close_metadata_writer()
         
-        # Перезапускаем таймер
-        self.save_timer = threading.Timer(5.0, self._save_metadata_periodically)
-        self.save_timer.daemon = True
-        self.save_timer.start()
+        self.collecting = False
     
     def _generate_id(self):
         """Генерирует короткий идентификатор для события"""
@@ -450,9 +446,7 @@ class MetadataCollector:
     
     def _get_current_timestamp(self):
         """Возвращает текущее время относительно начала записи с учетом пауз"""
-        if self.paused:
-            return round(self.pause_time - self.start_time - self.total_pause_time, 3)
-        return round(time.time() - self.start_time - self.total_pause_time, 3)
+        return self.clock.timestamp()
 
 
     
@@ -462,24 +456,217 @@ class MetadataCollector:
             return
             
         # Создаем структуру метаданных
-        metadata = {
-            "version": "1.0",
-            "recordingDuration": round(self._get_current_timestamp(), 3),
-            "screen": {
-                "width": self.screen_width,
-                "height": self.screen_height
-            },
-            "fps": self.fps,
-            "events": self.events
-        }
+        metadata = self._metadata_header()
+        metadata["recordingDuration"] = round(self._get_current_timestamp(), 3)
+        events = self.events.to_list()
+        metadata["events"] = self.redactor.redacted(events) if self.redactor else events
+        if self.timing:
+            metadata["timing"] = self.timing
             
-        # Сохраняем в файл
-        with open(self.metadata_file, 'w', encoding='utf-8') as f:
-            json.dump(metadata, f, ensure_ascii=False, indent=2)
+        # Сохраняем атомарно: при сбое остается прежний файл или журнал событий
+        write_json_atomic(self.metadata_file, metadata, level=self.compression_level)
 
 
 
     
+    def _close_metadata_writer(self):
+        """Закрывает журнал событий и сохраняет метаданные в итоговом формате JSON"""
+        if self.metadata_writer is None:
+            self._save_metadata()
+            return
+            
+        footer = {"recordingDuration": round(self._get_current_timestamp(), 3)}
+        if self.timing:
+            footer["timing"] = self.timing
+        self.metadata_writer.close(footer)
+        try:
+            self._save_metadata()
+        except OSError as e:
+            # Журнал остается на диске, метаданные восстановит cli.py recover
+            print(f"Не удалось сохранить метаданные: {e}")
+            self.metadata_writer = None
+            return
+        
+        # Журнал больше не нужен: итоговый JSON содержит все события
+        try:
+            os.remove(self.metadata_writer.path)
+        except OSError as e:
+            print(f"Не удалось удалить журнал событий: {e}")
+        self.metadata_writer = None
+    
+    def _append_event(self, event):
+        """Добавляет событие в список и в журнал"""
+        if not self._owns_clock and isinstance(event.get("time"), (int, float)):
+            # Номер кадра видео, последнего захваченного к моменту события
+            event.setdefault("frame", self.clock.frame_at(event["time"]))
+        self.events.append(event)
+        if self.redactor is not None:
+            event = self.redactor.redacted([event])[0]
+        if self.metadata_writer:
+            self.metadata_writer.append(event)
+        if self.pipeline is not None:
+            self.pipeline.submit(event)
+        self._notify(event)
+    
+    def _notify(self, event):
+        """Передает событие подписчикам живого потока"""
+        for listener in self.event_listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                print(f"Ошибка подписчика событий: {e}")
+    
+    def add_event_listener(self, listener):
+        """Подписывает функцию listener(event) на новые события"""
+        if listener not in self.event_listeners:
+            # Список заменяется целиком, чтобы поток обработки не видел его изменения
+            self.event_listeners = self.event_listeners + [listener]
+    
+    def remove_event_listener(self, listener):
+        self.event_listeners = [l for l in self.event_listeners if l != listener]
+    
+    def add_retract_listener(self, listener):
+        """Подписывает функцию listener(event) на удаление последнего разосланного события"""
+        if listener not in self.retract_listeners:
+            self.retract_listeners = self.retract_listeners + [listener]
+    
+    def remove_retract_listener(self, listener):
+        self.retract_listeners = [l for l in self.retract_listeners if l != listener]
+    
+    def _pop_event(self):
+        """Удаляет последнее событие из списка и из журнала"""
+        event = self.events.pop()
+        if self.metadata_writer:
+            self.metadata_writer.pop()
+        if self.pipeline is not None:
+            self.pipeline.retract()
+        for listener in self.retract_listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                print(f"Ошибка подписчика событий: {e}")
+        return event
+    
+    def _start_event_worker(self):
+        """Запускает поток обработки очереди сырых событий"""
+        self._event_queue = queue.SimpleQueue()
+        self._event_worker = threading.Thread(target=self._process_events, daemon=True)
+        self._event_worker.start()
+    
+    def _stop_event_worker(self):
+        """Дожидается разбора оставшихся событий и останавливает поток обработки"""
+        if self._event_worker is None:
+            return
+        self._event_queue.put(None)
+        self._event_worker.join()
+        self._event_worker = None
+    
+    def _process_events(self):
+        """
+        Поток обработки: по очереди вызывает обработчики сырых событий.
+        Все состояние классификации (нажатые клавиши, перетаскивание, прокрутка,
+        ввод текста) и список событий изменяются только в этом потоке.
+        """
+        while True:
+            item = self._event_queue.get()
+            if item is None:
+                break
+            handler, timestamp, args, self.handling_ns = item
+            try:
+                handler(*args, timestamp)
+            except Exception as e:
+                print(f"Ошибка обработки события: {e}")
+    
+    def _submit(self, handler, *args):
+        """Ставит вызов обработчика в очередь потока обработки"""
+        if self._event_worker is None:
+            return
+        self._event_queue.put((handler, self._get_current_timestamp(), args, time.perf_counter_ns()))
+    
+    def _enqueue(self, handler, args, stats):
+        """
+        Общая часть колбэков слушателей: фиксирует время события и ставит его
+        в очередь. Здесь не выполняется никакой классификации, чтобы не задерживать
+        поток слушателя pynput. stats - счетчики задержки слушателя, в потоке
+        которого вызван колбэк.
+        """
+        started = time.perf_counter_ns()
+        if self.collecting and not self.paused:
+            self.last_input_ns = started
+            self._event_queue.put((handler, self._get_current_timestamp(), args, started))
+        elapsed = time.perf_counter_ns() - started
+        stats[0] += 1
+        stats[1] += elapsed
+        if elapsed > stats[2]:
+            stats[2] = elapsed
+    
+    def get_callback_latency(self):
+        """Возвращает среднюю и максимальную задержку колбэков слушателей в микросекундах"""
+        mouse_stats, keyboard_stats = self._mouse_callbacks, self._keyboard_callbacks
+        count = mouse_stats[0] + keyboard_stats[0]
+        total_ns = mouse_stats[1] + keyboard_stats[1]
+        return {
+            "count": count,
+            "meanUs": round(total_ns / count / 1000, 2) if count else 0,
+            "maxUs": round(max(mouse_stats[2], keyboard_stats[2]) / 1000, 2)
+        }
+    
+    def _on_key_press(self, key):
+        """Колбэк слушателя: нажатие клавиши"""
+        self._enqueue(self._handle_key_press, (key,), self._keyboard_callbacks)
+    
+    def _on_key_release(self, key):
+        """Колбэк слушателя: отпускание клавиши"""
+        self._enqueue(self._handle_key_release, (key,), self._keyboard_callbacks)
+    
+    def _on_mouse_move(self, x, y):
+        """Колбэк слушателя: перемещение курсора"""
+        if self.record_trajectories:
+            self._enqueue(self._handle_move, (x, y), self._mouse_callbacks)
+    
+    def _on_mouse_click(self, x, y, button, pressed):
+        """Колбэк слушателя: нажатие или отпускание кнопки мыши"""
+        self._enqueue(self._handle_mouse_click, (x, y, button, pressed), self._mouse_callbacks)
+    
+    def _on_scroll(self, x, y, dx, dy):
+        """Колбэк слушателя: прокрутка колесиком мыши"""
+        self._enqueue(self._handle_scroll, (x, y, dx, dy), self._mouse_callbacks)
+    
+    def _on_long_press_timer(self, code):
+        """Срок длительного нажатия (поток планировщика)"""
+        if self.collecting and not self.paused:
+            self._submit(self._handle_long_press, code)
+    
+    def _on_scroll_end_timer(self):
+        """Срок завершения прокрутки (поток планировщика)"""
+        if self.collecting and not self.paused:
+            self._submit(self._handle_scroll_end)
+    
+    def _on_move_end_timer(self):
+        """Срок завершения движения курсора (поток планировщика)"""
+        if self.collecting and not self.paused:
+            self._submit(self._handle_move_end)
+    
+    def _on_input_end_timer(self):
+        """Срок завершения ввода текста (поток планировщика)"""
+        if self.collecting and not self.paused:
+            self._submit(self._handle_input_end)
+    
+    def _finish_current_events(self, timestamp):
+        """Завершает незаконченные перетаскивание, прокрутку и ввод текста"""
+        if self.is_dragging or self.is_scrolling:
+            # Получаем текущую позицию мыши
+            current_pos = mouse.Controller().position
+            if self.is_dragging:
+                self._handle_mouse_click(current_pos[0], current_pos[1], mouse.Button.left, False, timestamp)
+            if self.is_scrolling:
+                self._finish_scroll(current_pos[0], current_pos[1], timestamp)
+            
+        self._finish_move()
+            
+        if self.in_input_field:
+            self._finish_input("Escape", timestamp)
+    
     def _adjust_coordinates(self, x, y):
         """Корректирует координаты мыши при необходимости"""
         # Здесь можно добавить логику для корректировки координат,
@@ -488,108 +675,15 @@ class MetadataCollector:
     
     def _map_key_to_code(self, key):
         """Преобразует клавишу в код клавиши согласно стандартным кодам JavaScript"""
-        try:
-            # Для специальных клавиш
-            if key in self.special_keys:
-                return self.special_keys[key]
-            
-            # Для обычных клавиш
-            if hasattr(key, 'char') and key.char:
-                char = key.char
-                
-                # Проверяем, есть ли символ в маппинге символов
-                if char in self.symbol_codes:
-                    return self.symbol_codes[char]
-                    
-                # Проверяем, есть ли символ в маппинге букв и цифр
-                if char in self.letter_codes:
-                    return self.letter_codes[char]
-                
-                # Если символ не найден в маппингах, используем ASCII код
-                return f"Key{ord(char)}"
-            
-            # Проверка на Mac-специфичные клавиши по vk-коду
-            if hasattr(key, 'vk'):
-                # Command key на Mac часто имеет vk=55 или vk=54
-                if key.vk == 55 or key.vk == 54:
-                    return "MetaLeft"
-                # Option key на Mac часто имеет vk=58
-                elif key.vk == 58:
-                    return "AltLeft"
-                # Правый Option key на Mac
-                elif key.vk == 61:
-                    return "AltRight"
-                # AltGraph key
-                elif key.vk == 225:
-                    return "AltGraph"
-                
-                # Проверка на Numpad клавиши
-                if 96 <= key.vk <= 105:  # Numpad 0-9
-                    return f"Numpad{key.vk - 96}"
-                elif key.vk == 106:
-                    return "NumpadMultiply"
-                elif key.vk == 107:
-                    return "NumpadAdd"
-                elif key.vk == 109:
-                    return "NumpadSubtract"
-                elif key.vk == 110:
-                    return "NumpadDecimal"
-                elif key.vk == 111:
-                    return "NumpadDivide"
-                elif key.vk == 144:
-                    return "NumLock"
-            
-            # Если ничего не подошло, возвращаем строковое представление
-            key_str = str(key).replace('Key.', '')
-            
-            # Проверка на key26
-            if key_str.lower() == 'key26':
-                return "KeyZ"  # Z - 26-я буква английского алфавита
-            
-            # Проверяем, есть ли в обратном маппинге
-            if key_str in self.old_to_new_code:
-                return self.old_to_new_code[key_str]
-            
-            # Проверка на специальные клавиши Mac
-            if key_str == 'cmd' or key_str == 'cmd_l':
-                return "MetaLeft"
-            elif key_str == 'cmd_r':
-                return "MetaRight"
-            elif key_str == 'option' or key_str == 'alt':
-                return "AltLeft"
-            elif key_str == 'option_r' or key_str == 'alt_r':
-                return "AltRight"
-            elif key_str == 'alt_gr':
-                return "AltGraph"
-            
-            # Проверка на нестандартные коды типа "Key26"
-            if key_str.startswith('Key') and key_str[3:].isdigit():
-                num = int(key_str[3:])
-                if 1 <= num <= 26:  # Если это число от 1 до 26
-                    # Преобразуем в стандартный код клавиши (A-Z)
-                    char = chr(64 + num)  # A=65, поэтому начинаем с 64+1
-                    return f"Key{char}"
-            
-            # Если ключ не найден в маппинге, возвращаем стандартный код
-            # вместо строкового представления
-            return key_str
-        
-        except Exception as e:
-            # Добавляем логирование ошибки для отладки
-            print(f"Error mapping key {key}: {e}")
-            return str(key)
+        return self.key_translator.code(key)
 
     
     def _get_key_code_number(self, code):
         """Возвращает числовой код клавиши"""
         return self.key_code_map.get(code, 0)
     
-    def _on_key_press(self, key):
+    def _handle_key_press(self, key, timestamp):
         """Обрабатывает нажатие клавиши"""
-        if not self.collecting or self.paused:
-            return
-            
-        timestamp = self._get_current_timestamp()
         code = self._map_key_to_code(key)  # code (DOM standard)
         
         # Нормализуем код клавиши для Key1-Key26
@@ -605,13 +699,17 @@ class MetadataCollector:
         # Добавляем клавишу в список нажатых
         self.pressed_keys.add(code)
         self.key_press_times[code] = timestamp
+        self.modifier_mask |= MODIFIER_BITS.get(code, 0)
+        if code == "CapsLock":
+            self.caps_lock = not self.caps_lock
+        # Модификаторы и CapsLock в момент нажатия (для восстановления текста ввода)
+        press_modifiers = self.modifier_mask | (CAPS_LOCK if self.caps_lock else 0)
+        previous_modifiers = self.last_press_modifiers
+        self.last_press_modifiers = press_modifiers
         
-        # Создаем таймер для длительного нажатия, если его еще нет
-        if code not in self.long_press_timers:
-            timer = threading.Timer(self.long_press_threshold, self._handle_long_press, args=[code])
-            timer.daemon = True
-            timer.start()
-            self.long_press_timers[code] = timer
+        # Планируем проверку длительного нажатия
+        self.scheduler.schedule(("longPress", code), self.long_press_threshold,
+                                self._on_long_press_timer, code)
         
         # Получаем keyCode (устаревший, но все еще используемый)
         key_code = self.key_code_map.get(code, 0)
@@ -627,7 +725,7 @@ class MetadataCollector:
             key_codes_list = [self.key_code_map.get(k, 0) for k in keys_list]
             key_chars_list = [self.key_map.get(k, k) for k in keys_list]
             
-            self.events.append({
+            self._append_event({
                 "id": self._generate_id(),
                 "type": "hotkey",
                 "time": timestamp,
@@ -638,7 +736,7 @@ class MetadataCollector:
             })
         else:
             # Создаем событие keyPress с полной информацией о клавише
-            self.events.append({
+            self._append_event({
                 "id": self._generate_id(),
                 "type": "keyPress",
                 "time": timestamp,
@@ -663,13 +761,16 @@ class MetadataCollector:
             # Проверяем на клавиши, которые завершают ввод
             if code in {"Enter", "Tab", "Escape"}:
                 # Завершаем ввод текста
-                self._finish_input(code)
+                self._finish_input(code, timestamp)
             # Добавляем все клавиши к вводу, включая модификаторы и Backspace
             else:
                 # Добавляем информацию о клавише к вводу
                 self.input_codes.append(code)
                 self.input_keys.append(key_char)
                 self.input_key_codes.append(key_code)
+                self.input_modifiers.append(press_modifiers)
+                self.input_buffer.press(code, key_char, press_modifiers)
+                self._touch_input(timestamp)
         # Если это начало ввода текста (только если это не первое нажатие и не служебная клавиша)
         elif code not in non_input_keys and len(self.events) >= 2:
             # Проверяем предыдущее событие
@@ -682,8 +783,8 @@ class MetadataCollector:
                 prev_event.get("code") not in non_input_keys):
                 
                 # Удаляем предыдущее событие keyPress, так как оно станет частью ввода
-                prev_key_event = self.events.pop()
-                self.events.pop()  # Удаляем текущее событие keyPress, которое мы только что добавили
+                prev_key_event = self._pop_event()
+                self._pop_event()  # Удаляем текущее событие keyPress, которое мы только что добавили
                 
                 self.in_input_field = True
                 self.input_start_time = prev_event.get("time")  # Используем время предыдущего события
@@ -692,14 +793,16 @@ class MetadataCollector:
                 self.input_codes = [prev_event.get("code"), code]
                 self.input_keys = [prev_event.get("key"), key_char]
                 self.input_key_codes = [prev_event.get("keyCode", 0), key_code]
+                self.input_modifiers = [previous_modifiers, press_modifiers]
+                self.input_buffer = InputBuffer()
+                self.input_buffer.press(prev_event.get("code"), prev_event.get("key"), previous_modifiers)
+                self.input_buffer.press(code, key_char, press_modifiers)
+                self._touch_input(timestamp)
 
     
     
-    def _on_key_release(self, key):
+    def _handle_key_release(self, key, timestamp):
         """Обрабатывает отпускание клавиши"""
-        if not self.collecting or self.paused:
-            return
-            
         code = self._map_key_to_code(key)
         
         # Если клавиша не была нажата, игнорируем
@@ -708,182 +811,61 @@ class MetadataCollector:
             
         # Удаляем клавишу из списка нажатых
         self.pressed_keys.remove(code)
+        if code in MODIFIER_BITS:
+            # Левая и правая клавиши делят бит, поэтому маску пересчитываем
+            self.modifier_mask = modifier_mask(self.pressed_keys)
         
-        # Отменяем таймер длительного нажатия, если он существует
-        if code in self.long_press_timers:
-            self.long_press_timers[code].cancel()
-            del self.long_press_timers[code]
+        # Отменяем проверку длительного нажатия
+        self.scheduler.cancel(("longPress", code))
         
         # Если идет ввод текста и отпущена клавиша Enter, Tab или Escape, завершаем ввод
         if self.in_input_field and code in {"Enter", "Tab", "Escape"}:
-            self._finish_input(code)
+            self._finish_input(code, timestamp)
 
 
     
     def _check_for_hotkey(self, key_code):
         """Проверяет, является ли текущая комбинация клавиш горячей клавишей"""
-        # Если нажата только одна клавиша, это не горячая клавиша
-        if len(self.pressed_keys) <= 1:
+        # Горячая клавиша - хотя бы один модификатор и обычная клавиша
+        if not self.modifier_mask or key_code in MODIFIER_BITS:
             return False
             
-        # Преобразуем Key1-Key26 в стандартные коды DOM
-        normalized_keys = set()
-        for k in self.pressed_keys:
-            if k.startswith('Key') and k[3:].isdigit():
-                num = int(k[3:])
-                if 1 <= num <= 26:
-                    normalized_keys.add(f"Key{chr(64 + num)}")
-                else:
-                    normalized_keys.add(k)
-            else:
-                normalized_keys.add(k)
-        
-        # Проверяем известные комбинации горячих клавиш
-        modifiers = {"ControlLeft", "ControlRight", "ShiftLeft", "ShiftRight", 
-                    "AltLeft", "AltRight", "MetaLeft", "MetaRight"}
-        
-        # Должен быть хотя бы один модификатор
-        has_modifier = any(k in modifiers for k in normalized_keys)
-        if not has_modifier:
-            return False
-            
-        # Известные комбинации
-        known_hotkeys = {
-            frozenset(["ControlLeft", "KeyC"]): "Ctrl+C",
-            frozenset(["ControlRight", "KeyC"]): "Ctrl+C",
-            frozenset(["ControlLeft", "KeyV"]): "Ctrl+V",
-            frozenset(["ControlRight", "KeyV"]): "Ctrl+V",
-            frozenset(["ControlLeft", "KeyX"]): "Ctrl+X",
-            frozenset(["ControlRight", "KeyX"]): "Ctrl+X",
-            frozenset(["ControlLeft", "KeyZ"]): "Ctrl+Z",
-            frozenset(["ControlRight", "KeyZ"]): "Ctrl+Z",
-            frozenset(["ControlLeft", "KeyY"]): "Ctrl+Y",
-            frozenset(["ControlRight", "KeyY"]): "Ctrl+Y",
-            frozenset(["ControlLeft", "KeyA"]): "Ctrl+A",
-            frozenset(["ControlRight", "KeyA"]): "Ctrl+A",
-            frozenset(["ControlLeft", "KeyS"]): "Ctrl+S",
-            frozenset(["ControlRight", "KeyS"]): "Ctrl+S",
-            frozenset(["ControlLeft", "KeyF"]): "Ctrl+F",
-            frozenset(["ControlRight", "KeyF"]): "Ctrl+F",
-            frozenset(["ControlLeft", "KeyP"]): "Ctrl+P",
-            frozenset(["ControlRight", "KeyP"]): "Ctrl+P",
-            frozenset(["ControlLeft", "KeyO"]): "Ctrl+O",
-            frozenset(["ControlRight", "KeyO"]): "Ctrl+O",
-            frozenset(["ControlLeft", "KeyN"]): "Ctrl+N",
-            frozenset(["ControlRight", "KeyN"]): "Ctrl+N",
-            frozenset(["AltLeft", "F4"]): "Alt+F4",
-            frozenset(["AltRight", "F4"]): "Alt+F4",
-            frozenset(["ControlLeft", "ShiftLeft", "KeyZ"]): "Ctrl+Shift+Z",
-            frozenset(["ControlRight", "ShiftLeft", "KeyZ"]): "Ctrl+Shift+Z",
-            frozenset(["ControlLeft", "ShiftRight", "KeyZ"]): "Ctrl+Shift+Z",
-            frozenset(["ControlRight", "ShiftRight", "KeyZ"]): "Ctrl+Shift+Z",
-        }
-        
-        # Проверяем, соответствует ли текущий набор клавиш известной горячей клавише
-        current_keys = frozenset(normalized_keys)
-        for hotkey_keys, hotkey_name in known_hotkeys.items():
-            # Преобразуем key_code, если это Key1-Key26
-            normalized_key_code = key_code
-            if key_code.startswith('Key') and key_code[3:].isdigit():
-                num = int(key_code[3:])
-                if 1 <= num <= 26:
-                    normalized_key_code = f"Key{chr(64 + num)}"
-            
-            if hotkey_keys.issubset(current_keys) and normalized_key_code in hotkey_keys:
-                return hotkey_name
-                
-        # Если не нашли известную комбинацию, но есть модификатор и другая клавиша,
-        # создаем пользовательскую горячую клавишу
-        non_modifiers = [k for k in normalized_keys if k not in modifiers]
-        
-        # Преобразуем key_code, если это Key1-Key26
-        normalized_key_code = key_code
-        if key_code.startswith('Key') and key_code[3:].isdigit():
-            num = int(key_code[3:])
-            if 1 <= num <= 26:
-                normalized_key_code = f"Key{chr(64 + num)}"
-        
-        if non_modifiers and normalized_key_code in non_modifiers:
-            # Формируем имя горячей клавиши
-            modifier_parts = []
-            if "ControlLeft" in normalized_keys or "ControlRight" in normalized_keys:
-                modifier_parts.append("Ctrl")
-            if "ShiftLeft" in normalized_keys or "ShiftRight" in normalized_keys:
-                modifier_parts.append("Shift")
-            if "AltLeft" in normalized_keys or "AltRight" in normalized_keys:
-                modifier_parts.append("Alt")
-            if "MetaLeft" in normalized_keys or "MetaRight" in normalized_keys:
-                modifier_parts.append("Win")
-                
-            # Используем нормализованный код клавиши для отображения
-            key_part = self.key_map.get(normalized_key_code, normalized_key_code)
-            return "+".join(modifier_parts + [key_part])
+        application = self.application_provider() if self.application_provider else None
+        hotkey = self.hotkey_matcher.match(self.modifier_mask, key_code, application)
+        if hotkey:
+            return hotkey
             
-        return False
+        # Если не нашли известную комбинацию, создаем пользовательскую горячую клавишу
+        return format_hotkey(self.modifier_mask, self.key_map.get(key_code, key_code))
 
 
     
-    def _finish_input(self, reason_code):
+    def _touch_input(self, timestamp):
+        """Отмечает нажатие клавиши при вводе текста и переносит срок завершения ввода"""
+        self.last_input_time = timestamp
+        self.scheduler.schedule("inputEnd", self.input_end_delay, self._on_input_end_timer)
+    
+    def _handle_input_end(self, timestamp):
+        """Завершает ввод текста, если набор прекратился"""
+        # Клавиша могла быть нажата уже после срабатывания срока
+        if not self.in_input_field or timestamp - self.last_input_time < self.input_end_delay:
+            return
+        self._finish_input("Timeout", self.last_input_time)
+    
+    def _finish_input(self, reason_code, timestamp):
         """Завершает событие ввода текста"""
         if not self.in_input_field:
             return
             
-        timestamp = self._get_current_timestamp()
+        self.scheduler.cancel("inputEnd")
         reason_key = self.key_map.get(reason_code, reason_code)
 
-        # Формируем текстовое значение из введенных символов
-        input_value = ""
-        for i in range(len(self.input_codes)):
-            code = self.input_codes[i]
-            key = self.input_keys[i]
-            
-            # Обрабатываем Backspace (удаляем последний символ)
-            if code == "Backspace":
-                if input_value:  # Если есть что удалять
-                    input_value = input_value[:-1]
-            # Пропускаем другие специальные клавиши, которые не добавляют символы
-            elif code in ["Delete", "ArrowLeft", "ArrowRight", "ArrowUp", "ArrowDown",
-                        "Home", "End", "PageUp", "PageDown"]:
-                pass
-            # Пропускаем модификаторы
-            elif code in ["ControlLeft", "ControlRight", "ShiftLeft", "ShiftRight", 
-                        "AltLeft", "AltRight", "MetaLeft", "MetaRight"]:
-                pass
-            # Обрабатываем Enter как перевод строки
-            elif code == "Enter":
-                input_value += "\n"
-            # Обрабатываем Tab как табуляцию
-            elif code == "Tab":
-                input_value += "\t"
-            # Обрабатываем пробел
-            elif code == "Space":
-                input_value += " "
-            # Для букв (KeyA-KeyZ)
-            elif code.startswith("Key"):
-                char = code[3:]  # Извлекаем букву из кода (например, "A" из "KeyA")
-                # Учитываем регистр
-                if "ShiftLeft" in self.pressed_keys or "ShiftRight" in self.pressed_keys:
-                    input_value += char
-                else:
-                    input_value += char.lower()
-            # Для цифр (Digit0-Digit9)
-            elif code.startswith("Digit"):
-                digit = code[5:]  # Извлекаем цифру из кода (например, "1" из "Digit1")
-                # Учитываем Shift для символов над цифрами
-                if "ShiftLeft" in self.pressed_keys or "ShiftRight" in self.pressed_keys:
-                    shift_symbols = {
-                        "1": "!", "2": "@", "3": "#", "4": "$", "5": "%",
-                        "6": "^", "7": "&", "8": "*", "9": "(", "0": ")"
-                    }
-                    input_value += shift_symbols.get(digit, digit)
-                else:
-                    input_value += digit
-            # Для других символов используем символьное представление
-            elif len(key) == 1:
-                input_value += key
-        
+        # Текст собирался по мере нажатий с учетом каретки, выделения и
+        # состояния Shift/CapsLock в момент каждого нажатия
+        input_value = self.input_buffer.value
+
         # Создаем событие input с полной информацией о клавишах
-        self.events.append({
+        self._append_event({
             "id": self._generate_id(),
             "type": "input",
             "time": self.input_start_time,
@@ -891,6 +873,7 @@ class MetadataCollector:
             "keys": self.input_keys,    # Символьные представления
             "codes": self.input_codes,      # DOM стандартные коды
             "keyCodes": self.input_key_codes,  # Числовые коды
+            "modifiers": self.input_modifiers,  # Маски Ctrl=1, Shift=2, Alt=4, Win=8, CapsLock=16
             "length": len(self.input_codes),
             "value": input_value,           # Добавляем текстовое значение
             "reason": reason_key
@@ -899,23 +882,69 @@ class MetadataCollector:
         # Сбрасываем состояние ввода
         self.in_input_field = False
         self.input_start_time = None
+        self.last_input_time = None
         self.input_codes = []
         self.input_keys = []
         self.input_key_codes = []
+        self.input_modifiers = []
+        self.input_buffer = None
 
 
-    def _on_mouse_click(self, x, y, button, pressed):
-        """Обрабатывает клики мышью"""
-        if not self.collecting or self.paused:
+    def _handle_move(self, x, y, timestamp):
+        """Добавляет точку к траектории курсора"""
+        x, y = self._adjust_coordinates(x, y)
+        self.last_move_time = timestamp
+        if self.trajectory is None:
+            # При перетаскивании траектория начинается в момент нажатия кнопки
+            if self.is_dragging:
+                return
+            self.trajectory = TrajectorySimplifier(self.trajectory_tolerance)
+            self.trajectory.start(timestamp, x, y)
+        else:
+            self.trajectory.add(timestamp, x, y)
+            
+        # Движение без нажатой кнопки завершается после паузы
+        if not self.is_dragging:
+            self.scheduler.schedule("moveEnd", self.move_end_delay, self._on_move_end_timer)
+    
+    def _handle_move_end(self, timestamp):
+        """Завершает движение курсора, если после последнего перемещения прошла пауза"""
+        if self.is_dragging or timestamp - self.last_move_time < self.move_end_delay:
+            return
+        self._finish_move()
+    
+    def _finish_move(self):
+        """Сохраняет накопленную траекторию курсора событием mouseMove"""
+        trajectory = self.trajectory
+        if trajectory is None:
+            return
+        self.trajectory = None
+        self.scheduler.cancel("moveEnd")
+        
+        points = trajectory.finish()
+        start_time, start_x, start_y = points[0]
+        # Дрожание курсора в пределах порога клика движением не считаем
+        if not any(abs(x - start_x) > 5 or abs(y - start_y) > 5 for _, x, y in points):
             return
             
+        self._append_event({
+            "id": self._generate_id(),
+            "type": "mouseMove",
+            "time": start_time,
+            "duration": round(points[-1][0] - start_time, 3),
+            "x": start_x,
+            "y": start_y,
+            "path": encode_path(points)   # [dt_мс, dx, dy, ...] относительно предыдущей точки
+        })
+    
+    def _handle_mouse_click(self, x, y, button, pressed, timestamp):
+        """Обрабатывает клики мышью"""
         # Завершаем ввод текста при любом клике мыши (нажатии кнопки)
         if pressed and self.in_input_field:
-            self._finish_input("Click")
+            self._finish_input("Click", timestamp)
             
         # Корректируем координаты
         x, y = self._adjust_coordinates(x, y)
-        timestamp = self._get_current_timestamp()
         
         # Подготовка информации о нажатых клавишах
         if self.pressed_keys:
@@ -928,6 +957,9 @@ class MetadataCollector:
             key_codes = None
             
         if pressed:
+            # Движение курсора до нажатия сохраняется отдельным событием
+            self._finish_move()
+            
             # Обработка нажатия кнопки мыши
             if button == mouse.Button.left:
                 # Начало потенциального drag and drop
@@ -935,6 +967,11 @@ class MetadataCollector:
                 self.drag_start_time = timestamp
                 self.is_dragging = True
                 
+                # Траектория перетаскивания начинается в точке нажатия
+                if self.record_trajectories:
+                    self.trajectory = TrajectorySimplifier(self.trajectory_tolerance)
+                    self.trajectory.start(timestamp, x, y)
+                
                 # Сохраняем информацию о нажатых клавишах для потенциального клика
                 self.drag_keys = keys
                 self.drag_codes = codes
@@ -944,7 +981,7 @@ class MetadataCollector:
                 # является ли это кликом или началом перетаскивания
                     
             elif button == mouse.Button.right:
-                self.events.append({
+                self._append_event({
                     "id": self._generate_id(),
                     "type": "rightClick",
                     "time": timestamp,
@@ -960,13 +997,15 @@ class MetadataCollector:
                 # Завершение drag and drop
                 end_pos = (x, y)
                 end_time = timestamp
+                trajectory = self.trajectory
+                self.trajectory = None
                 
                 # Проверяем, было ли реальное перетаскивание
                 if (abs(self.drag_start_pos[0] - end_pos[0]) > 5 or
                     abs(self.drag_start_pos[1] - end_pos[1]) > 5):
                     
                     # Создаем событие drag
-                    self.events.append({
+                    drag_event = {
                         "id": self._generate_id(),
                         "type": "drag",
                         "time": self.drag_start_time,
@@ -988,7 +1027,11 @@ class MetadataCollector:
                         "keys": self.drag_keys,
                         "codes": self.drag_codes,
                         "keyCodes": self.drag_key_codes
-                    })
+                    }
+                    if trajectory is not None:
+                        # Путь перетаскивания от точки нажатия до точки отпускания
+                        drag_event["path"] = encode_path(trajectory.finish(end_time, x, y))
+                    self._append_event(drag_event)
                 else:
                     # Если не было реального перетаскивания, то это был клик
                     # Проверка на двойной клик
@@ -996,9 +1039,9 @@ class MetadataCollector:
                         last_click_time = self.events[-1].get("time", 0)
                         if timestamp - last_click_time < 0.5:  # Если прошло менее 0.5 секунд
                             # Удаляем предыдущий клик
-                            self.events.pop()
+                            self._pop_event()
                             # Добавляем двойной клик
-                            self.events.append({
+                            self._append_event({
                                 "id": self._generate_id(),
                                 "type": "doubleClick",
                                 "time": timestamp,
@@ -1010,7 +1053,7 @@ class MetadataCollector:
                             })
                         else:
                             # Обычный клик левой кнопкой
-                            self.events.append({
+                            self._append_event({
                                 "id": self._generate_id(),
                                 "type": "leftClick",
                                 "time": self.drag_start_time,  # Используем время начала нажатия
@@ -1022,7 +1065,7 @@ class MetadataCollector:
                             })
                     else:
                         # Обычный клик левой кнопкой
-                        self.events.append({
+                        self._append_event({
                             "id": self._generate_id(),
                             "type": "leftClick",
                             "time": self.drag_start_time,  # Используем время начала нажатия
@@ -1044,12 +1087,11 @@ class MetadataCollector:
 
 
 
-    def _handle_long_press(self, code):
+    def _handle_long_press(self, code, timestamp):
         """Обрабатывает длительное нажатие клавиши"""
-        if not self.collecting or self.paused or code not in self.pressed_keys:
+        if code not in self.pressed_keys:
             return
             
-        timestamp = self._get_current_timestamp()
         press_time = self.key_press_times.get(code)
         
         if press_time and (timestamp - press_time) >= self.long_press_threshold:
@@ -1058,7 +1100,7 @@ class MetadataCollector:
             key_code = self.key_code_map.get(code, 0)
             
             # Создаем событие keyLongPress
-            self.events.append({
+            self._append_event({
                 "id": self._generate_id(),
                 "type": "keyLongPress",
                 "time": press_time,  # Время начала нажатия
@@ -1067,25 +1109,15 @@ class MetadataCollector:
                 "code": code,         # DOM стандартный код
                 "keyCode": key_code   # Числовой код
             })
-            
-            # Удаляем таймер из словаря, так как он уже выполнился
-            if code in self.long_press_timers:
-                del self.long_press_timers[code]
-
-
     
-    def _on_scroll(self, x, y, dx, dy):
+    def _handle_scroll(self, x, y, dx, dy, timestamp):
         """Обрабатывает прокрутку колесиком мыши"""
-        if not self.collecting or self.paused:
-            return
-            
         # Завершаем ввод текста при прокрутке
         if self.in_input_field:
-            self._finish_input("Scroll")
+            self._finish_input("Scroll", timestamp)
             
         # Корректируем координаты
         x, y = self._adjust_coordinates(x, y)
-        timestamp = self._get_current_timestamp()
         
         # Определяем направление прокрутки
         # В pynput: положительное dy означает прокрутку вверх, отрицательное - вниз
@@ -1103,7 +1135,7 @@ class MetadataCollector:
             # завершаем предыдущую прокрутку
             current_direction = 1 if self.scroll_amount > 0 else -1
             if timestamp - self.last_scroll_time > 0.5 or current_direction != scroll_direction:
-                self._finish_scroll(x, y)
+                self._finish_scroll(x, y, timestamp)
                 
                 # Начинаем новую прокрутку
                 self.is_scrolling = True
@@ -1123,13 +1155,22 @@ class MetadataCollector:
             self.scroll_direction_name = scroll_direction_name
             
         self.last_scroll_time = timestamp
+        self.last_scroll_pos = (x, y)
+        self.scheduler.schedule("scrollEnd", self.scroll_end_delay, self._on_scroll_end_timer)
+    
+    def _handle_scroll_end(self, timestamp):
+        """Завершает прокрутку, если после последнего щелчка колесика прошла пауза"""
+        # Колесико могло сдвинуться уже после срабатывания срока
+        if not self.is_scrolling or timestamp - self.last_scroll_time < self.scroll_end_delay:
+            return
+        self._finish_scroll(self.last_scroll_pos[0], self.last_scroll_pos[1], self.last_scroll_time)
 
-    def _finish_scroll(self, end_x, end_y):
+    def _finish_scroll(self, end_x, end_y, timestamp):
         """Завершает событие прокрутки после паузы"""
         if not self.is_scrolling:
             return
             
-        timestamp = self._get_current_timestamp()
+        self.scheduler.cancel("scrollEnd")
         
         # Подготовка информации о нажатых клавишах
         if self.pressed_keys:
@@ -1146,7 +1187,7 @@ class MetadataCollector:
 
         
         # Создаем событие scroll
-        self.events.append({
+        self._append_event({
             "id": self._generate_id(),
             "type": "scroll",
             "time": self.scroll_start_time,
@@ -1198,15 +1239,22 @@ class MetadataCollector:
         if data:
             event.update(data)
             
-        self.events.append(event)
-        
-        # Сохраняем метаданные после добавления пользовательского события
-        self._save_metadata()
+        # Событие добавляет поток обработки, чтобы сохранить порядок событий
+        self._submit(self._handle_custom_event, event)
         
         return event["id"]
     
+    def _handle_custom_event(self, event, timestamp):
+        """Добавляет пользовательское событие и сразу дописывает его в журнал"""
+        self._append_event(event)
+        self.metadata_writer.flush()
+    
     def get_events(self):
-        """Возвращает список всех собранных событий"""
+        """
+        Возвращает все собранные события. Хранилище ведет себя как список
+        словарей (len, индексация, итерация); список можно получить через to_list(),
+        выборки по времени - через events_between, events_at_frame и events_of_type
+        """
         return self.events
     
     def get_recording_duration(self):
@@ -1239,14 +1287,25 @@ class MetadataCollector:
     
     def get_total_pause_time(self):
         """Возвращает общее время пауз в секундах"""
-        return self.total_pause_time
+        return self.clock.total_pause_time()
     
     def clear_events(self):
         """Очищает список событий"""
-        self.events = []
+        if self._event_worker is not None:
+            self._submit(self._handle_clear_events)
+            return
+        self._handle_clear_events(None)
+    
+    def _handle_clear_events(self, timestamp):
+        """Очищает список событий и журнал"""
+        self.events = EventStore(fps=self.fps)
         
-        # Сохраняем пустые метаданные
-        self._save_metadata()
+        if self.metadata_writer:
+            self.metadata_writer.clear()
+            self.metadata_writer.flush()
+        else:
+            # Сохраняем пустые метаданные
+            self._save_metadata()
     
     def __del__(self):
         """Деструктор класса"""
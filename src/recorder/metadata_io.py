@@ -0,0 +1,331 @@
+import io
+import os
+import json
+import time
+import threading
+from src.recorder.binary_events import SUPPORTED_MAGICS, read_binary_stream
+from src.recorder.compression import (GZIP, ZSTD, CompressedWriter, compressed_path,
+                                      compression_for_path, open_read, open_text,
+                                      strip_compression_extension)
+from src.recorder.event_store import EventStore
+
+# Расширение журнала событий (JSON Lines), который пишется во время записи
+JOURNAL_EXTENSION = ".jsonl"
+
+# Служебные записи журнала. События всегда содержат поле "type",
+# служебные записи - одно из полей ниже
+HEADER_KEY = "$header"
+FOOTER_KEY = "$footer"
+POP_KEY = "$pop"
+CLEAR_KEY = "$clear"
+
+# Групповая фиксация журнала по умолчанию: события попадают на диск не позже
+# чем через COMMIT_INTERVAL секунд или сразу при накоплении COMMIT_BATCH событий
+COMMIT_INTERVAL = 0.2
+COMMIT_BATCH = 256
+
+# Суффикс временного файла при атомарной записи
+TEMP_SUFFIX = ".tmp"
+
+
+def journal_path_for(metadata_file, compression=None):
+    """Возвращает путь к журналу событий (при сжатии - с расширением сжатия) для файла метаданных"""
+    base = os.path.splitext(strip_compression_extension(metadata_file))[0]
+    return compressed_path(base + JOURNAL_EXTENSION, compression)
+
+
+def metadata_path_for(journal_file):
+    """Возвращает путь к итоговому файлу метаданных для журнала событий (с тем же сжатием)"""
+    base = os.path.splitext(strip_compression_extension(journal_file))[0]
+    return compressed_path(base + ".json", compression_for_path(journal_file))
+
+
+def is_journal_path(path):
+    """Проверяет, является ли файл журналом событий (в том числе сжатым)"""
+    return strip_compression_extension(path).endswith(JOURNAL_EXTENSION)
+
+
+def _fsync_directory(path):
+    """Сохраняет на диск запись каталога (переименование файла); в Windows не требуется"""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY | os.O_DIRECTORY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def write_json_atomic(path, data, indent=2, level=None):
+    """
+    Сохраняет JSON атомарно: данные пишутся во временный файл рядом с итоговым,
+    сбрасываются на диск и заменяют итоговый файл переименованием. При сбое
+    на диске остается либо прежний файл, либо новый целиком.
+    Файлы с расширением .gz и .zst сжимаются потоково с уровнем level,
+    JSON в них пишется без отступов.
+    """
+    compression = compression_for_path(path)
+    temp_path = path + TEMP_SUFFIX
+    try:
+        writer = CompressedWriter(temp_path, compression, level)
+        with io.TextIOWrapper(io.BufferedWriter(writer), encoding='utf-8') as f:
+            if compression is None:
+                json.dump(data, f, ensure_ascii=False, indent=indent)
+            else:
+                json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+            f.flush()
+            # Конец потока сжатия записывается до fsync: заменить прежний
+            # файл может только полностью записанный на диск
+            writer.finish()
+            writer.sync()
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    _fsync_directory(path)
+
+
+class EventStreamWriter:
+    """
+    Журнал упреждающей записи (WAL) событий в формате JSON Lines.
+    Дописываются только новые события, поэтому стоимость записи не растет
+    с длительностью сессии. Удаление последних событий (например, клик,
+    ставший двойным) и очистка списка записываются служебными строками.
+
+    Фиксация групповая: отдельный поток дописывает все накопленные события
+    одним блоком и одним вызовом fsync не позже чем через commit_interval
+    секунд после первого из них или сразу при накоплении commit_batch событий.
+    Меньший интервал уменьшает потерю данных при сбое, больший - число
+    fsync. При commit_interval=None поток не запускается и события
+    записываются только вызовом flush(); sync=False отключает fsync.
+    После сбоя метаданные восстанавливаются из журнала (read_journal,
+    команда cli.py recover).
+
+    Журнал можно сжимать потоково (compression="gzip" или "zstd"): каждая
+    фиксация завершает блок сжатия, поэтому записанная часть журнала
+    распаковывается и после сбоя.
+    """
+
+    def __init__(self, path, header, commit_interval=COMMIT_INTERVAL, commit_batch=COMMIT_BATCH,
+                 sync=True, compression=None, level=None):
+        self.path = path
+        self.header = header
+        self.commit_interval = commit_interval
+        self.commit_batch = commit_batch
+        self.sync = sync
+        self.commits = 0
+        self.committed_records = 0
+        self._pending = []
+        self._first_pending = None
+        self._closed = False
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        # Порядок блоков в файле совпадает с порядком событий
+        self._io_lock = threading.Lock()
+        self._file = CompressedWriter(path, compression, level)
+        self._write_lines([{HEADER_KEY: header}])
+        self._sync_file()
+
+        self._thread = None
+        if commit_interval is not None:
+            self._thread = threading.Thread(target=self._run, name="screencaster-wal", daemon=True)
+            self._thread.start()
+
+    def append(self, event):
+        """Добавляет событие в очередь на запись"""
+        with self._cond:
+            self._add(event)
+
+    def _add(self, record):
+        """Добавляет запись в очередь и будит поток фиксации (вызывается под блокировкой)"""
+        pending = self._pending
+        pending.append(record)
+        if len(pending) == 1:
+            self._first_pending = time.monotonic()
+            self._cond.notify()
+        elif len(pending) >= self.commit_batch:
+            self._cond.notify()
+
+    def pop(self):
+        """Отмечает удаление последнего события"""
+        with self._cond:
+            if self._pending and "type" in self._pending[-1]:
+                # Событие еще не записано, достаточно убрать его из очереди
+                self._pending.pop()
+            else:
+                self._add({POP_KEY: 1})
+
+    def clear(self):
+        """Отмечает очистку списка событий"""
+        with self._cond:
+            self._pending = []
+            self._add({CLEAR_KEY: True})
+
+    def _run(self):
+        """Поток групповой фиксации"""
+        while True:
+            with self._cond:
+                while not self._closed:
+                    if self._pending:
+                        if len(self._pending) >= self.commit_batch:
+                            break
+                        remaining = self._first_pending + self.commit_interval - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                    else:
+                        self._cond.wait()
+                if self._closed:
+                    return
+            try:
+                self.flush()
+            except (OSError, ValueError) as e:
+                print(f"Ошибка записи журнала событий: {e}")
+                return
+
+    def flush(self):
+        """Дописывает накопленные события в журнал и сбрасывает их на диск"""
+        with self._io_lock:
+            with self._cond:
+                pending = self._pending
+                self._pending = []
+            if pending and self._file:
+                self._write_lines(pending)
+                self._sync_file()
+                self.commits += 1
+                self.committed_records += len(pending)
+
+    def close(self, footer=None):
+        """Дописывает оставшиеся события и закрывает журнал"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        with self._io_lock:
+            if self._file is None:
+                return
+            if footer is not None:
+                self._write_lines([{FOOTER_KEY: footer}])
+                self._sync_file()
+            self._file.close()
+            self._file = None
+
+    def _sync_file(self):
+        if self.sync:
+            self._file.sync()
+        else:
+            self._file.flush()
+
+    def _write_lines(self, records):
+        self._file.write("".join(
+            json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+            for record in records
+        ).encode("utf-8"))
+
+
+def read_journal(path):
+    """
+    Восстанавливает метаданные в обычном формате из журнала JSON Lines.
+    Недописанная при сбое последняя строка отбрасывается.
+    """
+    with open_text(path) as f:
+        return _read_journal_lines(f)
+
+
+def _read_journal_lines(lines):
+    header = {}
+    footer = {}
+    events = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            # Последняя строка могла быть записана не полностью
+            break
+        if HEADER_KEY in record:
+            header = record[HEADER_KEY]
+        elif FOOTER_KEY in record:
+            footer = record[FOOTER_KEY]
+        elif POP_KEY in record:
+            if events:
+                events.pop()
+        elif CLEAR_KEY in record:
+            events = []
+        else:
+            events.append(record)
+
+    metadata = dict(header)
+    metadata.update(footer)
+    if "recordingDuration" not in metadata:
+        metadata["recordingDuration"] = events[-1].get("time", 0) if events else 0
+    metadata["events"] = events
+    return metadata
+
+
+def load_metadata(path):
+    """
+    Загружает метаданные из файла в любом поддерживаемом формате:
+    обычный JSON, журнал JSON Lines или бинарный формат, в том числе сжатые
+    gzip или zstd (формат и сжатие определяются по содержимому). Если файла
+    нет (например, запись прервалась), используется журнал рядом с ним.
+    """
+    if not os.path.exists(path):
+        for candidate in _fallback_paths(path):
+            if os.path.exists(candidate):
+                return load_metadata(candidate)
+        raise FileNotFoundError(path)
+
+    with open_read(path) as stream:
+        head = stream.peek(64)
+        if head.startswith(SUPPORTED_MAGICS):
+            return read_binary_stream(stream)
+        text = io.TextIOWrapper(stream, encoding='utf-8')
+        if head.lstrip().startswith(('{"' + HEADER_KEY + '"').encode("utf-8")):
+            return _read_journal_lines(text)
+        return json.load(text)
+
+
+def _fallback_paths(path):
+    """Файлы, которые заменяют отсутствующий файл метаданных: сжатые варианты и журнал"""
+    compressions = (None, GZIP, ZSTD)
+    candidates = [compressed_path(path, c) for c in compressions]
+    candidates += [journal_path_for(path, c) for c in compressions]
+    return [candidate for candidate in candidates if candidate != path]
+
+
+def load_event_store(path):
+    """
+    Загружает метаданные в любом поддерживаемом формате и возвращает пару
+    (заголовок без событий, EventStore с индексом по времени)
+    """
+    metadata = load_metadata(path)
+    events = metadata.pop("events", [])
+    return metadata, EventStore(events, fps=metadata.get("fps"))
+
+
+def recover_journal(journal_file, metadata_file=None, remove_journal=True):
+    """
+    Восстанавливает итоговые метаданные из журнала событий после сбоя записи.
+    Метаданные сохраняются атомарно (сжатый журнал - в сжатый файл тем же
+    способом), после чего журнал удаляется (если remove_journal).
+    Возвращает восстановленные метаданные.
+    """
+    metadata = read_journal(journal_file)
+    write_json_atomic(metadata_file or metadata_path_for(journal_file), metadata)
+    if remove_journal:
+        os.remove(journal_file)
+    return metadata
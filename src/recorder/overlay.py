@@ -0,0 +1,234 @@
+import threading
+from functools import lru_cache
+import cv2
+import numpy as np
+from src.recorder.hotkey_matcher import MODIFIER_BITS
+
+# Наложение кликов и нажатий клавиш на кадры записи.
+#
+# События приходят из потока обработки MetadataCollector (on_event), кадры -
+# из потока записи (apply). Спрайты кругов клика и глифы подписи рисуются
+# заранее и кешируются, а на кадре изменяются только прямоугольные области
+# под кругами и строкой подписи, поэтому затраты на кадр не зависят от его размера.
+
+CLICK_TYPES = ("leftClick", "rightClick", "doubleClick")
+
+# Круги клика: длительность анимации, конечный радиус и число заранее нарисованных фаз
+RIPPLE_DURATION = 0.5
+RIPPLE_RADIUS = 28
+RIPPLE_STEPS = 12
+RIPPLE_THICKNESS = 3
+RIPPLE_COLORS = {
+    "leftClick": (0, 200, 255),
+    "rightClick": (255, 160, 0),
+    "doubleClick": (60, 60, 255),
+}
+# Одновременно рисуется не больше MAX_RIPPLES кругов (самые старые отбрасываются)
+MAX_RIPPLES = 16
+
+# Строка подписи: скрывается через CAPTION_TIMEOUT секунд после последнего
+# нажатия, показывает не больше CAPTION_TOKENS последних элементов
+CAPTION_TIMEOUT = 2.0
+CAPTION_TOKENS = 32
+CAPTION_FONT = cv2.FONT_HERSHEY_SIMPLEX
+CAPTION_SCALE = 0.8
+CAPTION_THICKNESS = 2
+CAPTION_HEIGHT = 44
+CAPTION_MARGIN = 40
+CAPTION_PADDING = 12
+CAPTION_ALPHA = 0.75
+CAPTION_BACKGROUND = (32, 32, 32)
+CAPTION_TEXT = (255, 255, 255)
+CHIP_BACKGROUND = (90, 90, 90)
+CHIP_PADDING = 6
+
+GLYPH_CACHE_SIZE = 512
+
+
+@lru_cache(maxsize=32)
+def ripple_sprites(radius=RIPPLE_RADIUS, steps=RIPPLE_STEPS, thickness=RIPPLE_THICKNESS):
+    """
+    Фазы анимации круга клика: массив (steps, 2r+1, 2r+1) весов смешивания
+    в 1/256. Круг расширяется и гаснет; цвет задается при наложении.
+    """
+    size = 2 * radius + 1
+    sprites = np.zeros((steps, size, size), dtype=np.uint16)
+    for step in range(steps):
+        phase = (step + 1) / steps
+        mask = np.zeros((size, size), dtype=np.uint8)
+        ring = max(int(radius * (0.3 + 0.7 * phase)), 1)
+        cv2.circle(mask, (radius, radius), ring, 255, thickness, cv2.LINE_AA)
+        sprites[step] = (mask.astype(np.uint16) * int(256 * (1 - phase * 0.8))) >> 8
+    return sprites
+
+
+@lru_cache(maxsize=GLYPH_CACHE_SIZE)
+def glyph(text, scale=CAPTION_SCALE, thickness=CAPTION_THICKNESS):
+    """Маска надписи (uint8, высота строки подписи без отступов)"""
+    (width, height), baseline = cv2.getTextSize(text, CAPTION_FONT, scale, thickness)
+    mask = np.zeros((height + baseline + thickness, width + thickness), dtype=np.uint8)
+    cv2.putText(mask, text, (0, height), CAPTION_FONT, scale, 255, thickness, cv2.LINE_AA)
+    return mask
+
+
+def _printable(text):
+    # Шрифты Hershey в OpenCV содержат только ASCII
+    return "".join(char if " " <= char <= "~" else "?" for char in text)
+
+
+def _blend_mask(region, weights, color):
+    """Смешивает цвет с областью кадра по весам в 1/256 (на месте)"""
+    weights = weights[..., None]
+    region[:] = ((region * (256 - weights) + np.array(color, dtype=np.uint16) * weights) >> 8)
+
+
+class EventOverlay:
+    """
+    Рисует на кадрах круги кликов и строку нажатых клавиш и горячих клавиш.
+    Время событий и кадров - секунды часов сессии.
+    """
+
+    def __init__(self, clicks=True, keystrokes=True, offset=(0, 0)):
+        self.clicks = clicks
+        self.keystrokes = keystrokes
+        # Координаты событий заданы относительно экрана, кадр - области записи
+        self.offset = offset
+        self._lock = threading.Lock()
+        self._ripples = []
+        self._tokens = []
+        self._last_key_time = None
+        self._caption = None
+        self._caption_dirty = False
+        self._caption_width = None
+
+    def reset(self):
+        with self._lock:
+            self._ripples = []
+            self._tokens = []
+            self._last_key_time = None
+            self._caption = None
+            self._caption_dirty = False
+
+    def on_event(self, event):
+        """Слушатель событий MetadataCollector (вызывается в потоке обработки)"""
+        event_type = event.get("type")
+        timestamp = event.get("time")
+        if not isinstance(timestamp, (int, float)):
+            return
+        if event_type in CLICK_TYPES:
+            if self.clicks and isinstance(event.get("x"), (int, float)):
+                with self._lock:
+                    self._ripples.append((event["x"] - self.offset[0], event["y"] - self.offset[1],
+                                          timestamp, RIPPLE_COLORS[event_type]))
+                    del self._ripples[:-MAX_RIPPLES]
+        elif self.keystrokes and event_type in ("keyPress", "hotkey"):
+            if event_type == "hotkey":
+                token = ("chip", _printable(str(event.get("hotkey"))))
+            elif event.get("code") in MODIFIER_BITS:
+                # Модификаторы показываются только в составе горячих клавиш
+                return
+            else:
+                key = str(event.get("key") or event.get("code") or "")
+                if len(key) == 1:
+                    # Буквы раскладки US в событиях заглавные (как на клавишах)
+                    token = ("text", _printable(key.lower() if "A" <= key <= "Z" else key))
+                else:
+                    token = ("chip", _printable(key))
+            with self._lock:
+                if self._last_key_time is None or timestamp - self._last_key_time > CAPTION_TIMEOUT:
+                    self._tokens = []
+                self._last_key_time = max(timestamp, self._last_key_time or timestamp)
+                self._tokens.append(token)
+                del self._tokens[:-CAPTION_TOKENS]
+                self._caption_dirty = True
+
+    def apply(self, frame, seconds):
+        """Рисует активные элементы на кадре BGR (на месте)"""
+        with self._lock:
+            if self._ripples:
+                self._ripples = [r for r in self._ripples if seconds - r[2] < RIPPLE_DURATION]
+                ripples = list(self._ripples)
+            else:
+                ripples = ()
+            caption = None
+            if self._last_key_time is not None and seconds - self._last_key_time <= CAPTION_TIMEOUT:
+                if self._caption_dirty or self._caption_width != frame.shape[1]:
+                    self._caption = self._render_caption(frame.shape[1])
+                    self._caption_dirty = False
+                    self._caption_width = frame.shape[1]
+                caption = self._caption
+        for x, y, started, color in ripples:
+            age = seconds - started
+            if age >= 0:
+                self._draw_ripple(frame, int(x), int(y), int(age / RIPPLE_DURATION * RIPPLE_STEPS), color)
+        if caption is not None:
+            self._draw_caption(frame, caption)
+        return frame
+
+    def _draw_ripple(self, frame, x, y, step, color):
+        sprites = ripple_sprites()
+        sprite = sprites[min(step, len(sprites) - 1)]
+        radius = sprite.shape[0] // 2
+        height, width = frame.shape[:2]
+        left, top = x - radius, y - radius
+        x0, y0 = max(left, 0), max(top, 0)
+        x1, y1 = min(left + sprite.shape[1], width), min(top + sprite.shape[0], height)
+        if x0 >= x1 or y0 >= y1:
+            return
+        _blend_mask(frame[y0:y1, x0:x1], sprite[y0 - top:y1 - top, x0 - left:x1 - left], color)
+
+    def _render_caption(self, frame_width):
+        """
+        Собирает изображение строки подписи из кешированных глифов. Старые
+        элементы, не помещающиеся в ширину кадра, отбрасываются.
+        """
+        limit = max(frame_width - 2 * CAPTION_MARGIN - 2 * CAPTION_PADDING, 1)
+        pieces = []
+        total = 0
+        for kind, text in reversed(self._tokens):
+            if kind == "chip":
+                mask = glyph(text)
+                width = mask.shape[1] + 2 * CHIP_PADDING + CHIP_PADDING
+                if total + width > limit:
+                    break
+                pieces.append((kind, mask, width))
+                total += width
+                continue
+            for char in reversed(text):
+                mask = glyph(char)
+                if total + mask.shape[1] > limit:
+                    break
+                pieces.append((kind, mask, mask.shape[1]))
+                total += mask.shape[1]
+            else:
+                continue
+            break
+        pieces.reverse()
+
+        image = np.empty((CAPTION_HEIGHT, total + 2 * CAPTION_PADDING, 3), dtype=np.uint8)
+        image[:] = CAPTION_BACKGROUND
+        x = CAPTION_PADDING
+        for kind, mask, width in pieces:
+            top = max((CAPTION_HEIGHT - mask.shape[0]) // 2, 0)
+            if kind == "chip":
+                cv2.rectangle(image, (x, top - 4), (x + width - CHIP_PADDING - 1, top + mask.shape[0] + 3),
+                              CHIP_BACKGROUND, -1)
+                text_x = x + CHIP_PADDING
+            else:
+                text_x = x
+            region = image[top:top + mask.shape[0], text_x:text_x + mask.shape[1]]
+            weights = (mask[:region.shape[0], :region.shape[1]].astype(np.uint16) * 257) >> 8
+            _blend_mask(region, weights, CAPTION_TEXT)
+            x += width
+        return image
+
+    def _draw_caption(self, frame, caption):
+        height, width = frame.shape[:2]
+        caption_height, caption_width = caption.shape[:2]
+        x0 = max((width - caption_width) // 2, 0)
+        y0 = max(height - CAPTION_MARGIN - caption_height, 0)
+        x1, y1 = min(x0 + caption_width, width), min(y0 + caption_height, height)
+        region = frame[y0:y1, x0:x1]
+        alpha = int(CAPTION_ALPHA * 256)
+        region[:] = (region.astype(np.uint16) * (256 - alpha)
+                     + caption[:y1 - y0, :x1 - x0].astype(np.uint16) * alpha) >> 8
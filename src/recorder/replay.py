@@ -0,0 +1,426 @@
+import time
+import threading
+from pynput import mouse, keyboard
+from src.recorder.hotkey_matcher import MODIFIER_BITS, SYMBOL_LABELS
+from src.recorder.key_translation import KEY_MAP, SPECIAL_KEYS
+from src.recorder.trajectory import decode_path
+
+# Воспроизведение записанных событий через контроллеры pynput.
+#
+# События метаданных раскладываются на элементарные действия (перемещение,
+# нажатие и отпускание кнопки или клавиши, щелчок колесика) со своим временем.
+# Действия выполняются одним потоком по срокам на монотонных часах
+# perf_counter_ns: до срока поток спит (прерываемое ожидание), последние
+# SPIN_THRESHOLD секунд опрашивает часы, так как точность sleep и
+# DeadlineScheduler (Condition.wait) - единицы миллисекунд.
+
+# Время до первого действия после старта, секунды
+LEAD_IN = 0.1
+# Последний отрезок ожидания, который выполняется опросом часов, секунды
+SPIN_THRESHOLD = 0.002
+
+# Длительность нажатия кнопки и клавиши, если она не записана, секунды
+CLICK_HOLD = 0.04
+KEY_HOLD = 0.03
+# Пауза между кликами двойного клика, секунды
+DOUBLE_CLICK_GAP = 0.08
+# Пауза между первыми двумя клавишами ввода текста, секунды
+INPUT_GAP = 0.1
+
+# Окно сопоставления событий воспроизведения с исходными, секунды
+MATCH_TOLERANCE = 0.5
+
+REPLAYED_TYPES = ("mouseMove", "leftClick", "rightClick", "doubleClick", "drag", "scroll",
+                  "keyPress", "keyLongPress", "hotkey", "input")
+# Типы, которые сравниваются с записью воспроизведения (траектории движения
+# упрощаются по-разному и сравниваются только через клики и перетаскивания)
+COMPARED_TYPES = ("leftClick", "rightClick", "doubleClick", "drag", "scroll",
+                  "keyPress", "hotkey", "input")
+
+# Действия
+MOVE = "move"
+BUTTON_DOWN = "buttonDown"
+BUTTON_UP = "buttonUp"
+SCROLL = "scroll"
+KEY_DOWN = "keyDown"
+KEY_UP = "keyUp"
+
+BUTTONS = {"left": mouse.Button.left, "right": mouse.Button.right}
+
+
+def _build_replay_keys():
+    keys = {}
+    for key, code in SPECIAL_KEYS.items():
+        keys.setdefault(code, key)
+    for code, char in SYMBOL_LABELS.items():
+        keys[code] = keyboard.KeyCode.from_char(char)
+    for code, char in KEY_MAP.items():
+        if code not in keys and len(char) == 1 and char != " ":
+            # Буквы в KEY_MAP заглавные; регистр задают Shift и CapsLock
+            keys[code] = keyboard.KeyCode.from_char(char.lower())
+    return keys
+
+
+# code (стандарт DOM) -> клавиша pynput
+REPLAY_KEYS = _build_replay_keys()
+
+
+def _modifier_codes(event):
+    """Модификаторы, удерживаемые при клике, перетаскивании или горячей клавише"""
+    return [code for code in event.get("codes") or () if code in MODIFIER_BITS]
+
+
+class ActionList:
+    """
+    Элементарные действия воспроизведения: (время, порядок, номер события,
+    действие, аргумент). Нажатый модификатор записывается событием keyPress,
+    а следующие клавиши и клики с ним - событиями с ним в codes, поэтому
+    модификатор удерживается, пока его используют, и отпускается перед
+    следующим нажатием обычной клавиши.
+    """
+
+    def __init__(self):
+        self.actions = []
+        # Удерживаемые модификаторы: code -> [время отпускания, номер события нажатия]
+        self.held = {}
+
+    def add(self, seconds, index, action, argument=None):
+        self.actions.append((seconds, len(self.actions), index, action, argument))
+
+    def hold(self, start, end, index, down, up, argument, modifiers=()):
+        """Нажатие с удержанием: модификаторы нажимаются первыми и отпускаются последними"""
+        for code in modifiers:
+            self.add(start, index, KEY_DOWN, code)
+        self.add(start, index, down, argument)
+        self.add(end, index, up, argument)
+        for code in reversed(modifiers):
+            self.add(end, index, KEY_UP, code)
+
+    def press_modifier(self, code, start, end, index):
+        self.release_modifiers(start, (code,))
+        self.add(start, index, KEY_DOWN, code)
+        self.held[code] = [end, index]
+
+    def use_modifiers(self, codes, start, end):
+        """
+        Отпускает к start модификаторы, которых нет в codes, и продлевает
+        удержание остальных до end; возвращает модификаторы, которые нужно
+        нажать вместе с действием
+        """
+        self.release_modifiers(start, [code for code in self.held if code not in codes])
+        free = []
+        for code in codes:
+            if code in self.held:
+                self.held[code][0] = max(self.held[code][0], end)
+            else:
+                free.append(code)
+        return free
+
+    def release_modifiers(self, before=None, codes=None):
+        """Отпускает удерживаемые модификаторы не позже before"""
+        for code in list(self.held if codes is None else codes):
+            if code in self.held:
+                release, index = self.held.pop(code)
+                self.add(release if before is None else min(release, before), index, KEY_UP, code)
+
+    def sorted(self):
+        self.release_modifiers()
+        return sorted(self.actions)
+
+
+def build_actions(events, click_hold=CLICK_HOLD, key_hold=KEY_HOLD):
+    """
+    Раскладывает события на действия. Возвращает (actions, skipped):
+    список действий по времени и количество событий, которые нельзя воспроизвести.
+    """
+    events = sorted(enumerate(events), key=lambda item: item[1].get("time") or 0)
+    # Длительность длительных нажатий по (code, время нажатия)
+    long_presses = {(e.get("code"), e.get("time")): e.get("duration") or 0
+                    for _, e in events if e.get("type") == "keyLongPress"}
+    # Время следующего нажатия той же клавиши: отпускание не должно его перекрыть
+    next_press = {}
+    following = {}
+    for index, event in reversed(events):
+        if event.get("type") == "keyPress":
+            next_press[index] = following.get(event.get("code"))
+            following[event.get("code")] = event.get("time")
+
+    result = ActionList()
+    skipped = 0
+    for index, event in events:
+        event_type = event.get("type")
+        t = event.get("time")
+        if event_type not in REPLAYED_TYPES or not isinstance(t, (int, float)):
+            skipped += 1
+            continue
+        if event_type == "mouseMove":
+            for point_time, x, y in decode_path(event):
+                result.add(point_time, index, MOVE, (x, y))
+        elif event_type in ("leftClick", "rightClick"):
+            button = "right" if event_type == "rightClick" else "left"
+            modifiers = result.use_modifiers(_modifier_codes(event), t, t + click_hold)
+            result.add(t, index, MOVE, (event["x"], event["y"]))
+            result.hold(t, t + click_hold, index, BUTTON_DOWN, BUTTON_UP, button, modifiers)
+        elif event_type == "doubleClick":
+            # Время двойного клика - отпускание второго клика
+            first = t - 2 * click_hold - DOUBLE_CLICK_GAP
+            modifiers = result.use_modifiers(_modifier_codes(event), first, t)
+            result.add(first, index, MOVE, (event["x"], event["y"]))
+            result.hold(first, first + click_hold, index, BUTTON_DOWN, BUTTON_UP, "left")
+            result.hold(t - click_hold, t, index, BUTTON_DOWN, BUTTON_UP, "left", modifiers)
+        elif event_type in ("drag", "scroll"):
+            start, end = event["start"], event["end"]
+            end_time = end["time"] if event_type == "drag" else t + (event.get("duration") or 0)
+            modifiers = result.use_modifiers(_modifier_codes(event), t, end_time)
+            for code in modifiers:
+                result.add(t, index, KEY_DOWN, code)
+            result.add(t, index, MOVE, (start["x"], start["y"]))
+            if event_type == "drag":
+                result.add(t, index, BUTTON_DOWN, "left")
+                if event.get("path"):
+                    for point_time, x, y in decode_path(event)[1:]:
+                        result.add(point_time, index, MOVE, (x, y))
+                result.add(end_time, index, MOVE, (end["x"], end["y"]))
+                result.add(end_time, index, BUTTON_UP, "left")
+            else:
+                steps = max(abs(event.get("scrollAmount") or 0), 1)
+                step = 1 if event.get("direction") == "up" else -1
+                for i in range(steps):
+                    tick = t + ((end_time - t) * i / (steps - 1) if steps > 1 else 0)
+                    if i == steps - 1 and (end["x"], end["y"]) != (start["x"], start["y"]):
+                        result.add(tick, index, MOVE, (end["x"], end["y"]))
+                    result.add(tick, index, SCROLL, step)
+            for code in reversed(modifiers):
+                result.add(end_time, index, KEY_UP, code)
+        elif event_type == "keyPress":
+            code = event.get("code")
+            if code not in REPLAY_KEYS:
+                skipped += 1
+                continue
+            release = t + max(key_hold, long_presses.get((code, t), 0))
+            if code in MODIFIER_BITS:
+                result.press_modifier(code, t, release, index)
+                continue
+            # Обычная клавиша без горячей клавиши - модификаторы уже отпущены
+            result.release_modifiers(t)
+            if next_press.get(index) is not None:
+                release = min(release, (t + next_press[index]) / 2)
+            result.hold(t, release, index, KEY_DOWN, KEY_UP, code)
+        elif event_type == "hotkey":
+            codes = [code for code in event.get("codes") or () if code in REPLAY_KEYS]
+            keys = [code for code in codes if code not in MODIFIER_BITS]
+            if not keys:
+                skipped += 1
+                continue
+            modifiers = result.use_modifiers([code for code in codes if code in MODIFIER_BITS],
+                                             t, t + key_hold)
+            # Набор нажатых клавиш не упорядочен: модификаторы нажимаются первыми
+            result.hold(t, t + key_hold, index, KEY_DOWN, KEY_UP, keys[-1], modifiers + keys[:-1])
+        elif event_type == "input":
+            # Клавиши ввода, начиная с третьей, записаны и отдельными событиями
+            # keyPress/hotkey; событиями остаются только первые две
+            codes = event.get("codes") or []
+            length = max(event.get("length") or len(codes), 2)
+            gap = min(INPUT_GAP, (event.get("duration") or 0) / (length - 1) or INPUT_GAP)
+            result.release_modifiers(t)
+            for i, code in enumerate(codes[:2]):
+                if code in REPLAY_KEYS:
+                    start = t + i * gap
+                    result.hold(start, start + min(key_hold, gap / 2), index, KEY_DOWN, KEY_UP, code)
+        # keyLongPress учтен в длительности нажатия своего keyPress
+    return result.sorted(), skipped
+
+
+def timing_stats(values_ms):
+    """Средняя ошибка (со знаком), медиана, 95-й процентиль и максимум ее модуля, мс"""
+    if not values_ms:
+        return {"count": 0, "meanMs": None, "p50Ms": None, "p95Ms": None, "maxMs": None}
+    ordered = sorted(abs(value) for value in values_ms)
+    return {
+        "count": len(ordered),
+        "meanMs": round(sum(values_ms) / len(values_ms), 3),
+        "p50Ms": round(ordered[len(ordered) // 2], 3),
+        "p95Ms": round(ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)], 3),
+        "maxMs": round(ordered[-1], 3),
+    }
+
+
+class ReplayEngine:
+    """
+    Воспроизводит события метаданных со скоростью speed (2 - вдвое быстрее).
+    offset - сдвиг координат (dx, dy), если экран воспроизведения отличается.
+    Контроллеры можно передать явно (по умолчанию - контроллеры pynput).
+    """
+
+    def __init__(self, speed=1.0, offset=(0, 0), spin=SPIN_THRESHOLD, lead_in=LEAD_IN,
+                 mouse_controller=None, keyboard_controller=None):
+        if speed <= 0:
+            raise ValueError(f"Скорость воспроизведения должна быть больше 0: {speed}")
+        self.speed = speed
+        self.offset = offset
+        self.spin_ns = int(spin * 1e9)
+        self.lead_in_ns = int(lead_in * 1e9)
+        self.mouse = mouse_controller
+        self.keyboard = keyboard_controller
+        self._stop = threading.Event()
+        self._held_buttons = set()
+        self._held_keys = set()
+
+    def stop(self):
+        """Прерывает воспроизведение (из другого потока)"""
+        self._stop.set()
+
+    def _wait_until(self, deadline_ns):
+        """Ждет срока; возвращает False, если воспроизведение прервано"""
+        while True:
+            remaining = deadline_ns - time.perf_counter_ns()
+            if remaining <= 0:
+                return True
+            if remaining > self.spin_ns:
+                if self._stop.wait((remaining - self.spin_ns) / 1e9):
+                    return False
+            elif self._stop.is_set():
+                return False
+
+    def _perform(self, action, argument):
+        if action == MOVE:
+            self.mouse.position = (argument[0] + self.offset[0], argument[1] + self.offset[1])
+        elif action == BUTTON_DOWN:
+            self.mouse.press(BUTTONS[argument])
+            self._held_buttons.add(argument)
+        elif action == BUTTON_UP:
+            self.mouse.release(BUTTONS[argument])
+            self._held_buttons.discard(argument)
+        elif action == SCROLL:
+            self.mouse.scroll(0, argument)
+        elif action == KEY_DOWN:
+            self.keyboard.press(REPLAY_KEYS[argument])
+            self._held_keys.add(argument)
+        elif action == KEY_UP:
+            self.keyboard.release(REPLAY_KEYS[argument])
+            self._held_keys.discard(argument)
+
+    def _release_all(self):
+        """Отпускает кнопки и клавиши, оставшиеся нажатыми после прерывания"""
+        for button in list(self._held_buttons):
+            self._perform(BUTTON_UP, button)
+        for code in list(self._held_keys):
+            self._perform(KEY_UP, code)
+
+    def play(self, events, clock=None):
+        """
+        Воспроизводит события (блокирует до окончания). clock - SessionClock
+        записи, идущей одновременно с воспроизведением: в отчет попадает время
+        сессии, в которое воспроизводится первое событие (sessionStart).
+        Возвращает отчет с ошибками времени выполнения действий.
+        """
+        if self.mouse is None:
+            self.mouse = mouse.Controller()
+        if self.keyboard is None:
+            self.keyboard = keyboard.Controller()
+        actions, skipped = build_actions(events)
+        self._stop.clear()
+        report = {"events": len(events), "actions": len(actions), "skipped": skipped,
+                  "speed": self.speed, "completed": True, "sessionStart": None}
+        if not actions:
+            report["timing"] = timing_stats([])
+            report["perEvent"] = []
+            return report
+
+        origin = actions[0][0]
+        start_ns = time.perf_counter_ns() + self.lead_in_ns
+        if clock is not None:
+            report["sessionStart"] = round((clock.elapsed_ns() + self.lead_in_ns) / 1e9, 4)
+        # Ошибка времени события - опоздание его первого действия
+        first_errors = {}
+        action_errors = []
+        try:
+            for seconds, _, index, action, argument in actions:
+                deadline = start_ns + int((seconds - origin) / self.speed * 1e9)
+                if not self._wait_until(deadline):
+                    report["completed"] = False
+                    break
+                error_ms = (time.perf_counter_ns() - deadline) / 1e6
+                self._perform(action, argument)
+                action_errors.append(error_ms)
+                first_errors.setdefault(index, error_ms)
+        finally:
+            self._release_all()
+
+        report["duration"] = round((time.perf_counter_ns() - start_ns) / 1e9, 3)
+        report["timing"] = timing_stats(action_errors)
+        report["eventTiming"] = timing_stats(list(first_errors.values()))
+        report["perEvent"] = [{"id": events[index].get("id"), "type": events[index].get("type"),
+                               "time": events[index].get("time"), "errorMs": round(error, 3)}
+                              for index, error in first_errors.items()]
+        return report
+
+
+def _match_key(event):
+    event_type = event.get("type")
+    if event_type == "keyPress":
+        return event_type, event.get("code")
+    if event_type == "hotkey":
+        return event_type, event.get("hotkey")
+    return event_type, None
+
+
+def compare_events(expected, actual, session_start=0.0, speed=1.0, tolerance=MATCH_TOLERANCE):
+    """
+    Сравнивает исходные события с записанными при воспроизведении. Время
+    исходных событий переводится на шкалу записи: session_start + (t - t0) / speed.
+    События одного вида (тип, а для клавиш - code или горячая клавиша)
+    сопоставляются по порядку в окне tolerance секунд.
+    """
+    def _times(event):
+        return event.get("time") if isinstance(event.get("time"), (int, float)) else None
+
+    expected = [e for e in expected if e.get("type") in COMPARED_TYPES and _times(e) is not None]
+    actual = [e for e in actual if e.get("type") in COMPARED_TYPES and _times(e) is not None]
+    origin = min((e["time"] for e in expected), default=0.0)
+
+    groups = {}
+    for event in sorted(expected, key=_times):
+        groups.setdefault(_match_key(event), ([], []))[0].append(event)
+    for event in sorted(actual, key=_times):
+        groups.setdefault(_match_key(event), ([], []))[1].append(event)
+
+    types = {}
+    time_errors = []
+    position_error = 0
+    mismatched_inputs = []
+    for (event_type, _), (wanted, got) in groups.items():
+        counts = types.setdefault(event_type, {"expected": 0, "actual": 0, "matched": 0})
+        counts["expected"] += len(wanted)
+        counts["actual"] += len(got)
+        position = 0
+        for event in wanted:
+            target = session_start + (event["time"] - origin) / speed
+            # Пропускаем записанные события, которые раньше окна
+            while position < len(got) and got[position]["time"] < target - tolerance:
+                position += 1
+            if position == len(got) or got[position]["time"] > target + tolerance:
+                continue
+            match = got[position]
+            position += 1
+            counts["matched"] += 1
+            time_errors.append((match["time"] - target) * 1000)
+            if isinstance(event.get("x"), (int, float)) and isinstance(match.get("x"), (int, float)):
+                position_error = max(position_error, abs(match["x"] - event["x"]),
+                                     abs(match["y"] - event["y"]))
+            if event_type == "input" and match.get("value") != event.get("value"):
+                mismatched_inputs.append({"id": event.get("id"), "expected": event.get("value"),
+                                          "actual": match.get("value")})
+
+    matched = sum(c["matched"] for c in types.values())
+    return {
+        "match": (not mismatched_inputs and
+                  all(c["matched"] == c["expected"] == c["actual"] for c in types.values())),
+        "expected": len(expected),
+        "actual": len(actual),
+        "matched": matched,
+        "types": types,
+        "timeError": timing_stats(time_errors),
+        "positionError": position_error,
+        "inputMismatches": mismatched_inputs,
+    }
@@ -1,62 +1,243 @@
 import os
 import time
+import shutil
+import uuid
 import cv2
 import numpy as np
 import pyautogui
 import threading
 from datetime import datetime
 from src.recorder.metadata_collector import MetadataCollector
+from src.recorder.session_clock import SessionClock
+from src.recorder.overlay import EventOverlay
+from src.recorder.idle_detector import MODE_PAUSE, TRICKLE_FPS, IdleDetector
+from src.recorder.event_stream import BUFFER_FRAMES, DROP_OLDEST, EventPublisher
+from src.recorder.event_pipeline import EventPipeline, TextRedactor, load_processor
+from src.recorder.display_capture import ActiveWindow
+
+# Как часто в простое проверяется ввод, секунды
+IDLE_POLL = 0.01
 
 class ScreenRecorder:
-    def __init__(self, config):
+    def __init__(self, config, capture=None):
         self.config = config
+        # Внешний источник кадров (например, XDisplayCapture для другого дисплея).
+        # Если не задан, используется pyautogui
+        self.capture = capture
         self.recording = False
         self.paused = False
         self.is_paused = False
         self.thread = None
+        # Общие часы сессии: время кадров и событий отсчитывается от одного
+        # начала и с одним учетом пауз
+        self.clock = SessionClock()
         self.metadata_collector = MetadataCollector()
+        self.metadata_collector.set_clock(self.clock)
+        # FPS метаданных всегда равен FPS кодировщика видео
+        self.metadata_collector.auto_detect_fps = False
+        self.metadata_collector.set_hotkeys(config.settings.get("recognized_hotkeys"),
+                                            config.settings.get("application_hotkeys"))
+        self.active_window = None
+        if config.settings.get("application_hotkeys"):
+            self._setup_active_window()
+        self.metadata_collector.set_keyboard_layout(config.settings.get("keyboard_layout"))
+        self.metadata_collector.set_trajectory_options(config.settings.get("mouse_trajectory", True),
+                                                       config.settings.get("trajectory_tolerance", 2.0))
+        self.metadata_collector.set_wal_options(config.settings.get("wal_commit_interval", 0.2),
+                                                config.settings.get("wal_commit_batch", 256),
+                                                config.settings.get("wal_fsync", True))
+        self.metadata_collector.set_compression(config.settings.get("metadata_compression"),
+                                                config.settings.get("compression_level"))
         self.output_file = None
-        self.start_time = None
-        self.pause_time = None
-        self.total_pause_time = 0
+        self.metadata_file = None
+        self.frames_written = 0
+        # Итоги синхронизации видео с часами сессии (заполняются при остановке)
+        self.timing = None
+        self.writer = None
+        self.writer_file = None
+        self.region = None
+        self.frame_size = None
+        # Наложение кликов и нажатых клавиш на кадры (show_clicks, show_keystrokes)
+        self.overlay = None
+        # Автопауза при простое (idle_timeout); переходы в простой и обратно
+        # выполняются под блокировкой, так как пауза пользователя приходит из другого потока
+        self.idle_detector = None
+        self._idle_lock = threading.Lock()
+        # Живой поток событий через локальный сокет (event_stream)
+        self.event_publisher = None
+        # Конвейер обработчиков событий (event_processors)
+        self.event_pipeline = None
         
-    def start_recording(self):
-        if self.recording:
+        # Режим ожидания: writer, бэкенд захвата, слушатели ввода и поток записи
+        # подготовлены заранее, запись начинается без задержки
+        self.prepared = False
+        # Параметры writer режима ожидания (fps, формат, кодек, область)
+        self.prepared_params = None
+        self._start_event = None
+        self._record_requested = None
+        self.time_to_first_frame = None
+        
+    def prepare(self):
+        """Переводит рекордер в режим ожидания, заранее инициализируя запись"""
+        if self.recording or self.prepared:
             return
             
-        # Создаем имя файла на основе текущей даты и времени
-        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        video_format = self.config.settings["video_format"]
-        filename = f"screencaster_{timestamp}.{video_format}"
-        
-        # Полный путь к файлу
         save_path = self.config.settings["save_path"]
         if not os.path.exists(save_path):
             os.makedirs(save_path)
             
-        self.output_file = os.path.join(save_path, filename)
+        # Writer открывается на временный файл, который при остановке
+        # переименовывается в итоговый
+        video_format = self.config.settings["video_format"]
+        standby_file = os.path.join(save_path, f".screencaster_standby_{uuid.uuid4().hex[:8]}.{video_format}")
+        self._open_writer(standby_file)
+        self.prepared_params = self._writer_params()
         
-        # Метаданные будут сохраняться в файл с тем же именем, но с расширением .json
-        metadata_file = os.path.join(save_path, f"screencaster_{timestamp}.json")
+        # Прогрев бэкенда захвата: первый снимок экрана заметно медленнее последующих
+        self.grab_frame()
         
-        # Инициализация сборщика метаданных
-        self.metadata_collector.start_collection(metadata_file)
+        self._run_collector(self.metadata_collector.prepare)
         
-        # Запуск записи в отдельном потоке
-        self.recording = True
-        self.is_paused = False
-        self.start_time = time.time()
-        self.total_pause_time = 0
+        # Поток записи запускается сразу и ждет сигнала старта
+        self._start_event = threading.Event()
         self.thread = threading.Thread(target=self._record_screen)
         self.thread.daemon = True
         self.thread.start()
+        self.prepared = True
+        
+    def release(self):
+        """Выходит из режима ожидания и освобождает подготовленные ресурсы"""
+        if not self.prepared or self.recording:
+            return
+            
+        self.prepared = False
+        self.prepared_params = None
+        self._start_event.set()
+        self.thread.join()
+        self.thread = None
+        self._start_event = None
+        
+        standby_file = self.writer_file
+        self._close_writer()
+        if standby_file and os.path.exists(standby_file):
+            os.remove(standby_file)
+        self.metadata_collector.release()
+        
+    def close(self):
+        """Останавливает запись и освобождает ресурсы рекордера, включая соединение с X-сервером"""
+        if self.recording:
+            self.stop_recording()
+        self.release()
+        if self.active_window is not None:
+            self.metadata_collector.set_application_provider(None)
+            self.active_window.close()
+            self.active_window = None
+        
+    def refresh_standby(self):
+        """Подготавливает режим ожидания заново после изменения настроек записи"""
+        if not self.prepared:
+            return
+        self.release()
+        self.prepare()
+        
+    def _writer_params(self, output_file=None):
+        """Настройки, с которыми открывается writer: fps, формат файла, кодек и область"""
+        settings = self.config.settings
+        video_format = settings["video_format"]
+        if output_file:
+            video_format = os.path.splitext(output_file)[1].lstrip(".") or video_format
+        region = settings.get("region")
+        return (settings["fps"], video_format, settings.get("codec"),
+                tuple(int(v) for v in region) if region else None)
+        
+    def _run_collector(self, action, *args):
+        """Выполняет действие сборщика метаданных на нужном дисплее"""
+        if self.capture:
+            self.capture.run_on_display(self.metadata_collector, action, *args)
+        else:
+            action(*args)
+        
+    def start_recording(self, output_file=None, threaded=True):
+        if self.recording:
+            return
+            
+        self._record_requested = time.perf_counter()
+        self.time_to_first_frame = None
+        
+        # Writer режима ожидания открыт с прежними fps, форматом или областью:
+        # запись начинается без подготовки, с текущими настройками
+        if self.prepared and self.prepared_params != self._writer_params(output_file):
+            self.release()
+            
+        if output_file:
+            # Явно заданный путь (например, из командной строки)
+            save_path = os.path.dirname(os.path.abspath(output_file))
+            if not os.path.exists(save_path):
+                os.makedirs(save_path)
+            self.output_file = output_file
+            metadata_file = os.path.splitext(output_file)[0] + ".json"
+        else:
+            # Создаем имя файла на основе текущей даты и времени
+            timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+            video_format = self.config.settings["video_format"]
+            filename = f"screencaster_{timestamp}.{video_format}"
+            
+            # Полный путь к файлу
+            save_path = self.config.settings["save_path"]
+            if not os.path.exists(save_path):
+                os.makedirs(save_path)
+                
+            self.output_file = os.path.join(save_path, filename)
+            
+            # Метаданные будут сохраняться в файл с тем же именем, но с расширением .json
+            metadata_file = os.path.join(save_path, f"screencaster_{timestamp}.json")
+        self.metadata_file = metadata_file
+        
+        # Часы запускаются до сборщика, чтобы первые события имели верное время
+        fps = self.config.settings["fps"]
+        self.metadata_collector.set_fps(fps)
+        # Область записи сохраняется в метаданных для тепловых карт и автозума
+        self.metadata_collector.set_recording_region(self.config.settings.get("region"))
+        self.clock.start(fps)
+        self.timing = None
+        
+        # Конвейер запускает сборщик вместе с потоком обработки событий
+        self._setup_event_pipeline()
+        
+        # Инициализация сборщика метаданных
+        self._run_collector(self.metadata_collector.start_collection, metadata_file)
+        # При сжатии имя файла метаданных получает расширение .gz или .zst
+        self.metadata_file = self.metadata_collector.get_metadata_file()
+        
+        if not self.prepared:
+            self._open_writer(self.output_file)
+        self._attach_overlay()
+        self._setup_idle_detector()
+        self._start_event_stream()
+        
+        self.recording = True
+        self.is_paused = False
+        self.frames_written = 0
+        
+        if self.prepared:
+            # Поток записи уже запущен и ждет сигнала
+            self.prepared = False
+            self._start_event.set()
+        # Запуск записи в отдельном потоке. При threaded=False кадры
+        # захватываются и записываются внешним планировщиком через
+        # grab_frame() и write_frame()
+        elif threaded:
+            self.thread = threading.Thread(target=self._record_screen)
+            self.thread.daemon = True
+            self.thread.start()
         
     def pause_recording(self):
         if not self.recording or self.is_paused:
             return
             
+        self._end_idle("pause")
         self.is_paused = True
-        self.pause_time = time.time()
+        self.clock.pause()
         self.metadata_collector.pause_collection()
         
     def resume_recording(self):
@@ -64,9 +245,12 @@ class ScreenRecorder:
             return
             
         self.is_paused = False
-        # Учитываем время паузы
-        self.total_pause_time += time.time() - self.pause_time
+        # Часы сессии исключают время паузы
+        self.clock.resume()
         self.metadata_collector.resume_collection()
+        if self.idle_detector is not None:
+            # Время паузы пользователя не считается простоем
+            self.idle_detector.observe_input(time.perf_counter_ns())
         
     def stop_recording(self):
         if not self.recording:
@@ -75,63 +259,278 @@ class ScreenRecorder:
         self.recording = False
         if self.thread:
             self.thread.join()
+            self.thread = None
+        self._end_idle("stop")
+        
+        # Останавливаем часы: завершающие события получают время последнего кадра
+        self.clock.pause()
             
+        self._close_writer(self.output_file)
         self.metadata_collector.stop_collection()
+        self._detach_overlay()
+        self._stop_event_stream()
+        # Расхождение длительности видео и времени записи - в timing (driftExceeded)
+        self.timing = self.metadata_collector.timing
         
-    def _record_screen(self):
-        # Получаем настройки записи
+        return self.output_file, self.metadata_file
+        
+    def _open_writer(self, path):
+        """Определяет область записи и открывает writer для видео"""
         fps = self.config.settings["fps"]
-        show_cursor = self.config.settings["show_cursor"]
         
-        # Получаем разрешение экрана
-        screen_width, screen_height = pyautogui.size()
+        # Область записи (x, y, ширина, высота) или весь экран
+        region = self.config.settings.get("region")
+        if region:
+            self.region = tuple(int(v) for v in region)
+            self.frame_size = (self.region[2], self.region[3])
+        else:
+            self.region = None
+            if self.capture:
+                self.frame_size = self.capture.size()
+            else:
+                self.frame_size = tuple(pyautogui.size())
         
         # Настраиваем кодек и writer для видео
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v') if self.config.settings["video_format"] == "mp4" else cv2.VideoWriter_fourcc(*'XVID')
-        out = cv2.VideoWriter(self.output_file, fourcc, fps, (screen_width, screen_height))
+        codec = self.config.settings.get("codec")
+        if codec:
+            fourcc = cv2.VideoWriter_fourcc(*codec[:4].ljust(4))
+        else:
+            # Кодек по расширению файла: явно заданный путь может отличаться от video_format
+            video_format = os.path.splitext(path)[1].lstrip(".") or self.config.settings["video_format"]
+            fourcc = cv2.VideoWriter_fourcc(*'mp4v') if video_format == "mp4" else cv2.VideoWriter_fourcc(*'XVID')
+        self.writer = cv2.VideoWriter(path, fourcc, fps, self.frame_size)
+        self.writer_file = path
+        
+    def _attach_overlay(self):
+        """Подписывает наложение на события сборщика, если оно включено в настройках"""
+        self._detach_overlay()
+        clicks = self.config.settings.get("show_clicks", False)
+        keystrokes = self.config.settings.get("show_keystrokes", False)
+        if not clicks and not keystrokes:
+            return
+        offset = self.region[:2] if self.region else (0, 0)
+        self.overlay = EventOverlay(clicks, keystrokes, offset)
+        self.metadata_collector.add_event_listener(self.overlay.on_event)
         
-        # Расчет задержки между кадрами
-        frame_delay = 1.0 / fps
+    def _detach_overlay(self):
+        if self.overlay is None:
+            return
+        self.metadata_collector.remove_event_listener(self.overlay.on_event)
+        self.overlay = None
         
+    def _start_event_stream(self):
+        """Открывает живой поток событий, если в настройках задан адрес event_stream"""
+        self.event_publisher = None
+        address = self.config.settings.get("event_stream")
+        if not address:
+            return
         try:
-            last_frame_time = time.time()
+            publisher = EventPublisher(address, self.config.settings.get("event_stream_buffer", BUFFER_FRAMES),
+                                       self.config.settings.get("event_stream_policy", DROP_OLDEST))
+            publisher.start()
+        except (OSError, ValueError) as e:
+            print(f"Не удалось открыть поток событий {address}: {e}")
+            return
+        publisher.attach(self.metadata_collector)
+        self.event_publisher = publisher
+        
+    def _stop_event_stream(self):
+        """Закрывает поток событий; итоги остаются в event_publisher.stats()"""
+        if self.event_publisher is not None:
+            self.event_publisher.stop()
+        
+    def _setup_active_window(self):
+        """Подключает определение активного приложения для наборов горячих клавиш приложений"""
+        display_name = getattr(self.capture, "display_name", None)
+        try:
+            self.active_window = ActiveWindow(display_name)
+        except Exception as e:
+            # Нет python-xlib или X-сервера (Windows, macOS, Wayland без XWayland)
+            print(f"Наборы горячих клавиш приложений недоступны: {e}")
+            return
+        self.metadata_collector.set_application_provider(self.active_window)
+        
+    def _setup_event_pipeline(self):
+        """Создает конвейер обработчиков событий из настройки event_processors"""
+        self.event_pipeline = None
+        specs = self.config.settings.get("event_processors") or []
+        pipeline = EventPipeline() if specs else None
+        for spec in specs:
+            try:
+                processor, options = load_processor(spec)
+            except Exception as e:
+                print(f"Не удалось загрузить обработчик событий {spec}: {e}")
+                continue
+            pipeline.add_stage(processor, **options)
+        if pipeline is not None and pipeline.stages:
+            self.event_pipeline = pipeline
+        self.metadata_collector.set_pipeline(self.event_pipeline)
+        # Этапы конвейера не меняют записываемые события: текст скрывается в сборщике
+        self.metadata_collector.set_redactor(TextRedactor() if self.config.settings.get("redact_text") else None)
+        
+    def _setup_idle_detector(self):
+        """Создает детектор простоя, если в настройках задан idle_timeout"""
+        self.idle_detector = None
+        timeout = self.config.settings.get("idle_timeout")
+        if not timeout:
+            return
+        try:
+            self.idle_detector = IdleDetector(timeout, self.config.settings.get("idle_mode", MODE_PAUSE),
+                                              self.config.settings.get("idle_trickle_fps", TRICKLE_FPS))
+        except ValueError as e:
+            print(f"Автопауза при простое отключена: {e}")
+        
+    def _check_idle(self, frame):
+        """Учитывает записанный кадр и ввод; при простое дольше таймаута начинает простой"""
+        idle = self.idle_detector
+        idle.observe_frame(frame)
+        idle.observe_input(self.metadata_collector.last_input_ns)
+        if not idle.expired():
+            return
+        with self._idle_lock:
+            if self.is_paused or not self.recording or idle.idle:
+                return
+            idle.begin(self.clock.timestamp())
+            if idle.mode == MODE_PAUSE:
+                # Время простоя исключается из видео и из шкалы метаданных
+                self.clock.pause()
+        
+    def _idle_step(self, frame_delay):
+        """
+        Шаг потока записи в простое: первый ввод завершает простой сразу,
+        а кадры захватываются с частотой idle_trickle_fps для сравнения
+        (и в режиме trickle записываются с повторами, чтобы видео не отставало)
+        """
+        idle = self.idle_detector
+        if idle.input_since_idle(self.metadata_collector.last_input_ns):
+            self._end_idle("input")
+            return
+        if not idle.grab_due():
+            return
+        idle.last_grab_ns = time.perf_counter_ns()
+        if idle.mode == MODE_PAUSE:
+            changed = idle.frame_changed(self.grab_frame())
+        else:
+            clock = self.clock
+            captured_ns = clock.elapsed_ns()
+            frame = self.grab_frame(captured_ns)
+            changed = idle.frame_changed(frame)
+            repeat = int(captured_ns / frame_delay) + 1 - clock.frame_count()
+            for _ in range(max(repeat, 1)):
+                self.write_frame(frame, captured_ns)
+        if changed:
+            self._end_idle("screen")
+        
+    def _end_idle(self, reason):
+        """Завершает простой и сохраняет его событием idle в метаданных"""
+        with self._idle_lock:
+            idle = self.idle_detector
+            if idle is None or not idle.idle:
+                return
+            if idle.mode == MODE_PAUSE:
+                self.clock.resume()
+            span = idle.end(self.clock.timestamp(), reason)
+        self.metadata_collector.add_custom_event("idle", span)
+        
+    def _close_writer(self, final_path=None):
+        """Закрывает writer для видео"""
+        if self.writer is None:
+            return
+        self.writer.release()
+        self.writer = None
+        
+        # Запись из режима ожидания велась во временный файл
+        if final_path and self.writer_file != final_path and os.path.exists(self.writer_file):
+            shutil.move(self.writer_file, final_path)
+        self.writer_file = None
+        
+        # Если запись была остановлена до завершения, конвертируем в нужный формат
+        if final_path and self.config.settings["video_format"] == "mov" and os.path.exists(final_path):
+            # Для конвертации в .mov можно использовать ffmpeg
+            # Это потребует дополнительной реализации
+            pass
+        
+    def grab_frame(self, captured_ns=None):
+        """
+        Захватывает один кадр в формате BGR. captured_ns - время захвата
+        по часам сессии для наложения событий (по умолчанию текущее).
+        """
+        if self.capture:
+            frame = self.capture.grab(self.region)
+            cursor_x, cursor_y = self.capture.cursor_position()
+        else:
+            # Захват скриншота
+            screenshot = pyautogui.screenshot(region=self.region)
+            frame = np.array(screenshot)
             
-            while self.recording:
-                if not self.is_paused:
-                    current_time = time.time()
-                    
-                    # Проверяем, прошло ли достаточно времени для следующего кадра
-                    if current_time - last_frame_time >= frame_delay:
-                        # Захват скриншота
-                        screenshot = pyautogui.screenshot()
-                        frame = np.array(screenshot)
-                        
-                        # Конвертируем из RGB в BGR (OpenCV использует BGR)
-                        frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-                        
-                        # Если нужно показать курсор, добавляем его на кадр
-                        if show_cursor:
-                            cursor_x, cursor_y = pyautogui.position()
-                            cv2.circle(frame, (cursor_x, cursor_y), 5, (0, 0, 255), -1)
-                        
-                        # Записываем кадр
-                        out.write(frame)
-                        
-                        # Обновляем время последнего кадра
-                        last_frame_time = current_time
+            # Конвертируем из RGB в BGR (OpenCV использует BGR)
+            frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+            cursor_x, cursor_y = None, None
+        
+        # Клики и нажатые клавиши рисуются под курсором
+        overlay = self.overlay
+        if overlay is not None:
+            if captured_ns is None:
+                captured_ns = self.clock.elapsed_ns()
+            overlay.apply(frame, captured_ns / 1e9)
+        
+        # Если нужно показать курсор, добавляем его на кадр
+        if self.config.settings["show_cursor"]:
+            if cursor_x is None:
+                cursor_x, cursor_y = pyautogui.position()
+            if self.region:
+                cursor_x -= self.region[0]
+                cursor_y -= self.region[1]
+            cv2.circle(frame, (cursor_x, cursor_y), 5, (0, 0, 255), -1)
+            
+        return frame
+        
+    def write_frame(self, frame, captured_ns=None):
+        """
+        Записывает кадр в видеофайл и отмечает его в журнале кадров часов сессии.
+        captured_ns - время захвата кадра по часам сессии (по умолчанию текущее).
+        """
+        self.writer.write(frame)
+        self.clock.mark_frame(captured_ns)
+        self.frames_written += 1
+        if self.time_to_first_frame is None and self._record_requested is not None:
+            self.time_to_first_frame = time.perf_counter() - self._record_requested
+        
+    def _record_screen(self):
+        # В режиме ожидания поток ждет сигнала старта
+        if self._start_event is not None:
+            self._start_event.wait()
+            if not self.recording:
+                return
+        
+        # Расчет задержки между кадрами в наносекундах часов сессии
+        frame_delay = 1e9 / self.config.settings["fps"]
+        clock = self.clock
+        
+        while self.recording:
+            if not self.is_paused:
+                if self.idle_detector is not None and self.idle_detector.idle:
+                    self._idle_step(frame_delay)
+                    time.sleep(IDLE_POLL)
+                    continue
+                
+                # Кадр с номером n должен быть захвачен к моменту n / fps по часам
+                # сессии; первый кадр захватывается сразу после старта
+                if clock.elapsed_ns() >= clock.frame_count() * frame_delay:
+                    captured_ns = clock.elapsed_ns()
+                    frame = self.grab_frame(captured_ns)
                     
-                    # Небольшая задержка, чтобы не нагружать CPU
-                    time.sleep(0.001)
-                else:
-                    # Если запись на паузе, просто ждем
-                    time.sleep(0.1)
+                    # Если захват отстал больше чем на кадр, повторяем кадр,
+                    # чтобы видео не становилось короче реального времени
+                    repeat = int(captured_ns / frame_delay) + 1 - clock.frame_count()
+                    for _ in range(max(repeat, 1)):
+                        self.write_frame(frame, captured_ns)
                     
-        finally:
-            # Закрываем writer
-            out.release()
-            
-            # Если запись была остановлена до завершения, конвертируем в нужный формат
-            if self.config.settings["video_format"] == "mov" and os.path.exists(self.output_file):
-                # Для конвертации в .mov можно использовать ffmpeg
-                # Это потребует дополнительной реализации
-                pass
\ No newline at end of file
+                    if self.idle_detector is not None:
+                        self._check_idle(frame)
+                
+                # Небольшая задержка, чтобы не нагружать CPU
+                time.sleep(0.001)
+            else:
+                # Если запись на паузе, просто ждем
+                time.sleep(0.1)
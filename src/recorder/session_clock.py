@@ -0,0 +1,134 @@
+import time
+import threading
+from array import array
+from bisect import bisect_right
+
+
+class SessionClock:
+    """
+    Единые монотонные часы сессии записи на основе perf_counter_ns.
+    Общие для ScreenRecorder и MetadataCollector: время событий и кадров
+    отсчитывается от одного начала и с одним учетом пауз, поэтому события
+    не расходятся с видео на длинных записях.
+
+    Кроме времени часы ведут журнал кадров: время захвата каждого записанного
+    кадра (нс от начала сессии без пауз). По нему событие получает точный номер
+    кадра, а при остановке вычисляется расхождение длительности видео
+    (кадры / FPS) с реальным временем записи.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.fps = None
+        self.start_ns = None
+        self.pause_started_ns = None
+        self.paused_ns = 0
+        # Время захвата записанных кадров, нс от начала сессии
+        self.frame_times = array('q')
+
+    def start(self, fps=None):
+        """Начинает новую сессию с нулевым временем и пустым журналом кадров"""
+        with self._lock:
+            self.fps = fps
+            self.start_ns = time.perf_counter_ns()
+            self.pause_started_ns = None
+            self.paused_ns = 0
+            self.frame_times = array('q')
+
+    @property
+    def running(self):
+        return self.start_ns is not None
+
+    @property
+    def paused(self):
+        return self.pause_started_ns is not None
+
+    def pause(self):
+        """Останавливает отсчет времени сессии"""
+        with self._lock:
+            if self.start_ns is not None and self.pause_started_ns is None:
+                self.pause_started_ns = time.perf_counter_ns()
+
+    def resume(self):
+        """Продолжает отсчет времени, исключая длительность паузы"""
+        with self._lock:
+            if self.pause_started_ns is not None:
+                self.paused_ns += time.perf_counter_ns() - self.pause_started_ns
+                self.pause_started_ns = None
+
+    def elapsed_ns(self):
+        """Время сессии без пауз в наносекундах"""
+        start_ns = self.start_ns
+        if start_ns is None:
+            return 0
+        now = self.pause_started_ns
+        if now is None:
+            now = time.perf_counter_ns()
+        return now - start_ns - self.paused_ns
+
+    def timestamp(self):
+        """Время сессии без пауз в секундах с точностью до миллисекунды"""
+        return round(self.elapsed_ns() / 1e9, 3)
+
+    def total_pause_time(self):
+        """Суммарная длительность пауз в секундах"""
+        paused_ns = self.paused_ns
+        if self.pause_started_ns is not None:
+            paused_ns += time.perf_counter_ns() - self.pause_started_ns
+        return paused_ns / 1e9
+
+    def mark_frame(self, captured_ns=None, count=1):
+        """
+        Отмечает запись кадра (count - сколько раз кадр записан в видео).
+        captured_ns - время захвата кадра по часам сессии; по умолчанию текущее.
+        Возвращает номер последнего записанного кадра.
+        """
+        if captured_ns is None:
+            captured_ns = self.elapsed_ns()
+        with self._lock:
+            frame_times = self.frame_times
+            # Время кадров не должно убывать, иначе поиск кадра по времени неверен
+            if frame_times and captured_ns < frame_times[-1]:
+                captured_ns = frame_times[-1]
+            for _ in range(count):
+                frame_times.append(captured_ns)
+            return len(frame_times) - 1
+
+    def frame_count(self):
+        return len(self.frame_times)
+
+    def frame_at(self, seconds):
+        """
+        Номер кадра, который был последним захвачен к моменту seconds
+        (время сессии). События до первого кадра относятся к кадру 0.
+        """
+        index = bisect_right(self.frame_times, round(seconds * 1e9)) - 1
+        return index if index > 0 else 0
+
+    def report(self):
+        """
+        Итоги синхронизации: число кадров, длительность видео по FPS кодировщика,
+        длительность по часам сессии и их расхождение (drift, секунды;
+        положительное - видео короче реального времени; driftExceeded - больше
+        длительности кадра), а также максимальное отставание кадра от своего
+        места на временной шкале видео.
+        """
+        with self._lock:
+            frame_times = self.frame_times
+            frames = len(frame_times)
+            fps = self.fps
+            clock_duration = self.elapsed_ns() / 1e9
+            report = {
+                "fps": fps,
+                "frames": frames,
+                "clockDuration": round(clock_duration, 3),
+            }
+            if fps:
+                video_duration = frames / fps
+                step_ns = 1e9 / fps
+                max_lag_ns = max((abs(t - i * step_ns) for i, t in enumerate(frame_times)), default=0)
+                report["videoDuration"] = round(video_duration, 3)
+                report["drift"] = round(clock_duration - video_duration, 3)
+                report["driftExceeded"] = abs(clock_duration - video_duration) > 1.0 / fps
+                report["maxFrameLag"] = round(max_lag_ns / 1e9, 3)
+            return report
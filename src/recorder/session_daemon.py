@@ -0,0 +1,346 @@
+import os
+import time
+import heapq
+import itertools
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from src.recorder.screen_recorder import ScreenRecorder
+from src.recorder.display_capture import XDisplayCapture
+
+
+class RecordingSession:
+    """
+    Одна сессия записи внутри демона: рекордер, очередь кадров на кодирование
+    и учет потребления CPU и диска.
+    """
+
+    def __init__(self, name, recorder, fps, cpu_budget=None, disk_budget=None, duration=None):
+        self.name = name
+        self.recorder = recorder
+        self.fps = fps
+        self.interval = 1.0 / fps
+        self.cpu_budget = cpu_budget      # Доля одного ядра
+        self.disk_budget = disk_budget    # Байты
+        self.duration = duration
+
+        self.started = None
+        self.deadline = None
+        self.status = "recording"
+
+        # Очередь кадров на кодирование: (кадр, количество повторов)
+        self.pending = deque()
+        self.encoding = False
+        self.closing = False
+        self.finished = False
+        self.done = threading.Event()
+        self.lock = threading.Lock()
+
+        # Статистика
+        self.frames_indexed = 0
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self.cpu_time = 0.0
+        self.cpu_rate = 0.0
+        self.throttle = 1.0
+        self.disk_usage = 0
+        self._last_cpu_time = 0.0
+
+    def add_cpu_time(self, seconds):
+        with self.lock:
+            self.cpu_time += seconds
+
+    def effective_interval(self, global_throttle):
+        """Интервал между захватами с учетом ограничений по CPU"""
+        return self.interval * self.throttle * global_throttle
+
+    def summary(self):
+        """Возвращает итоги сессии"""
+        return {
+            "name": self.name,
+            "status": self.status,
+            "video": self.recorder.output_file,
+            "metadata": self.recorder.metadata_file,
+            "frames": self.recorder.frames_written,
+            "captured": self.frames_captured,
+            "dropped": self.frames_dropped,
+            "cpuTime": round(self.cpu_time, 3),
+            "diskUsage": self.disk_usage,
+            "events": len(self.recorder.metadata_collector.get_events()),
+            "timing": self.recorder.timing,
+        }
+
+
+class RecordingDaemon:
+    """
+    Управляет множеством одновременных сессий записи в одном процессе.
+    Захват кадров выполняет один планировщик (по ближайшему сроку, поровну между
+    сессиями), кодирование - общий пул потоков. Для каждой сессии и для процесса
+    в целом соблюдаются бюджеты CPU и диска.
+    """
+
+    def __init__(self, encoder_workers=2, cpu_budget=None, disk_budget=None, max_backlog=4):
+        self.encoder_workers = encoder_workers
+        self.cpu_budget = cpu_budget      # Количество ядер на весь процесс
+        self.disk_budget = disk_budget    # Байты на все сессии
+        self.max_backlog = max_backlog    # Максимум кадров в очереди на кодирование
+
+        self.sessions = {}
+        self.finished_sessions = []
+        self.global_throttle = 1.0
+
+        self._pool = None
+        self._heap = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._running = False
+        self._last_budget_check = None
+
+    def start(self):
+        """Запускает пул кодировщиков и планировщик захвата"""
+        if self._running:
+            return
+        self._pool = ThreadPoolExecutor(max_workers=self.encoder_workers,
+                                        thread_name_prefix="screencaster-encoder")
+        self._running = True
+        self._last_budget_check = time.monotonic()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def add_session(self, name, config, display=None, output_file=None,
+                    cpu_budget=None, disk_budget=None, duration=None):
+        """Добавляет и запускает сессию записи"""
+        if name in self.sessions:
+            raise ValueError(f"Сессия {name} уже существует")
+
+        capture = XDisplayCapture(display) if display else None
+        recorder = ScreenRecorder(config, capture=capture)
+
+        session = RecordingSession(name, recorder, config.settings["fps"],
+                                   cpu_budget=cpu_budget, disk_budget=disk_budget,
+                                   duration=duration)
+        recorder.start_recording(output_file, threaded=False)
+        session.started = time.monotonic()
+        if duration is not None:
+            session.deadline = session.started + duration
+
+        with self._lock:
+            self.sessions[name] = session
+            heapq.heappush(self._heap, (session.started, next(self._counter), session))
+        self._wakeup.set()
+        return session
+
+    def remove_session(self, name, status="stopped"):
+        """Останавливает сессию и возвращает ее итоги"""
+        session = self.sessions.get(name)
+        if session is None:
+            return None
+        self._close_session(session, status)
+        session.done.wait()
+        return session.summary()
+
+    def wait(self):
+        """Ожидает завершения всех сессий"""
+        while True:
+            with self._lock:
+                pending = list(self.sessions.values())
+            if not pending:
+                return
+            for session in pending:
+                session.done.wait()
+
+    def stop(self):
+        """Останавливает все сессии и возвращает их итоги"""
+        with self._lock:
+            active = list(self.sessions.values())
+        for session in active:
+            self._close_session(session, "stopped")
+        for session in active:
+            session.done.wait()
+
+        self._running = False
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        if self._pool:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        return [session.summary() for session in self.finished_sessions]
+
+    def _run(self):
+        """Цикл планировщика: захват кадров по ближайшему сроку"""
+        while self._running:
+            now = time.monotonic()
+            if now - self._last_budget_check >= 1.0:
+                self._check_budgets(now - self._last_budget_check)
+                self._last_budget_check = now
+
+            with self._lock:
+                entry = self._heap[0] if self._heap else None
+                if entry is not None and entry[0] <= now:
+                    heapq.heappop(self._heap)
+            if entry is None:
+                self._wakeup.wait(0.1)
+                self._wakeup.clear()
+                continue
+
+            due, _, session = entry
+            if due > now:
+                self._wakeup.wait(min(due - now, 0.1))
+                self._wakeup.clear()
+                continue
+
+            if session.closing:
+                continue
+            if session.deadline is not None and now >= session.deadline:
+                self._close_session(session, "completed")
+                continue
+
+            self._capture(session, now)
+
+            # Если сессия отстала больше чем на интервал, не догоняем очередью захватов:
+            # пропущенные позиции заполнятся повтором следующего кадра
+            interval = session.effective_interval(self.global_throttle)
+            next_due = max(due + interval, now)
+            with self._lock:
+                heapq.heappush(self._heap, (next_due, next(self._counter), session))
+
+    def _capture(self, session, now):
+        """Захватывает кадр сессии и ставит его в очередь на кодирование"""
+        # Номер кадра по часам сессии, общим с метаданными, чтобы видео не расходилось с ними
+        captured_ns = session.recorder.clock.elapsed_ns()
+        target_index = int(captured_ns * session.fps / 1e9) + 1
+        repeat = target_index - session.frames_indexed
+        if repeat <= 0:
+            return
+
+        with session.lock:
+            backlog = len(session.pending)
+        if backlog >= self.max_backlog:
+            # Кодировщик не успевает, пропускаем захват
+            session.frames_dropped += 1
+            return
+
+        started = time.thread_time()
+        try:
+            frame = session.recorder.grab_frame(captured_ns)
+        except Exception as e:
+            print(f"Ошибка захвата кадра в сессии {session.name}: {e}")
+            self._close_session(session, "error")
+            return
+        session.add_cpu_time(time.thread_time() - started)
+        session.frames_captured += 1
+        session.frames_indexed = target_index
+
+        with session.lock:
+            if session.closing:
+                return
+            session.pending.append((frame, repeat, captured_ns))
+            if session.encoding:
+                return
+            session.encoding = True
+        self._pool.submit(self._drain, session)
+
+    def _drain(self, session):
+        """Кодирует накопленные кадры сессии (не более одного потока на сессию)"""
+        finalize = False
+        while True:
+            with session.lock:
+                if not session.pending:
+                    session.encoding = False
+                    if session.closing and not session.finished:
+                        session.finished = True
+                        finalize = True
+                    break
+                frame, repeat, captured_ns = session.pending.popleft()
+
+            started = time.thread_time()
+            try:
+                for _ in range(repeat):
+                    session.recorder.write_frame(frame, captured_ns)
+            except Exception as e:
+                print(f"Ошибка кодирования кадра в сессии {session.name}: {e}")
+            session.add_cpu_time(time.thread_time() - started)
+
+        if finalize:
+            self._finalize(session)
+
+    def _close_session(self, session, status):
+        """Помечает сессию как завершаемую; финализация после кодирования очереди"""
+        with session.lock:
+            if session.closing:
+                return
+            session.closing = True
+            session.status = status
+            run_now = not session.encoding and not session.finished
+            if run_now:
+                session.finished = True
+        if run_now:
+            if self._pool:
+                self._pool.submit(self._finalize, session)
+            else:
+                self._finalize(session)
+
+    def _finalize(self, session):
+        """Закрывает видео и метаданные сессии"""
+        try:
+            session.recorder.close()
+            if session.recorder.capture:
+                session.recorder.capture.close()
+        except Exception as e:
+            print(f"Ошибка при завершении сессии {session.name}: {e}")
+        session.disk_usage = self._session_disk_usage(session)
+        with self._lock:
+            self.sessions.pop(session.name, None)
+            self.finished_sessions.append(session)
+        session.done.set()
+
+    def _session_disk_usage(self, session):
+        """Возвращает объем видео и метаданных сессии на диске"""
+        total = 0
+        for path in (session.recorder.output_file, session.recorder.metadata_file):
+            if path and os.path.exists(path):
+                total += os.path.getsize(path)
+        return total
+
+    def _check_budgets(self, window):
+        """Проверяет бюджеты CPU и диска и регулирует частоту захвата"""
+        with self._lock:
+            active = [s for s in self.sessions.values() if not s.closing]
+
+        total_rate = 0.0
+        total_disk = 0
+        for session in active:
+            with session.lock:
+                cpu_time = session.cpu_time
+            session.cpu_rate = (cpu_time - session._last_cpu_time) / window
+            session._last_cpu_time = cpu_time
+            total_rate += session.cpu_rate
+
+            # Бюджет CPU сессии: плавно снижаем или восстанавливаем частоту захвата
+            if session.cpu_budget is not None and session.cpu_rate > session.cpu_budget:
+                session.throttle = min(session.throttle * 1.25, 8.0)
+            else:
+                session.throttle = max(session.throttle / 1.1, 1.0)
+
+            session.disk_usage = self._session_disk_usage(session)
+            total_disk += session.disk_usage
+            if session.disk_budget is not None and session.disk_usage >= session.disk_budget:
+                self._close_session(session, "disk_budget")
+
+        # Общий бюджет CPU распределяется между сессиями поровну через общий множитель
+        if self.cpu_budget is not None and total_rate > self.cpu_budget:
+            self.global_throttle = min(self.global_throttle * 1.25, 8.0)
+        else:
+            self.global_throttle = max(self.global_throttle / 1.1, 1.0)
+
+        # Общий бюджет диска: останавливаем самую объемную сессию
+        if self.disk_budget is not None and total_disk >= self.disk_budget:
+            remaining = [s for s in active if not s.closing]
+            if remaining:
+                largest = max(remaining, key=lambda s: s.disk_usage)
+                self._close_session(largest, "global_disk_budget")
@@ -0,0 +1,104 @@
+import math
+
+
+def segment_distance(px, py, ax, ay, bx, by):
+    """Расстояние от точки P до отрезка AB"""
+    dx = bx - ax
+    dy = by - ay
+    length_sq = dx * dx + dy * dy
+    if length_sq == 0:
+        return math.hypot(px - ax, py - ay)
+    t = ((px - ax) * dx + (py - ay) * dy) / length_sq
+    t = max(0.0, min(1.0, t))
+    return math.hypot(px - (ax + t * dx), py - (ay + t * dy))
+
+
+class TrajectorySimplifier:
+    """
+    Упрощение траектории курсора на лету (скользящее окно).
+    Точки с момента последней сохраненной вершины накапливаются в окне;
+    пока все они лежат не дальше tolerance пикселей от отрезка "вершина -
+    новая точка", окно растет. Иначе предыдущая точка становится вершиной.
+    Вершина сохраняется и при остановке курсора дольше max_gap секунд,
+    чтобы траектория сохраняла не только форму, но и темп движения.
+    Размер окна ограничен max_window, поэтому стоимость точки постоянна.
+    """
+
+    def __init__(self, tolerance=2.0, max_window=64, max_gap=0.1):
+        self.tolerance = tolerance
+        self.max_window = max_window
+        self.max_gap = max_gap
+        self.points = []
+        self.window = []
+        self.samples = 0
+
+    def start(self, t, x, y):
+        """Начинает траекторию с точки (время в секундах, координаты в пикселях)"""
+        self.points = [(t, x, y)]
+        self.window = []
+        self.samples = 1
+
+    def add(self, t, x, y):
+        """Добавляет точку траектории"""
+        self.samples += 1
+        last = self.window[-1] if self.window else self.points[-1]
+        if x == last[1] and y == last[2]:
+            return
+        if self.window and (t - last[0] > self.max_gap or
+                            len(self.window) >= self.max_window or
+                            not self._fits(x, y)):
+            self.points.append(last)
+            self.window = []
+        self.window.append((t, x, y))
+
+    def _fits(self, x, y):
+        """Проверяет, что точки окна лежат в пределах допуска от отрезка до новой точки"""
+        _, ax, ay = self.points[-1]
+        tolerance = self.tolerance
+        for _, px, py in self.window:
+            if segment_distance(px, py, ax, ay, x, y) > tolerance:
+                return False
+        return True
+
+    def finish(self, t=None, x=None, y=None):
+        """Завершает траекторию (можно передать конечную точку) и возвращает вершины"""
+        if x is not None:
+            self.add(t, x, y)
+        if self.window:
+            self.points.append(self.window[-1])
+            self.window = []
+        return self.points
+
+
+def encode_path(points):
+    """
+    Кодирует вершины траектории разностями: [dt_мс, dx, dy, dt_мс, dx, dy, ...]
+    относительно предыдущей точки. Первая точка в путь не входит - это время
+    и координаты самого события.
+    """
+    path = []
+    prev_ms = round(points[0][0] * 1000)
+    prev_x = points[0][1]
+    prev_y = points[0][2]
+    for t, x, y in points[1:]:
+        t_ms = round(t * 1000)
+        path.extend((t_ms - prev_ms, x - prev_x, y - prev_y))
+        prev_ms = t_ms
+        prev_x = x
+        prev_y = y
+    return path
+
+
+def decode_path(event):
+    """Восстанавливает точки траектории события: список (время, x, y), включая начальную"""
+    t_ms = round(event["time"] * 1000)
+    x = event["x"]
+    y = event["y"]
+    points = [(event["time"], x, y)]
+    path = event.get("path") or []
+    for i in range(0, len(path) - 2, 3):
+        t_ms += path[i]
+        x += path[i + 1]
+        y += path[i + 2]
+        points.append((t_ms / 1000, x, y))
+    return points
@@ -1,11 +1,11 @@
 import os
+import importlib
+import threading
 from PyQt5.QtWidgets import (QMainWindow, QPushButton, QVBoxLayout, QHBoxLayout,
                             QWidget, QLabel, QFrame, QGraphicsDropShadowEffect, QDesktopWidget,
                             QApplication, QMenu, QAction)
 from PyQt5.QtCore import Qt, QPoint, QTimer, QSize
 from PyQt5.QtGui import QIcon, QColor, QFont, QPainter, QBrush, QPen, QPolygon
-from src.ui.settings_window import SettingsWindow
-from src.recorder.screen_recorder import ScreenRecorder
 from src.utils.config import Config
 
 class CircleButton(QPushButton):
@@ -71,8 +71,14 @@ class MainWindow(QMainWindow):
         # Инициализация конфигурации
         self.config = Config()
         
-        # Инициализация рекордера
-        self.recorder = ScreenRecorder(self.config)
+        # Рекордер создается при первой записи. Тяжелые модули (cv2, numpy,
+        # pyautogui, pynput) загружаются в фоне после показа окна
+        self.recorder = None
+        self._preload_thread = None
+        
+        # Таймер ожидания фоновой загрузки для перехода рекордера в режим ожидания
+        self.standby_timer = QTimer(self)
+        self.standby_timer.timeout.connect(self._check_preload)
         
         # Настройка окна
         self.setWindowTitle("Screen Recorder")
@@ -290,6 +296,8 @@ class MainWindow(QMainWindow):
 
 
     def open_settings(self):
+        from src.ui.settings_window import SettingsWindow
+        
         settings_window = SettingsWindow(self.config)
         
         # Position the settings window next to the main window
@@ -297,6 +305,7 @@ class MainWindow(QMainWindow):
         settings_window.move(main_pos.x() + self.width() + 5, main_pos.y())
         
         settings_window.exec_()
+        self._refresh_standby()
 
 
     def select_region(self):
@@ -305,10 +314,10 @@ class MainWindow(QMainWindow):
         self.resolution_menu.popup(pos)
 
     def set_resolution(self, width, height):
-        # Устанавливаем выбранное разрешение в конфигурацию
-        self.config.set('recording', 'width', str(width))
-        self.config.set('recording', 'height', str(height))
-        self.config.save()
+        # Выбранное разрешение - область записи от левого верхнего угла экрана
+        self.config.settings["region"] = [0, 0, int(width), int(height)]
+        self.config.save_config()
+        self._refresh_standby()
         
         # Показываем уведомление о выбранном разрешении
         self.show_notification(f"Resolution set: {width} x {height}")
@@ -358,8 +367,59 @@ class MainWindow(QMainWindow):
             else:
                 self.resume_recording()
 
+    def preload_recorder(self):
+        """Загружает модули записи в фоновом потоке, не блокируя интерфейс"""
+        if self.recorder is not None or self._preload_thread is not None:
+            return
+        self._preload_thread = threading.Thread(target=self._import_recorder_modules)
+        self._preload_thread.daemon = True
+        self._preload_thread.start()
+        
+        if self.config.settings.get("standby", True):
+            self.standby_timer.start(100)
+
+    def _check_preload(self):
+        # Подготовка выполняется в главном потоке (определение FPS использует Qt)
+        if self._preload_thread is not None and self._preload_thread.is_alive():
+            return
+        self.standby_timer.stop()
+        self.enter_standby()
+
+    def enter_standby(self):
+        """Заранее подготавливает запись, чтобы она началась без задержки"""
+        if self.is_recording:
+            return
+        try:
+            self.get_recorder().prepare()
+        except Exception as e:
+            print(f"Ошибка при подготовке записи: {e}")
+
+    def _refresh_standby(self):
+        """Подготавливает режим ожидания заново после изменения настроек записи"""
+        if self.recorder is None or self.is_recording:
+            return
+        try:
+            self.recorder.refresh_standby()
+        except Exception as e:
+            print(f"Ошибка при подготовке записи: {e}")
+
+    def _import_recorder_modules(self):
+        try:
+            importlib.import_module("src.recorder.screen_recorder")
+        except Exception as e:
+            print(f"Ошибка при предзагрузке модулей записи: {e}")
+
+    def get_recorder(self):
+        """Возвращает рекордер, создавая его при первом обращении"""
+        if self.recorder is None:
+            if self._preload_thread is not None:
+                self._preload_thread.join()
+            from src.recorder.screen_recorder import ScreenRecorder
+            self.recorder = ScreenRecorder(self.config)
+        return self.recorder
+
     def start_recording(self):
-        self.recorder.start_recording()
+        self.get_recorder().start_recording()
         self.is_recording = True
         self.is_paused = False
         
@@ -431,6 +491,10 @@ class MainWindow(QMainWindow):
             self.show_notification(f"Recording saved: {os.path.basename(video_file)}")
         else:
             self.show_notification("Recording completed")
+        
+        # Снова готовимся к следующей записи
+        if self.config.settings.get("standby", True):
+            QTimer.singleShot(0, self.enter_standby)
    
     def update_timer(self):
         if self.is_recording:
@@ -466,7 +530,15 @@ class MainWindow(QMainWindow):
         super().showEvent(event)
         self.position_window()
         
+        # Предзагрузка модулей записи после отрисовки окна
+        QTimer.singleShot(0, self.preload_recorder)
+        
         # Позиционируем кнопку закрытия в правом верхнем углу
         if hasattr(self, 'close_button'):
             self.close_button.move(self.width() - 25, 5)
 
+    def closeEvent(self, event):
+        """Освобождает ресурсы рекордера при закрытии окна"""
+        if self.recorder is not None:
+            self.recorder.close()
+        super().closeEvent(event)
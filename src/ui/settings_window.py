@@ -76,6 +76,12 @@ class SettingsWindow(QDialog):
         self.show_cursor_check = QCheckBox()
         record_layout.addRow("Show cursor:", self.show_cursor_check)
         
+        # Click and keystroke overlays
+        self.show_clicks_check = QCheckBox()
+        record_layout.addRow("Highlight clicks:", self.show_clicks_check)
+        self.show_keystrokes_check = QCheckBox()
+        record_layout.addRow("Show keystrokes:", self.show_keystrokes_check)
+        
         # Record audio
         self.record_audio_check = QCheckBox()
         self.record_audio_check.setChecked(True)
@@ -230,6 +236,8 @@ class SettingsWindow(QDialog):
         self.format_combo.setCurrentText(settings.get("video_format", "mp4"))
         self.fps_combo.setCurrentText(str(settings.get("fps", 30)))
         self.show_cursor_check.setChecked(settings.get("show_cursor", True))
+        self.show_clicks_check.setChecked(settings.get("show_clicks", False))
+        self.show_keystrokes_check.setChecked(settings.get("show_keystrokes", False))
         
         # Load hotkeys
         hotkeys = settings.get("hotkeys", {})
@@ -269,6 +277,8 @@ class SettingsWindow(QDialog):
         settings["video_format"] = self.format_combo.currentText()
         settings["fps"] = int(self.fps_combo.currentText())
         settings["show_cursor"] = self.show_cursor_check.isChecked()
+        settings["show_clicks"] = self.show_clicks_check.isChecked()
+        settings["show_keystrokes"] = self.show_keystrokes_check.isChecked()
         
         # Save hotkeys
         if "hotkeys" not in settings:
@@ -310,6 +320,8 @@ class SettingsWindow(QDialog):
         self.format_combo.setCurrentText("mp4")
         self.fps_combo.setCurrentText("30")
         self.show_cursor_check.setChecked(True)
+        self.show_clicks_check.setChecked(False)
+        self.show_keystrokes_check.setChecked(False)
         self.record_audio_check.setChecked(True)
         self.mic_radio.setChecked(True)
         
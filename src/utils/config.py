@@ -9,6 +9,9 @@ class Config:
         self.default_settings = {
             "save_path": self.default_save_path,
             "show_cursor": True,
+            # Рисовать на видео круги кликов и строку нажатых клавиш
+            "show_clicks": False,
+            "show_keystrokes": False,
             "fps": 25,
             "video_format": "mov",
             "hotkeys": {
@@ -16,13 +19,49 @@ class Config:
                 "pause_recording": "F10",
                 "stop_recording": "F11"
             },
-            "resolution": "1920x1080"
+            "resolution": "1920x1080",
+            # Дополнительные горячие клавиши для метаданных: список или {"Ctrl+Shift+T": "имя"},
+            # и наборы для отдельных приложений: {"code": {"Ctrl+Shift+P": "Command Palette"}}
+            "recognized_hotkeys": [],
+            "application_hotkeys": {},
+            # Раскладка для символов вне раскладки US ("ru", "de"); None - только US
+            "keyboard_layout": None,
+            # Траектории курсора и допуск их упрощения в пикселях
+            "mouse_trajectory": True,
+            "trajectory_tolerance": 2.0,
+            # Журнал событий: максимальная задержка записи на диск (секунды),
+            # размер группы событий на один fsync и использование fsync
+            "wal_commit_interval": 0.2,
+            "wal_commit_batch": 256,
+            "wal_fsync": True,
+            # Сжатие метаданных: None, "gzip" или "zstd" (пакет zstandard);
+            # уровень None - по умолчанию для способа
+            "metadata_compression": None,
+            "compression_level": None,
+            # Автопауза при простое: через idle_timeout секунд без ввода и изменений
+            # экрана (None - выключена) запись приостанавливается ("pause") или
+            # кадры захватываются idle_trickle_fps раз в секунду ("trickle")
+            "idle_timeout": None,
+            "idle_mode": "pause",
+            "idle_trickle_fps": 1.0,
+            # Живой поток событий: адрес "хост:порт" или "unix:/путь" (None - выключен),
+            # емкость очереди каждого подписчика в событиях и политика ее переполнения
+            # ("drop-oldest", "drop-newest" или "disconnect")
+            "event_stream": None,
+            "event_stream_buffer": 1024,
+            "event_stream_policy": "drop-oldest",
+            # Обработчики событий: "модуль:фабрика" или {"processor": "модуль:фабрика",
+            # "options": {...}, "threaded": true}; выполняются по порядку пачками
+            # и только передают события дальше (экспорт), файл метаданных не меняют
+            "event_processors": [],
+            # Скрывать набранный текст в метаданных, журнале, живом потоке и наложении
+            "redact_text": False,
+            # Заранее готовить запись в режиме ожидания
+            "standby": True
         }
         
-        # Создаем директорию для сохранения, если она не существует
-        if not os.path.exists(self.default_save_path):
-            os.makedirs(self.default_save_path)
-            
+        # Директория для сохранения создается при начале записи (ScreenRecorder),
+        # чтобы не обращаться к диску лишний раз при запуске
         self.config_path = os.path.join(self.home_dir, ".screencaster_config.json")
         self.load_config()
     
@@ -0,0 +1,34 @@
+import io
+import unittest
+import contextlib
+
+from benchmarks.key_translation_benchmark import sample_keys
+from benchmarks.legacy_key_mapping import LegacyKeyMapping
+from src.recorder.key_translation import KEY_CODE_MAP, KEY_MAP, KeyTranslator
+
+
+class KeyTranslatorTest(unittest.TestCase):
+    """KeyTranslator переводит клавиши так же, как прежний MetadataCollector"""
+
+    def setUp(self):
+        self.legacy = LegacyKeyMapping()
+        self.keys = sample_keys()
+
+    def test_codes_match_legacy_mapping(self):
+        translator = KeyTranslator()
+        # Прежний перевод печатает ошибки для нестандартных значений
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = [self.legacy._map_key_to_code(key) for key in self.keys]
+            first = [translator.code(key) for key in self.keys]
+            cached = [translator.code(key) for key in self.keys]
+        for key, old, new in zip(self.keys, expected, first):
+            self.assertEqual(new, old, f"Перевод {key!r}")
+        self.assertEqual(cached, first)
+
+    def test_tables_match_legacy_mapping(self):
+        self.assertEqual(dict(KEY_CODE_MAP), self.legacy.key_code_map)
+        self.assertEqual(dict(KEY_MAP), self.legacy.key_map)
+
+
+if __name__ == "__main__":
+    unittest.main()